@@ -0,0 +1,77 @@
+"""Adaptive practice: per-answer latency, test length and decision accuracy.
+
+    python benchmarks/bench_adaptive.py [--items 50000] [--candidates 500]
+
+Builds an :class:`~capm_sim.adaptive.AdaptiveEngine` over a synthetic bank
+with random 2PL parameters, then simulates candidates whose true ability
+is spread around the cut score.  Each answer is drawn from the model, so
+the report shows how many items a session needs before it stops, how
+often the pass/fail decision matches the candidate's true side of the cut,
+and the server-side cost of one answer (estimate + next-item selection).
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from capm_sim.adaptive import MAX_ITEMS, AdaptiveEngine, ItemParams  # noqa: E402
+from capm_sim.assembly import DOMAIN_WEIGHTS  # noqa: E402
+from capm_sim.scoring import AnswerKey  # noqa: E402
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--items", type=int, default=50_000)
+    ap.add_argument("--candidates", type=int, default=500)
+    ap.add_argument("--spread", type=float, default=1.0, help="sd of true ability around the cut")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+
+    n = args.items
+    shares = np.array(list(DOMAIN_WEIGHTS.values()), float)
+    key = AnswerKey(np.arange(1, n + 1), rng.integers(0, 4, n).astype(np.int8),
+                    rng.choice(len(shares), n, p=shares / shares.sum()).astype(np.int8))
+    params = ItemParams(key.ids, rng.lognormal(0.0, 0.3, n), rng.normal(0.0, 1.0, n))
+    t0 = time.perf_counter()
+    engine = AdaptiveEngine(key, params)
+    print(f"engine for {n} items built in {time.perf_counter() - t0:.2f}s (cut θ = {engine.cut:.2f})")
+
+    lengths, agree, latency = [], 0, []
+    for _ in range(args.candidates):
+        theta = rng.normal(engine.cut, args.spread)
+        rows: list[int] = []
+        correct: list[bool] = []
+        estimate = engine.estimate(np.array(rows, np.int64), np.array(correct, bool))
+        while estimate.decision is None:
+            t0 = time.perf_counter()
+            row = engine.select(np.array(rows, np.int64), estimate.theta, rng)
+            latency.append(time.perf_counter() - t0)
+            p = 1.0 / (1.0 + np.exp(-params.a[row] * (theta - params.b[row])))
+            rows.append(row)
+            correct.append(bool(rng.random() < p))
+            t0 = time.perf_counter()
+            estimate = engine.estimate(np.array(rows, np.int64), np.array(correct, bool))
+            latency[-1] += time.perf_counter() - t0
+        lengths.append(len(rows))
+        agree += (estimate.decision == "pass") == (theta >= engine.cut)
+
+    lengths_a, latency_ms = np.array(lengths), np.array(latency) * 1000
+    print(f"{args.candidates} candidates, true θ ~ N(cut, {args.spread:g})")
+    print(f"items to decision: mean {lengths_a.mean():.1f}  median {np.median(lengths_a):.0f}  "
+          f"p90 {np.percentile(lengths_a, 90):.0f}  hit the {MAX_ITEMS}-item cap {int((lengths_a >= MAX_ITEMS).sum())}")
+    print(f"decision matches true side of the cut: {agree / args.candidates:.1%}")
+    print(f"per answer: p50 {np.percentile(latency_ms, 50):.3f} ms  p99 {np.percentile(latency_ms, 99):.3f} ms  "
+          f"max {latency_ms.max():.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Forms/sec of the stratified assembler against synthetic banks.
+
+    python benchmarks/bench_assembly.py [--sizes 1000 10000 100000 1000000] [--seconds 1]
+
+Each bank spreads its items across domains in blueprint proportion.  Rows
+are reported without exclusions and with a 150-item exclusion list (one
+previously seen form).
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from capm_sim.assembly import DOMAIN_WEIGHTS, Assembler, apportion  # noqa: E402
+from capm_sim.exams import EXAM_LENGTH  # noqa: E402
+
+
+def synthetic_pools(size: int) -> dict[str, range]:
+    pools, start = {}, 1
+    for domain, n in apportion(size, DOMAIN_WEIGHTS).items():
+        pools[domain] = range(start, start + n)
+        start += n
+    return pools
+
+
+def rate(assembler: Assembler, seconds: float, exclude: set[int]) -> float:
+    n, seed = 0, 0
+    deadline = time.perf_counter() + seconds
+    t0 = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            assembler.assemble(EXAM_LENGTH, seed, exclude)
+            seed += 1
+        n += 100
+    return n / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    ap.add_argument("--seconds", type=float, default=1.0)
+    args = ap.parse_args()
+
+    print(f"{'bank size':>10} {'setup ms':>9} {'forms/s':>10} {'forms/s (excl)':>15}")
+    for size in args.sizes:
+        t0 = time.perf_counter()
+        assembler = Assembler(synthetic_pools(size))
+        setup_ms = (time.perf_counter() - t0) * 1000
+        seen = set(assembler.assemble(EXAM_LENGTH, seed=-1).items)
+        print(f"{size:>10} {setup_ms:>9.1f} {rate(assembler, args.seconds, set()):>10.0f}"
+              f" {rate(assembler, args.seconds, seen):>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
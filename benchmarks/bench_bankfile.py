@@ -0,0 +1,122 @@
+"""Worker memory and startup: SQLite bank vs the memory-mapped bank file.
+
+    python benchmarks/bench_bankfile.py [--sizes 10000,50000,200000] [--workers 4]
+
+For each bank size, builds a synthetic bank (see ``bench_search.py``) and
+its ``bank.bin``, then starts ``--workers`` processes per backend.  Each
+worker loads what a server worker derives from the bank — answer key,
+domain pools, search index — touches every row once, and reports how long
+the load took.  With all workers of a backend alive at once, the parent
+reads their RSS and PSS from ``/proc``; PSS splits shared pages between the
+processes mapping them, so it is the honest per-worker cost; "private"
+is the dirty memory that belongs to the worker alone.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_search import synthetic_rows  # noqa: E402
+from capm_sim.assembly import Assembler  # noqa: E402
+from capm_sim.bank import QuestionBank, build_bank  # noqa: E402
+from capm_sim.bankfile import MappedBank, write_bank_file  # noqa: E402
+from capm_sim.scoring import AnswerKey  # noqa: E402
+
+BACKENDS = ("sqlite", "mmap")
+
+
+def worker(backend: str, path: Path) -> None:
+    t0 = time.perf_counter()
+    bank = QuestionBank(path) if backend == "sqlite" else MappedBank(path)
+    AnswerKey.from_bank(bank)
+    Assembler.from_bank(bank)
+    bank.index()
+    ready = (time.perf_counter() - t0) * 1000
+    ids = bank.ids()
+    for i in range(0, len(ids), 1000):
+        bank.full(ids[i:i + 1000])
+    print(json.dumps({"ready_ms": ready}), flush=True)
+    sys.stdin.read()    # stay alive until the parent has measured everyone
+
+
+def memory(pid: int) -> tuple[int, int, int]:
+    """``(rss, pss, private dirty)`` in bytes."""
+    fields = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        name, value, *_ = line.split()
+        fields[name.rstrip(":")] = int(value) * 1024
+    return fields["Rss"], fields["Pss"], fields["Private_Dirty"]
+
+
+def measure(backend: str, path: Path, workers: int) -> dict:
+    procs = [subprocess.Popen([sys.executable, __file__, "--worker", backend, str(path)],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True) for _ in range(workers)]
+    try:
+        ready = [json.loads(p.stdout.readline())["ready_ms"] for p in procs]
+        mem = [memory(p.pid) for p in procs]
+    finally:
+        for p in procs:
+            p.stdin.close()
+            p.wait()
+    rss, pss, private = (sum(m[i] for m in mem) / workers for i in range(3))
+    return {"ready_ms": sorted(ready)[len(ready) // 2], "rss": rss, "pss": pss, "private": private}
+
+
+def baseline() -> tuple[int, int, int]:
+    """:func:`memory` of a worker that has imported everything but loaded no bank."""
+    proc = subprocess.Popen([sys.executable, __file__, "--worker", "none", "-"],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    proc.stdout.readline()
+    try:
+        return memory(proc.pid)
+    finally:
+        proc.stdin.close()
+        proc.wait()
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="10000,50000,200000")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--worker", nargs=2, metavar=("BACKEND", "PATH"), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.worker:
+        backend, path = args.worker
+        if backend == "none":
+            print("{}", flush=True)
+            sys.stdin.read()
+        else:
+            worker(backend, Path(path))
+        return 0
+
+    base_rss, base_pss, base_private = baseline()
+    print(f"idle worker (imports only): RSS {base_rss / 2**20:.1f} MB, PSS {base_pss / 2**20:.1f} MB, "
+          f"private {base_private / 2**20:.1f} MB; figures below are per worker, on top of that")
+    print(f"{'items':>8} {'backend':<7} {'file MB':>8} {'ready ms':>9} {'RSS MB':>8} {'PSS MB':>8} {'private MB':>11}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            db, binary = Path(tmp) / "bank.sqlite3", Path(tmp) / "bank.bin"
+            build_bank(synthetic_rows(size, random.Random(args.seed)), db)
+            bank = QuestionBank(db)
+            write_bank_file(bank, binary)
+            bank.close()
+            for backend, path in zip(BACKENDS, (db, binary)):
+                r = measure(backend, path, args.workers)
+                print(f"{size:>8} {backend:<7} {path.stat().st_size / 2**20:>8.1f} {r['ready_ms']:>9.1f} "
+                      f"{(r['rss'] - base_rss) / 2**20:>8.1f} {(r['pss'] - base_pss) / 2**20:>8.1f} "
+                      f"{(r['private'] - base_private) / 2**20:>11.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Score-sketch size, accuracy and query latency as the cohort grows.
+
+    python benchmarks/bench_cohort.py [--scores 1000000,5000000] [--workers 4] [--k 200]
+
+For each cohort size, draws scores (percent correct on a 150-item form,
+so heavily tied like real ones), feeds them round-robin into ``--workers``
+sketches the way server workers would, merges those into one view, and
+reports the values the view keeps, its worst rank error against the exact
+ranks over the whole score range, the merge time, and the latency of the
+rank query a submit makes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from capm_sim.cohort import KLLSketch  # noqa: E402
+
+FORM = 150
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scores", default="1000000,5000000")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--k", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'scores':>9} {'kept':>6} {'max rank err':>13} {'merge ms':>9} {'rank µs':>8}")
+    for size in (int(s) for s in args.scores.split(",")):
+        scores = rng.binomial(FORM, rng.beta(6, 3, size)) * 100 / FORM
+        sketches = [KLLSketch(args.k, rng) for _ in range(args.workers)]
+        for i, part in enumerate(np.array_split(scores, max(1, size // 1000))):
+            sketches[i % args.workers].update(part)
+        t0 = time.perf_counter()
+        view = KLLSketch(args.k, rng)
+        for sketch in sketches:
+            view.merge(sketch)
+        view.rank(0.0)     # builds the sorted view, as the first query after a sync does
+        merge_ms = (time.perf_counter() - t0) * 1000
+
+        exact = np.sort(scores)
+        grid = np.arange(FORM + 1) * 100 / FORM
+        error = max(abs(view.rank(v) - np.searchsorted(exact, v, side="left") / size) for v in grid)
+        probes = rng.choice(grid, 10_000)
+        t0 = time.perf_counter()
+        for v in probes:
+            view.rank(v)
+        rank_us = (time.perf_counter() - t0) / len(probes) * 1e6
+        print(f"{size:>9} {sum(map(len, view.levels)):>6} {error:>13.4f} {merge_ms:>9.2f} {rank_us:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
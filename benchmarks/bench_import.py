@@ -0,0 +1,92 @@
+"""Bulk import throughput and memory at 100k+ rows.
+
+    python benchmarks/bench_import.py [--rows 100000] [--dup-rate 0.05] [--workers 1,4]
+
+Writes a synthetic CSV (see ``bench_search.py``) in which ``--dup-rate`` of
+the rows are edited copies of earlier ones — a "[Practice]" prefix, or one
+word of the stem replaced — plus a few invalid rows, then imports it into
+an empty bank once per ``--workers`` setting, each in a fresh process.
+Reports wall time, peak RSS (the importer's plus, with a pool, that of its
+largest worker), and how many of the planted duplicates were caught (recall)
+versus flagged without being planted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_search import synthetic_rows  # noqa: E402
+from capm_sim.importer import import_rows, read_rows  # noqa: E402
+
+
+def write_csv(path: Path, rows: int, dup_rate: float, rng: random.Random) -> set[int]:
+    """Write the input; return the CSV line numbers of the planted duplicates."""
+    planted, written = set(), []
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        out = csv.writer(f)
+        out.writerow(["domain", "question", "option_a", "option_b", "option_c", "option_d", "correct", "explanation"])
+        for n, q in enumerate(synthetic_rows(rows, rng), 2):
+            if written and rng.random() < dup_rate:
+                q = dict(rng.choice(written))
+                words = q["question"].split()
+                if rng.random() < 0.5:
+                    q["question"] = "[Practice] " + q["question"]
+                else:
+                    words[rng.randrange(len(words))] = "revised"
+                    q["question"] = " ".join(words)
+                planted.add(n)
+            elif len(written) < 50_000:
+                written.append(q)
+            if n % 10_000 == 0:
+                q = {**q, "domain": "Sales"}     # invalid
+            out.writerow([q["domain"], q["question"], *q["options"], "ABCD"[q["correct"]], q["explanation"]])
+    return planted
+
+
+def run_import(source: Path, bank: Path, workers: int) -> None:
+    result = import_rows([(str(source), read_rows(source))], bank, workers)
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * (workers > 1)) * 1024
+    print(json.dumps({"seconds": result.seconds, "errors": len(result.errors), "imported": result.imported,
+                      "duplicates": [line for _, line, _, _ in result.duplicates], "peak": peak}))
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--dup-rate", type=float, default=0.05)
+    ap.add_argument("--workers", default="1,4")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--import", dest="run", nargs=3, metavar=("CSV", "BANK", "WORKERS"), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.run:
+        run_import(Path(args.run[0]), Path(args.run[1]), int(args.run[2]))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "import.csv"
+        planted = write_csv(source, args.rows, args.dup_rate, random.Random(args.seed))
+        print(f"{args.rows} rows, {source.stat().st_size / 2**20:.1f} MB CSV, {len(planted)} planted near-duplicates")
+        for workers in (int(w) for w in args.workers.split(",")):
+            bank = Path(tmp) / f"bank-{workers}.jsonl"
+            r = json.loads(subprocess.run([sys.executable, __file__, "--import", str(source), str(bank), str(workers)],
+                                          check=True, capture_output=True, text=True).stdout)
+            found = set(r["duplicates"])
+            print(f"{workers} worker(s): {r['seconds']:.1f}s, {r['errors']} invalid, {r['imported']} imported, "
+                  f"recall {len(found & planted) / max(len(planted), 1):.1%}, {len(found - planted)} unplanted, "
+                  f"peak RSS {r['peak'] / 2**20:.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Batch score-report throughput and memory for a large cohort.
+
+    python benchmarks/bench_reports.py [--attempts 20000] [--items 5000] [--workers 1,4]
+
+Generates a synthetic bank (see ``bench_search.py``), compiles it to a bank
+file, and stores ``--attempts`` submitted 150-item exams whose candidates
+answer each item correctly with their own ability, so the reports carry a
+realistic number of incorrect items.  The archive is then written once per
+``--workers`` setting, each in a fresh process, reporting wall time,
+reports per second, archive size and peak RSS (the parent's plus, with a
+pool, that of its largest worker).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_search import synthetic_rows  # noqa: E402
+from bench_study import compile_bank  # noqa: E402
+from capm_sim.exams import EXAM_LENGTH, ExamStore  # noqa: E402
+from capm_sim.reports import write_reports  # noqa: E402
+
+
+def store_attempts(path: Path, rows: list[dict], attempts: int, rng: random.Random) -> None:
+    exams = ExamStore(path)
+    try:
+        for _ in range(attempts):
+            form = rng.sample(rows, EXAM_LENGTH)
+            ability = rng.betavariate(6, 3)
+            answers = [q["correct"] if rng.random() < ability else rng.choice([None, (q["correct"] + 1) % 4])
+                       for q in form]
+            exam_id = exams.create([q["id"] for q in form])
+            exams.record(exam_id, answers, sum(a == q["correct"] for a, q in zip(answers, form)),
+                         candidate=rng.randbytes(16))
+    finally:
+        exams.close()
+
+
+def run_reports(db: Path, bank: Path, out: Path, workers: int) -> None:
+    exams = ExamStore(db)
+    stats = write_reports(exams, out, bank, workers=workers)
+    exams.close()
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * (workers > 1)) * 1024
+    print(json.dumps({"reports": stats.reports, "seconds": stats.seconds, "bytes": stats.bytes, "peak": peak}))
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--attempts", type=int, default=20_000)
+    ap.add_argument("--items", type=int, default=5_000)
+    ap.add_argument("--workers", default="1,4")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--render", nargs=4, metavar=("EXAMS", "BANK", "OUT", "WORKERS"), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.render:
+        run_reports(Path(args.render[0]), Path(args.render[1]), Path(args.render[2]), int(args.render[3]))
+        return 0
+
+    rng = random.Random(args.seed)
+    rows = list(synthetic_rows(args.items, rng))
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        compile_bank(rows, tmp).close()
+        db = tmp / "exams.sqlite3"
+        store_attempts(db, rows, args.attempts, rng)
+        print(f"{args.attempts} attempts on a {args.items}-item bank")
+        for workers in (int(w) for w in args.workers.split(",")):
+            out = tmp / f"reports-{workers}.zip"
+            r = json.loads(subprocess.run(
+                [sys.executable, __file__, "--render", str(db), str(tmp / "bank.bin"), str(out), str(workers)],
+                check=True, capture_output=True, text=True).stdout)
+            print(f"{workers} worker(s): {r['reports']} reports in {r['seconds']:.1f}s "
+                  f"({r['reports'] / r['seconds']:.0f}/s), archive {r['bytes'] / 2**20:.1f} MB, "
+                  f"peak RSS {r['peak'] / 2**20:.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Review search latency against a large synthetic bank.
+
+    python benchmarks/bench_search.py [--items 50000] [--rounds 200] [--target-ms 10]
+
+The bank is generated from the vocabulary of ``data/questions.jsonl``
+(words drawn with their real frequencies), so prefix and term selectivity
+resemble the real bank.  Each query class is timed as the Review screen
+issues it: a count plus the first page of 50 rows, with and without a
+domain filter, and once more at a deep offset.  The one-off cost of
+loading the index is reported separately.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from capm_sim.assembly import DOMAIN_WEIGHTS, apportion  # noqa: E402
+from capm_sim.bank import BANK_SOURCE, QuestionBank, build_bank, read_jsonl  # noqa: E402
+
+PAGE = 50
+
+
+def synthetic_rows(size: int, rng: random.Random):
+    vocab = Counter()
+    for q in read_jsonl(BANK_SOURCE):
+        vocab.update(re.findall(r"[a-z]+", " ".join([q["question"], *q["options"], q["explanation"]]).lower()))
+    words, weights = list(vocab), list(vocab.values())
+
+    def text(n: int) -> str:
+        return " ".join(rng.choices(words, weights, k=n)).capitalize()
+
+    n = 0
+    for domain, count in apportion(size, DOMAIN_WEIGHTS).items():
+        for _ in range(count):
+            n += 1
+            yield {"id": n, "domain": domain, "question": text(14) + "?",
+                   "options": [text(4) for _ in range(4)], "correct": n % 4, "explanation": text(24) + "."}
+
+
+def queries(bank_words: list[str], rng: random.Random) -> dict[str, list[str]]:
+    long = [w for w in bank_words if len(w) >= 5]
+    return {
+        "2-char prefix": [w[:2] for w in rng.choices(long, k=50)],
+        "3-char prefix": [w[:3] for w in rng.choices(long, k=50)],
+        "word": rng.choices(long, k=50),
+        "two terms": [f"{a} {b[:4]}" for a, b in zip(rng.choices(long, k=50), rng.choices(long, k=50))],
+        "three terms": [" ".join(w[:3] for w in rng.choices(long, k=3)) for _ in range(50)],
+    }
+
+
+def timed(bank: QuestionBank, text: str, domain: str | None, offset: int) -> tuple[float, int]:
+    t0 = time.perf_counter()
+    total, _ = bank.search(text, domain, offset, PAGE)
+    return (time.perf_counter() - t0) * 1000, total
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--items", type=int, default=50_000)
+    ap.add_argument("--rounds", type=int, default=200)
+    ap.add_argument("--target-ms", type=float, default=10.0)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "bank.sqlite3"
+        t0 = time.perf_counter()
+        build_bank(synthetic_rows(args.items, rng), db)
+        print(f"built {args.items} items with index in {time.perf_counter() - t0:.1f}s "
+              f"({db.stat().st_size / 2**20:.1f} MB)")
+        bank = QuestionBank(db)
+        t0 = time.perf_counter()
+        bank.index()
+        print(f"index loaded in {(time.perf_counter() - t0) * 1000:.0f} ms (once per process)")
+        words = sorted({w for q in read_jsonl(BANK_SOURCE) for w in re.findall(r"[a-z]+", q["question"].lower())})
+        domains = list(DOMAIN_WEIGHTS)
+        worst = 0.0
+        print(f"{'query':<16} {'filter':<18} {'hits p50':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        for name, texts in queries(words, rng).items():
+            for label, filtered, deep in (("none", False, False), ("domain", True, False),
+                                          ("none, deep page", False, True)):
+                times, hits = [], []
+                for _ in range(args.rounds):
+                    text, domain = rng.choice(texts), rng.choice(domains) if filtered else None
+                    ms, total = timed(bank, text, domain, 0)
+                    if deep and total > PAGE:
+                        ms, _ = timed(bank, text, domain, rng.randrange(total - PAGE + 1) // PAGE * PAGE)
+                    times.append(ms)
+                    hits.append(total)
+                times.sort()
+                hits.sort()
+                p95 = times[int(len(times) * 0.95)]
+                worst = max(worst, p95)
+                print(f"{name:<16} {label:<18} {hits[len(hits) // 2]:>9} {times[len(times) // 2]:>8.2f} "
+                      f"{p95:>8.2f} {times[-1]:>8.2f}")
+        bank.close()
+    print(f"worst p95 {worst:.2f} ms ({'within' if worst <= args.target_ms else 'OVER'} {args.target_ms:g} ms target)")
+    return 0 if worst <= args.target_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
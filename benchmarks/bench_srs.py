@@ -0,0 +1,91 @@
+"""Review-queue latency and storage at scale.
+
+    python benchmarks/bench_srs.py [--candidates 10000] [--cards 100] [--rounds 2000]
+
+Fills a fresh :class:`~capm_sim.srs.SRSStore` with ``candidates × cards``
+cards whose due times are spread over the past and next few months, then
+times the queries the Drill screen and the exam submit issue: the due
+count, one page of due cards, a graded review, and queueing the misses of
+one exam.  Storage is reported as bytes on disk per card (table + index).
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from capm_sim.srs import DAY, START_EASE, SRSStore, now_minutes  # noqa: E402
+
+
+def timed(label: str, rounds: int, fn) -> None:
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    print(f"{label:<20} p50 {times[len(times) // 2]:.3f} ms  p95 {times[int(len(times) * 0.95)]:.3f} ms  "
+          f"max {times[-1]:.3f} ms")
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--candidates", type=int, default=10_000)
+    ap.add_argument("--cards", type=int, default=100, help="cards per candidate")
+    ap.add_argument("--items", type=int, default=50_000, help="bank size items are drawn from")
+    ap.add_argument("--rounds", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+    rng = random.Random(args.seed)
+    now = now_minutes()
+    people = [uuid.UUID(int=rng.getrandbits(128)).bytes for _ in range(args.candidates)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "srs.sqlite3"
+        store = SRSStore(db)
+        con = store._con
+        t0 = time.perf_counter()
+        con.execute("BEGIN")
+        con.executemany("INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?)", (
+            (who, item, now + rng.randint(-60, 90) * DAY, rng.randint(0, 60), START_EASE + rng.randint(-80, 50),
+             rng.randint(0, 6), rng.randint(0, 3))
+            for who in people for item in rng.sample(range(1, args.items + 1), args.cards)))
+        con.execute("COMMIT")
+        con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        total = args.candidates * args.cards
+        size = db.stat().st_size
+        print(f"{total} cards for {args.candidates} candidates in {time.perf_counter() - t0:.1f}s  "
+              f"{size / 2**20:.1f} MB on disk, {size / total:.0f} bytes/card")
+
+        def due_page() -> None:
+            store.due(rng.choice(people), 20, now)
+
+        def counts() -> None:
+            store.counts(rng.choice(people), now)
+
+        def review() -> None:
+            who = rng.choice(people)
+            cards = store.due(who, 1, now)
+            if cards:
+                store.review(who, cards[0].item, rng.randint(0, 5), now)
+
+        def submit() -> None:
+            store.add(rng.choice(people), rng.sample(range(1, args.items + 1), 60), now)
+
+        timed("due page (20)", args.rounds, due_page)
+        timed("counts", args.rounds, counts)
+        timed("review", args.rounds, review)
+        timed("queue 60 misses", args.rounds // 10, submit)
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
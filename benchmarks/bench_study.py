@@ -0,0 +1,76 @@
+"""Building the question → study-section cross-reference at scale.
+
+    python benchmarks/bench_study.py [--items 50000] [--workers 1,4] [--changed 0.01]
+
+Generates a synthetic bank (see ``bench_search.py``), compiles it to a
+bank file, and times a full link build once per ``--workers`` setting.  It
+then edits a ``--changed`` fraction of the questions, swaps in the new bank
+file and times the incremental rebuild, which relinks only those.  Finally
+it times the per-row lookup the API does when annotating Results and
+Review rows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_search import synthetic_rows  # noqa: E402
+from capm_sim.bank import QuestionBank, build_bank  # noqa: E402
+from capm_sim.bankfile import MappedBank, write_bank_file  # noqa: E402
+from capm_sim.study import StudyIndex, build_study_index  # noqa: E402
+
+
+def compile_bank(rows: list[dict], tmp: Path) -> MappedBank:
+    db, binary = tmp / "bank.sqlite3", tmp / "bank.bin"
+    build_bank(rows, db)
+    bank = QuestionBank(db)
+    write_bank_file(bank, binary)
+    bank.close()
+    return MappedBank(binary)
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--items", type=int, default=50_000)
+    ap.add_argument("--workers", default="1,4")
+    ap.add_argument("--changed", type=float, default=0.01, help="fraction of questions edited before the rebuild")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+    rng = random.Random(args.seed)
+    rows = list(synthetic_rows(args.items, rng))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        out = tmp / "study.npz"
+        bank = compile_bank(rows, tmp)
+        for workers in (int(w) for w in args.workers.split(",")):
+            stats = build_study_index(bank, out, workers=workers, full=True)
+            print(f"full build, {workers} worker(s): {stats.items} questions, {stats.linked} linked "
+                  f"in {stats.seconds:.2f}s")
+
+        for row in rng.sample(rows, int(len(rows) * args.changed)):
+            row["question"] = "Edited: " + row["question"]
+        bank.close()
+        bank = compile_bank(rows, tmp)
+        stats = build_study_index(bank, out)
+        print(f"incremental rebuild: {stats.scored} of {stats.items} relinked in {stats.seconds:.2f}s")
+
+        index = StudyIndex(out)
+        ids = [r["id"] for r in rng.sample(rows, 150)]
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            index.annotate([{"id": i} for i in ids])
+        print(f"annotate 150 rows: {(time.perf_counter() - t0) / 1000 * 1e6:.1f} µs")
+        bank.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+"""Concurrent-candidate load test for the full exam flow.
+
+    python benchmarks/load_exam.py [--candidates 5000] [--ramp 60] [--think 0.2] [--workers 4]
+                                   [--out var/bench/load.json] [--compare baseline.json]
+
+Starts ``python -m capm_sim.server`` on a throwaway runtime directory
+seeded with a synthetic bank (so forms are full length), then runs N
+simulated candidates, all arriving within ``--ramp`` seconds.  Each one:
+
+* loads the shell and its hashed assets (``shell``);
+* starts an exam (``start``);
+* fetches question pages as it reaches them (``page``);
+* answers every item after an exponentially distributed think time,
+  flags ~10 % of them, and ships answer/flag/navigation events in journal
+  batches as the page does (``journal``);
+* submits its state and per-item times (``submit``).
+
+``--think`` is the mean think time per item; the real exam allows 72 s,
+the default compresses an exam into about half a minute.  The report gives
+p50/p95/p99 latency, request throughput and the server's resident memory
+(all processes) at the end of and peak during each stage.  Results are
+saved as JSON; ``--compare`` prints the change against an earlier run and
+exits 1 if a p95 or throughput moved by more than ``--tolerance``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+
+from capm_sim import ROOT  # noqa: E402
+from capm_sim.assembly import DOMAIN_WEIGHTS, apportion  # noqa: E402
+from capm_sim.bank import build_bank  # noqa: E402
+from capm_sim.journal import EV_ANSWER, EV_FLAG, EV_NAV  # noqa: E402
+from capm_sim.state import ExamState, encode_state  # noqa: E402
+
+STAGES = ("shell", "start", "page", "journal", "submit")
+FLAG_RATE = 0.1
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection, as a browser tab would hold."""
+
+    def __init__(self, port: int, accept: str = "br, gzip"):
+        self.port = port
+        self.accept = accept
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def request(self, method: str, path: str, body: bytes = b"",
+                      content_type: str = "application/json") -> tuple[int, bytes]:
+        for attempt in (0, 1):
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.open_connection("127.0.0.1", self.port)
+            head = (f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nAccept-Encoding: {self.accept}\r\n"
+                    f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n")
+            try:
+                self._writer.write(head.encode() + body)
+                status_line = await self._reader.readline()
+                if not status_line:
+                    raise ConnectionResetError
+                status = int(status_line.split()[1])
+                length = 0
+                while (line := await self._reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                return status, await self._reader.readexactly(length)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if attempt:
+                    raise
+        raise AssertionError("unreachable")
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latency: dict[str, list[float]] = {s: [] for s in STAGES}
+        self.errors: dict[str, int] = dict.fromkeys(STAGES, 0)
+        self.window: dict[str, list[float]] = {}
+        self.completed = 0
+
+    async def timed(self, stage: str, client: Client, method: str, path: str, body: bytes = b"",
+                    content_type: str = "application/json", ok: tuple[int, ...] = (200,)) -> bytes | None:
+        t0 = time.perf_counter()
+        try:
+            status, data = await client.request(method, path, body, content_type)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            status, data = 0, b""
+        t1 = time.perf_counter()
+        w = self.window.setdefault(stage, [t0, t1])
+        w[0], w[1] = min(w[0], t0), max(w[1], t1)
+        self.latency[stage].append((t1 - t0) * 1000)
+        if status not in ok:
+            self.errors[stage] += 1
+            return None
+        return data
+
+
+class MemorySampler:
+    """Resident set size of a process tree over time, read from ``/proc``."""
+
+    def __init__(self, pid: int, interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self.samples: list[tuple[float, int]] = []
+
+    def rss(self) -> int:
+        total, stack = 0, [self.pid]
+        while stack:
+            pid = stack.pop()
+            try:
+                for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                for task in Path(f"/proc/{pid}/task").iterdir():
+                    stack.extend(int(c) for c in (task / "children").read_text().split())
+            except (FileNotFoundError, ProcessLookupError):
+                continue
+        return total
+
+    async def run(self) -> None:
+        while True:
+            self.samples.append((time.perf_counter(), self.rss()))
+            await asyncio.sleep(self.interval)
+
+    def during(self, t0: float, t1: float) -> tuple[int, int]:
+        """Peak and last RSS sampled within ``[t0, t1]`` (falling back to the nearest sample)."""
+        inside = [rss for t, rss in self.samples if t0 <= t <= t1]
+        if not inside:
+            before = [rss for t, rss in self.samples if t <= t1] or [self.samples[0][1]]
+            inside = before[-1:]
+        return max(inside), inside[-1]
+
+
+async def candidate(rec: Recorder, port: int, delay: float, think: float, batch: int,
+                    assets: list[str], rng: random.Random) -> None:
+    await asyncio.sleep(delay)
+    client = Client(port)
+    try:
+        for path in ["/", *assets]:
+            await rec.timed("shell", client, "GET", path)
+        data = await rec.timed("start", client, "POST", "/api/exams", b"{}", ok=(201,))
+        if data is None:
+            return
+        exam = json.loads(data)
+        exam_id, total, size = exam["exam"], exam["total"], exam["page_size"]
+        state = ExamState([None] * total)
+        seconds = [0] * total
+        events, seq = bytearray(), 0
+
+        async def ship() -> None:
+            nonlocal events, seq
+            if events:
+                seq += 1
+                await rec.timed("journal", client, "POST", f"/api/exams/{exam_id}/journal?seq={seq}",
+                                bytes(events), "application/octet-stream", ok=(204,))
+                events = bytearray()
+
+        options: list[int] = []
+        for i in range(total):
+            if i % size == 0:
+                page = await rec.timed("page", client, "GET",
+                                       f"/api/exams/{exam_id}/questions?offset={i}&limit={size}")
+                if page is None:
+                    return
+                options = [len(q["options"]) for q in json.loads(page)["questions"]]
+            pause = rng.expovariate(1 / think) if think > 0 else 0.0
+            await asyncio.sleep(pause)
+            seconds[i] = round(pause)
+            choice = rng.randrange(options[i % size])
+            state.responses[i] = choice
+            events += bytes([EV_ANSWER]) + i.to_bytes(2, "little") + bytes([choice])
+            if rng.random() < FLAG_RATE:
+                state.flagged.add(i)
+                events += bytes([EV_FLAG]) + i.to_bytes(2, "little") + b"\x01"
+            if i + 1 < total:
+                events += bytes([EV_NAV]) + (i + 1).to_bytes(2, "little") + b"\x00"
+            if (i + 1) % batch == 0:
+                await ship()
+        await ship()
+        body = json.dumps({"state": encode_state(state), "seconds": seconds}).encode()
+        if await rec.timed("submit", client, "POST", f"/api/exams/{exam_id}/submit", body) is not None:
+            rec.completed += 1
+    finally:
+        client.close()
+
+
+def synthetic_bank(path: Path, size: int) -> None:
+    rows, n = [], 0
+    for domain, count in apportion(size, DOMAIN_WEIGHTS).items():
+        for _ in range(count):
+            n += 1
+            rows.append({"id": n, "domain": domain, "question": f"Synthetic question {n}?",
+                         "options": [f"Option {c}" for c in "ABCD"], "correct": n % 4,
+                         "explanation": "Synthetic item for load testing."})
+    build_bank(rows, path)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(port: int, proc: subprocess.Popen, timeout: float = 60.0) -> list[str]:
+    """Wait for the server to answer; return the asset URLs referenced by the shell."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with {proc.returncode}")
+        client = Client(port, accept="identity")
+        try:
+            status, body = await client.request("GET", "/")
+            if status == 200:
+                return sorted(set(re.findall(r'(?:src|href)="(/assets/[^"]+)"', body.decode("utf-8", "replace"))))
+        except OSError:
+            pass
+        finally:
+            client.close()
+        await asyncio.sleep(0.2)
+    raise SystemExit("server did not start")
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    a = np.asarray(values)
+    p50, p95, p99 = np.percentile(a, [50, 95, 99])
+    return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2),
+            "max": round(float(a.max()), 2)}
+
+
+async def run(args: argparse.Namespace) -> dict:
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    with tempfile.TemporaryDirectory(prefix="capm-load-") as tmp:
+        var = Path(tmp)
+        synthetic_bank(var / "bank.sqlite3", args.bank_size)
+        port = args.port or free_port()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "capm_sim.server", "--port", str(port), "--workers", str(args.workers),
+             "--var", str(var)], cwd=ROOT)
+        try:
+            assets = await wait_ready(port, proc)
+            sampler = MemorySampler(proc.pid)
+            idle_rss = sampler.rss()
+            sampling = asyncio.create_task(sampler.run())
+            rec = Recorder()
+            rng = random.Random(args.seed)
+            t0 = time.perf_counter()
+            await asyncio.gather(*(
+                candidate(rec, port, rng.uniform(0, args.ramp), args.think, args.batch, assets,
+                          random.Random(rng.random()))
+                for _ in range(args.candidates)))
+            elapsed = time.perf_counter() - t0
+            sampling.cancel()
+            peak_rss = sampler.rss()
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    stages = {}
+    for stage in STAGES:
+        t_start, t_end = rec.window.get(stage, (t0, t0))
+        peak, last = sampler.during(t_start, t_end)
+        n = len(rec.latency[stage])
+        stages[stage] = {"requests": n, "errors": rec.errors[stage], **percentiles(rec.latency[stage]),
+                         "rps": round(n / max(t_end - t_start, 1e-9), 1),
+                         "rss_peak_mb": round(peak / 2**20, 1), "rss_end_mb": round(last / 2**20, 1)}
+    requests = sum(len(v) for v in rec.latency.values())
+    return {
+        "meta": {"when": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "rev": git_rev(), "python": platform.python_version(),
+                 "host": platform.node(), "cpus": os.cpu_count(),
+                 **{k: v for k, v in vars(args).items() if k not in ("out", "compare", "tolerance")}},
+        "total": {"candidates": args.candidates, "completed": rec.completed, "seconds": round(elapsed, 2),
+                  "requests": requests, "errors": sum(rec.errors.values()),
+                  "rps": round(requests / elapsed, 1), "exams_per_min": round(rec.completed / elapsed * 60, 1),
+                  **percentiles([x for v in rec.latency.values() for x in v]),
+                  "rss_idle_mb": round(idle_rss / 2**20, 1),
+                  "rss_peak_mb": round(max([peak_rss, *(r for _, r in sampler.samples)]) / 2**20, 1)},
+        "stages": stages,
+    }
+
+
+def git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(result: dict) -> None:
+    t = result["total"]
+    print(f"{t['completed']}/{t['candidates']} exams in {t['seconds']}s  {t['requests']} requests "
+          f"({t['errors']} errors)  {t['rps']} req/s  {t['exams_per_min']} exams/min  "
+          f"RSS {t['rss_idle_mb']} -> {t['rss_peak_mb']} MB")
+    print(f"{'stage':<8} {'requests':>9} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'req/s':>8} {'RSS peak':>9} {'RSS end':>8}")
+    for name, s in result["stages"].items():
+        print(f"{name:<8} {s['requests']:>9} {s['errors']:>7} {s['p50']:>8.1f} {s['p95']:>8.1f} {s['p99']:>8.1f} "
+              f"{s['rps']:>8.1f} {s['rss_peak_mb']:>9.1f} {s['rss_end_mb']:>8.1f}")
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> bool:
+    """Print deltas against *baseline*; return ``True`` if nothing regressed past *tolerance*."""
+    ok = True
+    print(f"\nvs {baseline['meta'].get('rev')} ({baseline['meta'].get('when')}):")
+    params = ("candidates", "ramp", "think", "batch", "workers", "bank_size")
+    differ = [p for p in params if result["meta"].get(p) != baseline["meta"].get(p)]
+    if differ:
+        print(f"  note: runs differ in {', '.join(differ)}; throughput is not comparable")
+    rows = [("total", result["total"], baseline["total"])]
+    rows += [(s, result["stages"][s], baseline["stages"].get(s)) for s in STAGES]
+    for name, new, old in rows:
+        if not old:
+            continue
+        cells = []
+        for metric, worse_if_higher in (("p95", True), ("p99", True), ("rps", False), ("rss_peak_mb", True)):
+            a, b = old.get(metric), new.get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            bad = change > tolerance if worse_if_higher else change < -tolerance
+            ok &= not bad
+            cells.append(f"{metric} {a:g} -> {b:g} ({change:+.0%}){' !' if bad else ''}")
+        print(f"  {name:<8} " + "  ".join(cells))
+    return ok
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--candidates", type=int, default=500)
+    ap.add_argument("--ramp", type=float, default=10.0, help="seconds over which candidates arrive")
+    ap.add_argument("--think", type=float, default=0.2, help="mean seconds per item (72 = real pace)")
+    ap.add_argument("--batch", type=int, default=8, help="items per journal batch")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--bank-size", type=int, default=2000)
+    ap.add_argument("--port", type=int, default=0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", type=Path, default=ROOT / "var" / "bench" / f"load-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    ap.add_argument("--compare", type=Path, help="earlier result to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (0.2 = 20%%)")
+    args = ap.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(result, indent=1))
+    print(f"saved {args.out}")
+    if args.compare and not compare(result, json.loads(args.compare.read_text()), args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
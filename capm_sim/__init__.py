@@ -0,0 +1,13 @@
+"""Python tooling for the CAPM® exam simulator.
+
+The simulator itself is the single-page app in ``main.py`` at the repository
+root.  This package holds everything that runs outside the browser: the
+ahead-of-time build, and the services the page talks to.
+"""
+
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_SHELL = ROOT / "main.py"
+
+__all__ = ["ROOT", "APP_SHELL"]
@@ -0,0 +1,248 @@
+"""Computerized-adaptive practice under a two-parameter logistic (2PL) model.
+
+Item parameters are calibrated from the item-analysis checkpoint
+(:mod:`capm_sim.itemstats`) with the classical approximations
+
+    a = 1.702 · r_bis / √(1 - r_bis²)        b = Φ⁻¹(1 - p) / r_bis
+
+and saved to ``var/irt.npz``::
+
+    python -m capm_sim.adaptive calibrate
+
+Items without enough responses keep the defaults ``a = 1, b = 0``.
+
+:class:`AdaptiveEngine` evaluates the model once, at startup, on a fixed
+ability grid: ``log P`` and ``log Q`` tables for the posterior, and for
+every (domain, grid point) the domain's items ordered by Fisher
+information.  Per answer, the EAP estimate is one gather-and-sum over the
+answered rows, and the next item is the first unused entry of one
+precomputed order — the domain most behind its ``DOMAIN_WEIGHTS`` share,
+at the grid point nearest the estimate, picked at random among the top
+few for exposure control.  Nothing scans the bank.
+
+A session stops once the posterior probability of being above the cut
+score (the ability whose expected blueprint score is ``PASS_PCT``) is
+beyond :data:`CONFIDENCE` either way, after at least :data:`MIN_ITEMS`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+
+from . import ROOT
+from .assembly import DOMAIN_WEIGHTS
+from .bank import BANK_DB, DOMAINS, QuestionBank
+from .exams import EXAM_LENGTH, EXAMS_DB, PASS_PCT
+from .itemstats import CHECKPOINT, ItemStats
+from .scoring import AnswerKey
+
+__all__ = ["IRT_PARAMS", "AdaptiveEngine", "Estimate", "ItemParams", "PracticeStore", "calibrate"]
+
+IRT_PARAMS = ROOT / "var" / "irt.npz"
+GRID = np.linspace(-4.0, 4.0, 81)
+MIN_ITEMS = 20
+MAX_ITEMS = EXAM_LENGTH
+CONFIDENCE = 0.95
+TOP_K = 5
+MIN_CALIBRATION = 100   # responses an item needs before its statistics are trusted
+
+_NORMAL = NormalDist()
+
+
+@dataclass
+class ItemParams:
+    ids: np.ndarray   # int64, ascending
+    a: np.ndarray     # float64 discrimination
+    b: np.ndarray     # float64 difficulty
+
+    @classmethod
+    def default(cls, ids: np.ndarray) -> "ItemParams":
+        return cls(ids, np.ones(len(ids)), np.zeros(len(ids)))
+
+    @classmethod
+    def load(cls, path: Path, ids: np.ndarray) -> "ItemParams":
+        """Parameters for *ids* from *path*; items it does not cover get the defaults."""
+        params = cls.default(ids)
+        if not path.exists():
+            return params
+        with np.load(path) as data:
+            old_ids, a, b = data["ids"], data["a"], data["b"]
+        if len(old_ids):
+            pos = np.searchsorted(old_ids, ids).clip(0, len(old_ids) - 1)
+            hit = old_ids[pos] == ids
+            params.a[hit], params.b[hit] = a[pos[hit]], b[pos[hit]]
+        return params
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, ids=self.ids, a=self.a, b=self.b)
+        os.replace(tmp, path)
+
+
+def calibrate(stats: ItemStats, min_responses: int = MIN_CALIBRATION) -> tuple[ItemParams, int]:
+    """2PL parameters from p-values and point-biserials; return them and how many items were calibrated."""
+    params = ItemParams.default(stats.ids)
+    p, rpb = stats.p_value(), stats.point_biserial()
+    ok = (stats.n >= min_responses) & (p > 0.02) & (p < 0.98) & (rpb > 0.05)
+    p, rpb = p[ok], rpb[ok]
+    threshold = np.array([_NORMAL.inv_cdf(1 - x) for x in p])
+    density = np.exp(-threshold ** 2 / 2) / np.sqrt(2 * np.pi)
+    biserial = np.clip(rpb * np.sqrt(p * (1 - p)) / density, 0.05, 0.95)
+    params.a[ok] = np.clip(1.702 * biserial / np.sqrt(1 - biserial ** 2), 0.2, 3.0)
+    params.b[ok] = np.clip(threshold / biserial, -4.0, 4.0)
+    return params, int(ok.sum())
+
+
+@dataclass
+class Estimate:
+    theta: float
+    se: float
+    p_pass: float
+    decision: str | None     # "pass" / "fail" once the session can stop
+
+    def as_dict(self) -> dict:
+        return {"theta": round(self.theta, 3), "se": round(self.se, 3), "p_pass": round(self.p_pass, 4),
+                "decision": self.decision}
+
+
+class AdaptiveEngine:
+    def __init__(self, key: AnswerKey, params: ItemParams):
+        if not np.array_equal(key.ids, params.ids):
+            raise ValueError("parameters do not match the answer key")
+        self.key = key
+        a, b = params.a[:, None], params.b[:, None]
+        prob = 1.0 / (1.0 + np.exp(-a * (GRID - b)))
+        self.log_p = np.log(prob).astype(np.float32)
+        self.log_q = np.log1p(-prob).astype(np.float32)
+        prior = np.exp(-GRID ** 2 / 2)
+        self.log_prior = np.log(prior / prior.sum())
+
+        info = a * a * prob * (1 - prob)
+        total = sum(DOMAIN_WEIGHTS.values())
+        self.weights = np.array([DOMAIN_WEIGHTS.get(d, 0) / total for d in DOMAINS])
+        self.order: dict[int, np.ndarray] = {}   # domain -> (grid, items in domain) rows, most informative first
+        expected = np.zeros(len(GRID))
+        for d in range(len(DOMAINS)):
+            rows = np.flatnonzero(key.domain == d)
+            if not len(rows):
+                continue
+            self.order[d] = rows[np.argsort(-info[rows].T, axis=1, kind="stable")].astype(np.int32)
+            expected += self.weights[d] * prob[rows].mean(axis=0)
+        expected /= sum(self.weights[d] for d in self.order) or 1.0
+        # The test characteristic curve is increasing, so the cut score is one interpolation.
+        self.cut = float(np.interp(PASS_PCT / 100, expected, GRID))
+
+    @classmethod
+    def from_bank(cls, bank: QuestionBank, params_path: Path = IRT_PARAMS) -> "AdaptiveEngine":
+        key = AnswerKey.from_bank(bank)
+        return cls(key, ItemParams.load(params_path, key.ids))
+
+    def estimate(self, rows: np.ndarray, correct: np.ndarray) -> Estimate:
+        """EAP ability estimate after answering key *rows* with *correct* (bool) outcomes."""
+        log_post = self.log_prior + self.log_p[rows[correct]].sum(axis=0) + self.log_q[rows[~correct]].sum(axis=0)
+        post = np.exp(log_post - log_post.max())
+        post /= post.sum()
+        theta = float(post @ GRID)
+        se = float(np.sqrt(post @ (GRID - theta) ** 2))
+        p_pass = float(post[GRID >= self.cut].sum())
+        decision = None
+        if (len(rows) >= MIN_ITEMS and max(p_pass, 1 - p_pass) >= CONFIDENCE) or len(rows) >= MAX_ITEMS:
+            decision = "pass" if p_pass >= 0.5 else "fail"
+        return Estimate(theta, se, p_pass, decision)
+
+    def select(self, rows: np.ndarray, theta: float, rng: np.random.Generator) -> int | None:
+        """Key row of the next item, or ``None`` once every domain is used up."""
+        used = set(rows.tolist())
+        counts = np.bincount(self.key.domain[rows], minlength=len(DOMAINS))
+        deficit = self.weights * (len(rows) + 1) - counts
+        g = int(np.abs(GRID - theta).argmin())
+        for d in sorted(self.order, key=lambda d: -deficit[d]):
+            candidates = []
+            for row in self.order[d][g]:
+                if int(row) not in used:
+                    candidates.append(int(row))
+                    if len(candidates) == TOP_K:
+                        break
+            if candidates:
+                return candidates[rng.integers(len(candidates))]
+        return None
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS practice (
+    id      TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    items   TEXT NOT NULL,   -- JSON array of question ids, in the order given
+    choices TEXT NOT NULL    -- JSON array of chosen options, one per answered item
+);
+"""
+
+
+class PracticeStore:
+    """Adaptive practice sessions, kept beside the exams so any worker can continue one."""
+
+    def __init__(self, db_path: Path = EXAMS_DB):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._con = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._con.close()
+
+    def create(self, first_item: int) -> str:
+        session = uuid.uuid4().hex
+        self._con.execute("INSERT INTO practice VALUES (?, ?, ?, '[]')",
+                          (session, time.time(), json.dumps([first_item])))
+        return session
+
+    def get(self, session: str) -> tuple[list[int], list[int]]:
+        """``(items, choices)`` of *session*; ``KeyError`` if unknown."""
+        row = self._con.execute("SELECT items, choices FROM practice WHERE id = ?", (session,)).fetchone()
+        if row is None:
+            raise KeyError(session)
+        return json.loads(row[0]), json.loads(row[1])
+
+    def save(self, session: str, items: list[int], choices: list[int]) -> bool:
+        """Store one more answer; ``False`` if another request answered first."""
+        cur = self._con.execute(
+            "UPDATE practice SET items = ?, choices = ? WHERE id = ? AND json_array_length(choices) = ?",
+            (json.dumps(items), json.dumps(choices), session, len(choices) - 1))
+        return cur.rowcount == 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m capm_sim.adaptive")
+    ap.add_argument("command", choices=["calibrate"])
+    ap.add_argument("--bank", type=Path, default=BANK_DB)
+    ap.add_argument("--stats", type=Path, default=CHECKPOINT)
+    ap.add_argument("--out", type=Path, default=IRT_PARAMS)
+    ap.add_argument("--min-responses", type=int, default=MIN_CALIBRATION)
+    args = ap.parse_args(argv)
+
+    bank = QuestionBank.open(args.bank)
+    try:
+        key = AnswerKey.from_bank(bank)
+    finally:
+        bank.close()
+    params, fitted = calibrate(ItemStats.load(args.stats, key), args.min_responses)
+    params.save(args.out)
+    print(f"{fitted}/{len(params.ids)} items calibrated -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
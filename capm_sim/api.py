@@ -0,0 +1,372 @@
+"""JSON API used by the app shell."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import math
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from .adaptive import IRT_PARAMS, MAX_ITEMS, AdaptiveEngine, PracticeStore
+from .assembly import Assembler, InsufficientItems
+from .bank import DOMAINS
+from .bankfile import MappedBank
+from .cohort import Cohort
+from .exams import EXAM_LENGTH, EXAM_SECONDS, GRACE_SECONDS, ExamStore, form_seconds
+from .journal import Journal, JournalError
+from .scoring import AnswerKey, pad, score_attempts, score_batch
+from .server import App, HTTPError, Request, Response
+from .srs import SRSStore, candidate_key
+from .study import StudyIndex
+from .telemetry import Telemetry, load_snapshots, summary
+from .state import MAX_OPTION, StateError, decode_state, encode_state
+
+__all__ = ["PAGE_SIZE", "install"]
+
+PAGE_SIZE = 10
+MAX_PAGE = 50
+MAX_BATCH = 5000
+# A 150-item attempt is ~1.2 KB of JSON (ids plus the encoded state); the batch route's body limit allows 2 KiB each.
+MAX_BATCH_BODY = MAX_BATCH * 2048
+MAX_ITEM_SECONDS = EXAM_SECONDS + GRACE_SECONDS
+MAX_QUERY = 200
+MAX_MARKS = 1000
+# The only marks the page sends; anything else would open series in the table server profiling shares.
+CLIENT_MARKS = frozenset({"app.boot", "exam.dwell", "exam.nav", "exam.ready", "timer.tick_lag",
+                          *(f"screen.{s}" for s in ("drill", "exam", "home", "practice", "results", "review", "study"))})
+
+
+def _int(request: Request, name: str, default: int, lo: int = 0, hi: int | None = None) -> int:
+    try:
+        value = int(request.query.get(name, default))
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer") from None
+    if value < lo or (hi is not None and value > hi):
+        raise HTTPError(400, f"{name} out of range")
+    return value
+
+
+def _object(request: Request) -> dict:
+    """The request's JSON object body (``{}`` when there is none); 400 for any other JSON value."""
+    body = request.json()
+    if body is None:
+        return {}
+    if not isinstance(body, dict):
+        raise HTTPError(400, "request body must be a JSON object")
+    return body
+
+
+def _queued(value: object) -> list[tuple[int, bytes]]:
+    """The journal batches a late submit carries: ``{"until": seq, "batches": [[seq, base64 events], ...]}``.
+
+    *until* is the client's seq when its timer ran out; batches cut after it are dropped.
+    """
+    if value is None:
+        return []
+    try:
+        until, batches = value["until"], value["batches"]
+        if type(until) is not int or not isinstance(batches, list):
+            raise TypeError
+        out = []
+        for seq, events in batches:
+            if type(seq) is not int or not 0 < seq <= 0xFFFFFFFF or not isinstance(events, str):
+                raise TypeError
+            if seq <= until:
+                out.append((seq, base64.b64decode(events, validate=True)))
+        return out
+    except (TypeError, KeyError, ValueError, binascii.Error):
+        raise HTTPError(400, "journal must give until and a list of [seq, base64 events] batches") from None
+
+
+def install(app: App, bank: MappedBank, exams: ExamStore, journal: Journal, practice: PracticeStore,
+            srs: SRSStore, study: StudyIndex, cohort: Cohort, telemetry: Telemetry,
+            irt_params: Path = IRT_PARAMS) -> None:
+    """Register the exam, practice and question-bank routes on *app*."""
+    rng = np.random.default_rng()
+    assembler: Assembler
+    key: AnswerKey
+    engine: AdaptiveEngine
+    form_length: int
+
+    def load() -> None:
+        # Everything derived from the bank; rebuilt on the swap thread when a new bank file is swapped in,
+        # and published together once built so requests never mix the old and new.
+        nonlocal assembler, key, engine, form_length
+        new = Assembler.from_bank(bank)
+        assembler, key, engine, form_length = (new, AnswerKey.from_bank(bank),
+                                               AdaptiveEngine.from_bank(bank, irt_params),
+                                               min(EXAM_LENGTH, new.capacity()))
+
+    load()
+    bank.on_swap(load)
+
+    def form(exam_id: str) -> list[int]:
+        try:
+            return exams.items(exam_id)
+        except KeyError:
+            raise HTTPError(404, "unknown exam") from None
+
+    def candidate(value: object) -> bytes:
+        if isinstance(value, str):
+            try:
+                return candidate_key(value)
+            except ValueError:
+                pass
+        raise HTTPError(400, "candidate must be 32 hex digits")
+
+    def open_exam(exam_id: str, late_ok: bool = False) -> bool:
+        """404/409 unless *exam_id* exists and still accepts work; whether it is past its deadline and grace.
+
+        Only a submit passes *late_ok*: an attempt finished offline may reach us long after time ran out.
+        """
+        try:
+            remaining = exams.remaining(exam_id)
+        except KeyError:
+            raise HTTPError(404, "unknown exam") from None
+        if exams.submitted(exam_id):
+            raise HTTPError(409, "exam already submitted")
+        late = remaining < -GRACE_SECONDS
+        if late and not late_ok:
+            raise HTTPError(409, "exam time has expired")
+        return late
+
+    @app.route("GET", "/api/exams")
+    async def exam_form(request: Request) -> Response:
+        # What a new exam will be, for the Home screen: forms are shorter (and shorter-timed) on a small bank.
+        return Response.json({"total": form_length, "duration": form_seconds(form_length)})
+
+    @app.route("POST", "/api/exams")
+    async def start_exam(request: Request) -> Response:
+        body = _object(request)
+        seed, exclude = body.get("seed"), body.get("exclude", [])
+        if not (seed is None or isinstance(seed, int)) or not (
+                isinstance(exclude, list) and all(isinstance(i, int) for i in exclude)):
+            raise HTTPError(400, "seed must be an integer and exclude a list of ids")
+        try:
+            items = assembler.assemble(form_length, seed, exclude).items
+        except InsufficientItems as e:
+            raise HTTPError(409, str(e)) from None
+        seconds = form_seconds(len(items))
+        exam_id = exams.create(items, seconds)
+        return Response.json({"exam": exam_id, "total": len(items), "items": items, "page_size": PAGE_SIZE,
+                              "duration": seconds, "seconds": seconds}, 201)
+
+    @app.route("GET", "/api/exams/{exam}/questions")
+    async def exam_questions(request: Request) -> Response:
+        with telemetry.timed("server.questions"):
+            items = form(request.params["exam"])
+            offset = _int(request, "offset", 0)
+            limit = _int(request, "limit", PAGE_SIZE, 1, MAX_PAGE)
+            return Response.json({"offset": offset, "questions": bank.public(items[offset:offset + limit])})
+
+    @app.route("POST", "/api/exams/{exam}/submit")
+    async def submit_exam(request: Request) -> Response:
+        exam_id = request.params["exam"]
+        late = open_exam(exam_id, late_ok=True)
+        items = form(exam_id)
+        body = _object(request)
+        payload, seconds = body.get("state"), body.get("seconds")
+        who = candidate(body["candidate"]) if body.get("candidate") is not None else None
+        if seconds is not None and not (isinstance(seconds, list) and len(seconds) == len(items)
+                                        and all(isinstance(s, int) and 0 <= s <= MAX_ITEM_SECONDS
+                                                for s in seconds)):
+            raise HTTPError(400, "seconds must list whole seconds for every item")
+        if late:
+            # Journal writes are refused once the exam expires, so batches the client queued offline before its
+            # timer ran out never reached the log: fold them in first, then score what the log recorded.
+            try:
+                for seq, events in sorted(_queued(body.get("journal"))):
+                    journal.append(exam_id, seq, events)
+            except JournalError as e:
+                raise HTTPError(400, str(e)) from None
+        if payload is None or late:
+            # No client state (e.g. it crashed), or it came after time ran out: submit what the journal recorded.
+            answers = journal.replay(exam_id, len(items)).state.responses
+        elif isinstance(payload, str):
+            try:
+                answers = decode_state(payload, len(items)).responses
+            except StateError as e:
+                raise HTTPError(400, str(e)) from None
+        else:
+            raise HTTPError(400, "state must be a string")
+        # One key for the whole request (a bank swap may replace it meanwhile); items retired from the bank
+        # since the exam was assembled are left out of the score.
+        current = key
+        form_ids, chosen = pad([items]), pad([answers])
+        current.retire(form_ids)
+        with telemetry.timed("server.score"):
+            (score,) = score_batch(current, form_ids, chosen).as_dicts()
+            exams.record(exam_id, answers, score["correct"], seconds, who)
+        journal.discard(exam_id)
+        percentile = cohort.record(score)
+        if who is not None:
+            # Missed and skipped items feed the candidate's review queue.
+            rows = current.index(form_ids[0])
+            known = rows >= 0
+            missed = form_ids[0][known][current.correct[rows[known]] != chosen[0][known]]
+            srs.add(who, missed.tolist())
+        questions = bank.full(items)
+        result = {**score, "percentile": percentile, "questions": study.annotate(questions), "late": late}
+        if late or len(questions) != len(items):
+            # What was scored, in the order of *questions*: the journal's answers, or fewer items than the form.
+            kept = {q["id"] for q in questions}
+            result["answers"] = [a for i, a in zip(items, answers) if i in kept]
+        return Response.json(result)
+
+    @app.route("POST", "/api/exams/{exam}/journal")
+    async def journal_write(request: Request) -> Response:
+        exam_id = request.params["exam"]
+        seq = _int(request, "seq", 0, 1, 0xFFFFFFFF)
+        open_exam(exam_id)
+        try:
+            with telemetry.timed("server.journal"):
+                journal.append(exam_id, seq, request.body)
+        except JournalError as e:
+            raise HTTPError(400, str(e)) from None
+        return Response(status=204)
+
+    @app.route("GET", "/api/exams/{exam}/resume")
+    async def resume_exam(request: Request) -> Response:
+        exam_id = request.params["exam"]
+        open_exam(exam_id)
+        items = form(exam_id)
+        replay = journal.replay(exam_id, len(items))
+        return Response.json({"exam": exam_id, "total": len(items), "items": items, "page_size": PAGE_SIZE,
+                              "duration": form_seconds(len(items)), "seconds": max(0.0, exams.remaining(exam_id)),
+                              "state": encode_state(replay.state), "current": replay.current,
+                              "seq": replay.seq})
+
+    @app.route("POST", "/api/scoring/batch", max_body=MAX_BATCH_BODY)
+    async def score_many(request: Request) -> Response:
+        attempts = _object(request).get("attempts")
+        if not isinstance(attempts, list) or len(attempts) > MAX_BATCH:
+            raise HTTPError(400, f"attempts must be a list of at most {MAX_BATCH}")
+        pairs = []
+        for row, a in enumerate(attempts):
+            items = a.get("items") if isinstance(a, dict) else None
+            if not isinstance(items, list) or not isinstance(a.get("state"), str):
+                raise HTTPError(400, "each attempt needs items and state")
+            # Ids go into an int64 matrix where -1 is padding: 1.5 would score as item 1, -3 as no item.
+            if not all(type(i) is int and 0 < i < 1 << 63 for i in items):
+                raise HTTPError(400, f"attempt {row}: item ids must be positive integers")
+            try:
+                pairs.append((items, decode_state(a["state"], len(items)).responses))
+            except StateError as e:
+                raise HTTPError(400, str(e)) from None
+        try:
+            return Response.json({"scores": score_attempts(key, pairs).as_dicts()})
+        except KeyError:
+            raise HTTPError(400, "attempt references unknown items") from None
+
+    @app.route("POST", "/api/practice")
+    async def start_practice(request: Request) -> Response:
+        none = np.zeros(0, np.int64)
+        first = int(engine.key.ids[engine.select(none, 0.0, rng)])
+        session = practice.create(first)
+        return Response.json({"session": session, "max": MAX_ITEMS, "answered": 0,
+                              "question": bank.public([first])[0],
+                              **engine.estimate(none, np.zeros(0, bool)).as_dict()}, 201)
+
+    @app.route("POST", "/api/practice/{session}/answer")
+    async def practice_answer(request: Request) -> Response:
+        session = request.params["session"]
+        try:
+            items, choices = practice.get(session)
+        except KeyError:
+            raise HTTPError(404, "unknown practice session") from None
+        body = _object(request)
+        choice = body.get("choice")
+        if not isinstance(choice, int) or not 0 <= choice <= MAX_OPTION:
+            raise HTTPError(400, "choice must be an option index")
+        if len(choices) == len(items) or body.get("item") != items[len(choices)]:
+            raise HTTPError(409, "that item is not the one awaiting an answer")
+        choices.append(choice)
+        # One engine for the whole request (a bank swap may replace it meanwhile); items retired from the
+        # bank during the session are left out of the estimate.
+        current = engine
+        ids = np.array(items, np.int64)
+        known = np.isin(ids, current.key.ids)
+        rows = current.key.index(ids[known])
+        correct = current.key.correct[rows] == np.array(choices)[known]
+        estimate = current.estimate(rows, correct)
+        following = current.select(rows, estimate.theta, rng) if len(rows) < MAX_ITEMS else None
+        if following is not None:
+            items.append(int(current.key.ids[following]))
+        if not practice.save(session, items, choices):
+            raise HTTPError(409, "that item has already been answered")
+        answered = bank.full([items[len(choices) - 1]]) if known[-1] else []
+        graded = {"correct": bool(correct[-1]), "answer": answered[0]["correct"],
+                  "explanation": answered[0]["explanation"]} if answered else \
+            {"correct": None, "answer": None, "explanation": None, "retired": True}
+        return Response.json({**graded, "answered": len(choices), **estimate.as_dict(),
+                              "next": bank.public([items[-1]])[0] if following is not None else None})
+
+    @app.route("GET", "/api/srs/{candidate}")
+    async def srs_due(request: Request) -> Response:
+        who = candidate(request.params["candidate"])
+        limit = _int(request, "limit", 20, 0, MAX_PAGE)
+        due, upcoming = srs.counts(who)
+        cards = srs.due(who, limit) if limit else []
+        rows = {q["id"]: q for q in bank.full([c.item for c in cards])}
+        return Response.json({"due": due, "next": None if upcoming is None else upcoming * 60,
+                              "cards": [{**c.as_dict(), "question": rows[c.item]} for c in cards if c.item in rows]})
+
+    @app.route("POST", "/api/srs/{candidate}/review")
+    async def srs_review(request: Request) -> Response:
+        who = candidate(request.params["candidate"])
+        body = _object(request)
+        item, quality = body.get("item"), body.get("quality")
+        if not isinstance(item, int) or not isinstance(quality, int) or not 0 <= quality <= 5:
+            raise HTTPError(400, "item must be an id and quality 0-5")
+        try:
+            return Response.json(srs.review(who, item, quality).as_dict())
+        except KeyError:
+            raise HTTPError(404, "no such card") from None
+
+    @app.route("GET", "/api/questions")
+    async def review_questions(request: Request) -> Response:
+        domain = request.query.get("domain") or None
+        if domain is not None and domain not in DOMAINS:
+            raise HTTPError(400, "unknown domain")
+        offset = _int(request, "offset", 0)
+        limit = _int(request, "limit", MAX_PAGE, 1, MAX_PAGE)
+        with telemetry.timed("server.search"):
+            total, rows = bank.search(request.query.get("q", "")[:MAX_QUERY], domain, offset, limit)
+        study.annotate(rows)
+        held = exams.held([r["id"] for r in rows], time.time() - GRACE_SECONDS)
+        # Until every form an item is on has been submitted or run out of time, its key (and what points at it)
+        # stays hidden: otherwise a candidate could look answers up in the middle of an exam.
+        for row in rows:
+            if row["id"] in held:
+                row["correct"] = row["explanation"] = row["study"] = None
+        return Response.json({"offset": offset, "total": total, "questions": rows})
+
+    @app.route("POST", "/api/telemetry")
+    async def telemetry_marks(request: Request) -> Response:
+        marks = _object(request).get("marks")
+        if not isinstance(marks, list) or len(marks) > MAX_MARKS:
+            raise HTTPError(400, f"marks must be a list of at most {MAX_MARKS}")
+        series: dict[str, list[float]] = defaultdict(list)
+        for mark in marks:
+            if not (isinstance(mark, list) and len(mark) == 2 and isinstance(mark[0], str)
+                    and isinstance(mark[1], (int, float)) and math.isfinite(mark[1]) and mark[1] >= 0):
+                raise HTTPError(400, "each mark must be [name, milliseconds]")
+            if mark[0] not in CLIENT_MARKS:
+                raise HTTPError(400, f"unknown mark {mark[0][:64]!r}")
+            series["client." + mark[0]].append(mark[1])
+        for name, values in series.items():
+            telemetry.observe(name, values)
+        return Response(status=204)
+
+    @app.route("GET", "/api/telemetry")
+    async def telemetry_report(request: Request) -> Response:
+        telemetry.flush()
+        if telemetry.directory is None:
+            merged, dropped = telemetry.series, telemetry.dropped
+        else:
+            merged, dropped = load_snapshots(telemetry.directory)
+        return Response.json({"profiling": telemetry.profiling, "dropped": dropped, "series": summary(merged)})
@@ -0,0 +1,117 @@
+"""Domain-weighted, stratified exam-form assembly.
+
+Forms are drawn to the CAPM blueprint (:data:`DOMAIN_WEIGHTS`): the item
+count per domain is fixed by largest-remainder apportionment, and items
+are sampled without replacement inside each domain.  The per-domain pools
+are built once, so a form costs O(k) in the form length, not O(n) in the
+bank size.  A seed makes a form reproducible; ``exclude`` keeps items a
+candidate has already seen off the form.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import Collection, Iterable, Mapping, Sequence
+
+__all__ = ["DOMAIN_WEIGHTS", "Assembler", "Form", "InsufficientItems", "apportion"]
+
+# Percent of the exam per domain; keep in step with DOMAIN_WEIGHTS in main.py.
+DOMAIN_WEIGHTS = {"Fundamentals": 36, "Predictive": 17, "Agile": 20, "Business Analysis": 27}
+
+
+class InsufficientItems(ValueError):
+    """Raised when a domain pool cannot fill its share of the form."""
+
+
+def apportion(length: int, weights: Mapping[str, float]) -> dict[str, int]:
+    """Split *length* items across *weights* by largest remainder (Hamilton).
+
+    Ties on the remainder go to the heavier domain, then to blueprint order.
+    """
+    total = sum(weights.values())
+    exact = {d: length * w / total for d, w in weights.items()}
+    quota = {d: int(x) for d, x in exact.items()}
+    order = sorted(weights, key=lambda d: (-(exact[d] - quota[d]), -weights[d], list(weights).index(d)))
+    for d in order[:length - sum(quota.values())]:
+        quota[d] += 1
+    return quota
+
+
+@dataclass(frozen=True)
+class Form:
+    seed: int | None
+    items: list[int]                 # question ids in presentation order
+    blueprint: dict[str, int]        # items drawn per domain
+
+
+class Assembler:
+    """Draws forms from per-domain id pools.
+
+    *pools* maps each domain to the question ids in it; build it with
+    :meth:`from_bank` or directly from any id source.
+    """
+
+    def __init__(self, pools: Mapping[str, Sequence[int]], weights: Mapping[str, float] = DOMAIN_WEIGHTS):
+        self.weights = dict(weights)
+        self.pools = {d: list(pools.get(d, ())) for d in self.weights}
+
+    @classmethod
+    def from_bank(cls, bank, weights: Mapping[str, float] = DOMAIN_WEIGHTS) -> "Assembler":
+        return cls({d: bank.ids(d) for d in weights}, weights)
+
+    def __len__(self) -> int:
+        return sum(len(p) for p in self.pools.values())
+
+    def capacity(self) -> int:
+        """Longest form the blueprint allows from this bank."""
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            quota = apportion(mid, self.weights)
+            if all(quota[d] <= len(self.pools[d]) for d in quota):
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def assemble(self, length: int, seed: int | None = None, exclude: Iterable[int] = ()) -> Form:
+        """Draw a form of *length* unique items to the blueprint.
+
+        Sampling is rejection-based against *exclude*, so it stays O(k) while
+        the excluded share of a pool is small; once it is not, the pool is
+        filtered instead.
+        """
+        rng = random.Random(seed)
+        exclude = exclude if isinstance(exclude, (set, frozenset)) else set(exclude)
+        quota = apportion(length, self.weights)
+        items: list[int] = []
+        for domain, k in quota.items():
+            items.extend(self._draw(rng, domain, k, exclude))
+        rng.shuffle(items)
+        return Form(seed, items, quota)
+
+    def _draw(self, rng: random.Random, domain: str, k: int, exclude: Collection[int]) -> list[int]:
+        pool = self.pools[domain]
+        if k == 0:
+            return []
+        if k > len(pool):
+            raise InsufficientItems(f"{domain}: need {k} items, bank has {len(pool)}")
+        if not exclude:
+            return rng.sample(pool, k)
+        # Few exclusions relative to the pool: oversample and drop seen items.
+        if 2 * (k + len(exclude)) <= len(pool):
+            picked: list[int] = []
+            seen: set[int] = set()
+            while len(picked) < k:
+                for i in rng.sample(pool, min(len(pool), 2 * (k - len(picked)))):
+                    if i not in exclude and i not in seen:
+                        seen.add(i)
+                        picked.append(i)
+                        if len(picked) == k:
+                            break
+            return picked
+        fresh = [i for i in pool if i not in exclude]
+        if k > len(fresh):
+            raise InsufficientItems(f"{domain}: need {k} unseen items, only {len(fresh)} left")
+        return rng.sample(fresh, k)
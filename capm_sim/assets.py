@@ -0,0 +1,133 @@
+"""In-memory static asset store with precompressed representations.
+
+Every asset is compressed once, when it is added, so serving a request is a
+dictionary lookup: pick the best encoding the client accepts, answer
+``If-None-Match`` with a 304, or hand back the stored bytes.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+from dataclasses import dataclass, field
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+__all__ = ["Asset", "AssetStore", "IMMUTABLE", "REVALIDATE"]
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Compressing already-compressed formats only wastes CPU.
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+_MIN_COMPRESS = 256
+
+
+@dataclass
+class Asset:
+    """One resource and its encoded representations (``identity``, ``gzip``, ``br``)."""
+
+    content_type: str
+    cache_control: str
+    bodies: dict[str, bytes] = field(default_factory=dict)
+    etags: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def create(cls, data: bytes, content_type: str, cache_control: str) -> "Asset":
+        asset = cls(content_type, cache_control)
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        asset.bodies["identity"] = data
+        if len(data) >= _MIN_COMPRESS and content_type.startswith(_COMPRESSIBLE):
+            gz = gzip.compress(data, 9, mtime=0)
+            if len(gz) < len(data):
+                asset.bodies["gzip"] = gz
+            if brotli is not None:
+                br = brotli.compress(data, quality=11)
+                if len(br) < len(data):
+                    asset.bodies["br"] = br
+        # Strong ETags must differ per representation.
+        for enc in asset.bodies:
+            asset.etags[enc] = f'"{digest}"' if enc == "identity" else f'"{digest}-{enc}"'
+        return asset
+
+    def negotiate(self, accept_encoding: str) -> str:
+        """Return the smallest stored encoding acceptable to the client."""
+        accepted = _parse_accept_encoding(accept_encoding)
+        best = "identity"
+        for enc in ("br", "gzip"):
+            if enc in self.bodies and accepted.get(enc, accepted.get("*", 0)) > 0:
+                if len(self.bodies[enc]) < len(self.bodies[best]):
+                    best = enc
+        return best
+
+    def matches(self, if_none_match: str) -> bool:
+        """True if ``If-None-Match`` names any representation of this asset."""
+        if if_none_match.strip() == "*":
+            return True
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return not tags.isdisjoint(self.etags.values())
+
+
+def _parse_accept_encoding(header: str) -> dict[str, float]:
+    out: dict[str, float] = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        out[name.strip().lower()] = q
+    return out
+
+
+class AssetStore:
+    """Path → :class:`Asset` map, built at startup; bank shards are replaced when the bank is swapped."""
+
+    def __init__(self) -> None:
+        self._assets: dict[str, Asset] = {}
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._assets
+
+    def add(self, path: str, data: bytes, cache_control: str = REVALIDATE, content_type: str | None = None) -> Asset:
+        if content_type is None:
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+        asset = self._assets[path] = Asset.create(data, content_type, cache_control)
+        return asset
+
+    def alias(self, path: str, target: str) -> None:
+        self._assets[path] = self._assets[target]
+
+    def remove(self, path: str) -> None:
+        self._assets.pop(path, None)
+
+    def lookup(self, path: str, headers: dict[str, str]) -> tuple[int, list[tuple[bytes, bytes]], bytes] | None:
+        """Return ``(status, headers, body)`` for *path*, or ``None`` if unknown."""
+        asset = self._assets.get(path)
+        if asset is None:
+            return None
+        enc = asset.negotiate(headers.get("accept-encoding", ""))
+        out = [
+            (b"etag", asset.etags[enc].encode()),
+            (b"cache-control", asset.cache_control.encode()),
+            (b"vary", b"accept-encoding"),
+        ]
+        if "if-none-match" in headers and asset.matches(headers["if-none-match"]):
+            return 304, out, b""
+        body = asset.bodies[enc]
+        out.append((b"content-type", asset.content_type.encode()))
+        out.append((b"content-length", str(len(body)).encode()))
+        if enc != "identity":
+            out.append((b"content-encoding", enc.encode()))
+        return 200, out, body
@@ -0,0 +1,207 @@
+"""SQLite-backed question bank.
+
+The bank used to be a JS array literal in ``main.py``; it now lives in
+``data/questions.jsonl`` and is compiled into an indexed SQLite store::
+
+    python -m capm_sim.bank data/questions.jsonl var/bank.sqlite3
+
+Candidates only ever receive :meth:`QuestionBank.public` rows (stem and
+options); the key and explanation are read separately by the scorer.
+
+The build also stores the inverted index behind :meth:`QuestionBank.search`
+(see :mod:`capm_sim.search`), so the Review screen's text search is ready
+as soon as the bank is.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from . import ROOT
+from .search import SearchIndex, build_index, tokens
+
+__all__ = ["DOMAINS", "BANK_SOURCE", "BANK_DB", "QuestionBank", "build_bank", "read_jsonl"]
+
+DOMAINS = ("Fundamentals", "Predictive", "Agile", "Business Analysis")
+BANK_SOURCE = ROOT / "data" / "questions.jsonl"
+BANK_DB = ROOT / "var" / "bank.sqlite3"
+# Bumped whenever the stored layout changes; older stores are rebuilt on open.
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE questions (
+    id          INTEGER PRIMARY KEY,
+    domain      TEXT    NOT NULL,
+    question    TEXT    NOT NULL,
+    options     TEXT    NOT NULL,   -- JSON array
+    correct     INTEGER NOT NULL,
+    explanation TEXT    NOT NULL
+);
+CREATE INDEX questions_domain ON questions (domain, id);
+CREATE TABLE search (
+    name TEXT PRIMARY KEY,          -- terms / offsets / postings, see capm_sim.search
+    data BLOB NOT NULL
+);
+"""
+
+_PUBLIC = "id, domain, question, options"
+_FULL = "id, domain, question, options, correct, explanation"
+
+
+def read_jsonl(path: Path) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def build_bank(rows: Iterable[dict], db_path: Path) -> int:
+    """Write *rows* to a fresh SQLite bank at *db_path*; return the row count.
+
+    The database is built beside the target and renamed into place, so
+    readers never see a half-written bank.
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = db_path.with_suffix(db_path.suffix + ".tmp")
+    tmp.unlink(missing_ok=True)
+    con = sqlite3.connect(tmp)
+    try:
+        con.executescript(_SCHEMA)
+        con.executemany(
+            "INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?)",
+            ((q["id"], q["domain"], q["question"], json.dumps(q["options"], ensure_ascii=False),
+              q["correct"], q["explanation"]) for q in rows),
+        )
+        docs = (" ".join([question, *json.loads(options), explanation]) for question, options, explanation in
+                con.execute("SELECT question, options, explanation FROM questions ORDER BY id"))
+        con.executemany("INSERT INTO search VALUES (?, ?)", build_index(docs).items())
+        con.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        con.commit()
+        (count,) = con.execute("SELECT count(*) FROM questions").fetchone()
+    finally:
+        con.close()
+    os.replace(tmp, db_path)
+    return count
+
+
+class QuestionBank:
+    """Read-only access to a compiled bank."""
+
+    def __init__(self, db_path: Path = BANK_DB):
+        self.path = db_path
+        self._con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._con.row_factory = sqlite3.Row
+        self._index: SearchIndex | None = None
+
+    @classmethod
+    def open(cls, db_path: Path = BANK_DB, source: Path = BANK_SOURCE) -> "QuestionBank":
+        """Open *db_path*, compiling it from *source* first if it is missing or stale."""
+        stale = not db_path.exists() or db_path.stat().st_mtime < source.stat().st_mtime
+        if stale or _version(db_path) < SCHEMA_VERSION:
+            build_bank(read_jsonl(source), db_path)
+        return cls(db_path)
+
+    def close(self) -> None:
+        self._con.close()
+
+    def __len__(self) -> int:
+        return self._con.execute("SELECT count(*) FROM questions").fetchone()[0]
+
+    def ids(self, domain: str | None = None) -> list[int]:
+        if domain is None:
+            rows = self._con.execute("SELECT id FROM questions ORDER BY id")
+        else:
+            rows = self._con.execute("SELECT id FROM questions WHERE domain = ? ORDER BY id", (domain,))
+        return [r[0] for r in rows]
+
+    def key(self) -> list[tuple[int, int, str]]:
+        """``(id, correct, domain)`` for every item — the scorer's view of the bank."""
+        return self._con.execute("SELECT id, correct, domain FROM questions").fetchall()
+
+    def public(self, ids: list[int]) -> list[dict]:
+        """Stem and options for *ids*, in the given order — no key, no explanation."""
+        return self._fetch(_PUBLIC, ids)
+
+    def full(self, ids: list[int]) -> list[dict]:
+        """Complete rows for *ids*, in the given order."""
+        return self._fetch(_FULL, ids)
+
+    def page(self, domain: str | None, offset: int, limit: int) -> list[dict]:
+        """Complete rows in id order, optionally for one domain (Review screen)."""
+        if domain is None:
+            rows = self._con.execute(f"SELECT {_FULL} FROM questions ORDER BY id LIMIT ? OFFSET ?", (limit, offset))
+        else:
+            rows = self._con.execute(
+                f"SELECT {_FULL} FROM questions WHERE domain = ? ORDER BY id LIMIT ? OFFSET ?",
+                (domain, limit, offset))
+        return [_row(r) for r in rows]
+
+    def search(self, text: str, domain: str | None, offset: int, limit: int) -> tuple[int, list[dict]]:
+        """``(total, rows)`` of complete rows in id order whose text matches every term of *text*.
+
+        Terms match as prefixes ("stake" finds "stakeholder"), so results
+        narrow as the user types; no terms means every row (of *domain*).
+        """
+        if not tokens(text):
+            (total,) = self._con.execute(
+                "SELECT count(*) FROM questions" + ("" if domain is None else " WHERE domain = ?"),
+                () if domain is None else (domain,)).fetchone()
+            return total, self.page(domain, offset, limit)
+        ids = self.index().query(text, domain)
+        return len(ids), self.full(ids[offset:offset + limit].tolist())
+
+    def index(self) -> SearchIndex:
+        """The search index, loaded on first use."""
+        if self._index is None:
+            blobs = self.search_blobs()
+            rows = self._con.execute("SELECT id, domain FROM questions ORDER BY id").fetchall()
+            self._index = SearchIndex(blobs, np.array([r[0] for r in rows], np.int64),
+                                      np.array([r[1] for r in rows], object))
+        return self._index
+
+    def search_blobs(self) -> dict[str, bytes]:
+        """The stored index blobs (``terms``, ``offsets``, ``postings``)."""
+        return dict(self._con.execute("SELECT name, data FROM search").fetchall())
+
+    def _fetch(self, columns: str, ids: list[int]) -> list[dict]:
+        if not ids:
+            return []
+        marks = ",".join("?" * len(ids))
+        rows = {r["id"]: _row(r) for r in self._con.execute(
+            f"SELECT {columns} FROM questions WHERE id IN ({marks})", ids)}
+        return [rows[i] for i in ids if i in rows]
+
+
+def _version(db_path: Path) -> int:
+    con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return con.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        con.close()
+
+
+def _row(r: sqlite3.Row) -> dict:
+    d = dict(r)
+    d["options"] = json.loads(d["options"])
+    return d
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m capm_sim.bank", description="Compile a JSONL bank to SQLite.")
+    ap.add_argument("source", type=Path, nargs="?", default=BANK_SOURCE)
+    ap.add_argument("db", type=Path, nargs="?", default=BANK_DB)
+    args = ap.parse_args(argv)
+    print(f"{build_bank(read_jsonl(args.source), args.db)} questions -> {args.db}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""Compact, memory-mapped bank for the server workers.
+
+Every worker used to open the SQLite bank and copy the key, the domain
+pools and the search index into its own heap.  ``var/bank.bin`` holds the
+same data in one flat file — fixed-width columns for id, correct option
+and domain, one JSON document per row, and the search index blobs — laid
+out so a worker only has to ``mmap`` it: the columns become numpy views,
+rows are decoded when a request asks for them, and every worker on the
+machine shares the page cache's one physical copy::
+
+    python -m capm_sim.bankfile            # var/bank.sqlite3 -> var/bank.bin
+
+The file is written beside the target and renamed into place.  A worker
+that notices the swap (at most :data:`CHECK_INTERVAL` seconds later) maps
+the new file and hands its :meth:`MappedBank.on_swap` callbacks — the
+rebuilds of everything derived from the bank — to a background thread, so
+no request waits on them; they run one at a time in registration order,
+and one that fails is logged without stopping the rest.  Requests already
+holding the old mapping finish on it, and the kernel frees it once the
+last worker lets go.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from . import ROOT
+from .bank import BANK_DB, BANK_SOURCE, DOMAINS, QuestionBank
+from .search import SearchIndex, tokens
+
+__all__ = ["BANK_FILE", "BankFileError", "MappedBank", "write_bank_file"]
+
+BANK_FILE = ROOT / "var" / "bank.bin"
+CHECK_INTERVAL = 1.0    # seconds between checks for a swapped file
+
+MAGIC = b"CAPMBANK"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII")     # magic, format version, JSON directory length
+_ALIGN = 8
+_COLUMNS = {"ids": np.int64, "correct": np.int8, "domain": np.int8, "starts": np.uint64}
+_PUBLIC = ("id", "domain", "question", "options")
+
+log = logging.getLogger(__name__)
+
+
+class BankFileError(ValueError):
+    """Raised for a file that is not a bank file of the current format."""
+
+
+def write_bank_file(bank: QuestionBank, path: Path = BANK_FILE) -> int:
+    """Write *bank* to *path* (atomically); return the row count."""
+    rows = bank.page(None, 0, len(bank))
+    domains = [*DOMAINS, *sorted({r["domain"] for r in rows} - set(DOMAINS))]   # codes match DOMAINS
+    code = {d: i for i, d in enumerate(domains)}
+    docs = [json.dumps(r, separators=(",", ":"), ensure_ascii=False).encode() for r in rows]
+    sections = {
+        "ids": np.array([r["id"] for r in rows], np.int64).tobytes(),
+        "correct": np.array([r["correct"] for r in rows], np.int8).tobytes(),
+        "domain": np.array([code[r["domain"]] for r in rows], np.int8).tobytes(),
+        "starts": np.cumsum([0] + [len(d) for d in docs], dtype=np.uint64).tobytes(),
+        "text": b"".join(docs),
+        **bank.search_blobs(),
+    }
+    # Directory offsets are relative to the end of the header, so they don't depend on its length.
+    directory, offset = {}, 0
+    for name, data in sections.items():
+        directory[name] = [offset, len(data)]
+        offset += -(-len(data) // _ALIGN) * _ALIGN
+    meta = json.dumps({"count": len(rows), "domains": domains, "sections": directory}).encode()
+    meta += b" " * (-(_HEADER.size + len(meta)) % _ALIGN)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(meta)) + meta)
+        for data in sections.values():
+            f.write(data + b"\0" * (-len(data) % _ALIGN))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(rows)
+
+
+def _format(path: Path) -> int:
+    with open(path, "rb") as f:
+        head = f.read(_HEADER.size)
+    if len(head) < _HEADER.size:
+        return 0
+    magic, version, _ = _HEADER.unpack(head)
+    return version if magic == MAGIC else 0
+
+
+class MappedBank:
+    """The read side of :class:`~capm_sim.bank.QuestionBank`, served from a mapped bank file."""
+
+    def __init__(self, path: Path = BANK_FILE):
+        self.path = path
+        self._swap_callbacks: list[Callable[[], object]] = []
+        self._swapper: ThreadPoolExecutor | None = None
+        self._next_check = 0.0
+        self._load()
+
+    @classmethod
+    def open(cls, path: Path = BANK_FILE, db_path: Path = BANK_DB, source: Path = BANK_SOURCE) -> "MappedBank":
+        """Map *path*, compiling it (and the SQLite bank behind it) first if missing or stale."""
+        stale = (not path.exists() or path.stat().st_mtime < source.stat().st_mtime
+                 or (db_path.exists() and path.stat().st_mtime < db_path.stat().st_mtime))
+        if stale or _format(path) != FORMAT_VERSION:
+            bank = QuestionBank.open(db_path, source)
+            try:
+                write_bank_file(bank, path)
+            finally:
+                bank.close()
+        return cls(path)
+
+    def _load(self) -> None:
+        with open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size = _HEADER.unpack_from(buf)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise BankFileError(f"{self.path} is not a version {FORMAT_VERSION} bank file")
+        meta = json.loads(buf[_HEADER.size:_HEADER.size + size])
+        base = _HEADER.size + size
+        view = memoryview(buf)
+        sections = {name: view[base + off:base + off + n] for name, (off, n) in meta["sections"].items()}
+        self._stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+        self._buf = buf
+        self._sections = sections
+        self._text = sections["text"]
+        self._ids, self._correct, self._domain, self._starts = (
+            np.frombuffer(sections[name], dtype) for name, dtype in _COLUMNS.items())
+        self._domains = meta["domains"]
+        self._index: SearchIndex | None = None
+
+    def on_swap(self, fn: Callable[[], object]) -> Callable[[], object]:
+        """Call *fn* on the swap thread after :meth:`refresh` maps a new file."""
+        self._swap_callbacks.append(fn)
+        return fn
+
+    def refresh(self) -> bool:
+        """Map the file again if it was replaced since the last check; ``True`` if it was."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + CHECK_INTERVAL
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if (st.st_ino, st.st_size, st.st_mtime_ns) == self._stamp:
+            return False
+        try:
+            self._load()
+        except (OSError, ValueError):
+            log.exception("keeping the current bank: %s could not be mapped", self.path)
+            return False
+        if self._swap_callbacks:
+            if self._swapper is None:
+                self._swapper = ThreadPoolExecutor(1, thread_name_prefix="bank-swap")
+            for fn in self._swap_callbacks:
+                self._swapper.submit(_run_callback, fn)
+        return True
+
+    def close(self) -> None:
+        if self._swapper is not None:
+            self._swapper.shutdown(cancel_futures=True)
+        # Views handed out (key arrays, the search index) keep the mapping alive until they go.
+        self._index = None
+        self._sections = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _code(self, domain: str) -> int:
+        return self._domains.index(domain) if domain in self._domains else -1
+
+    def _rows(self, domain: str | None) -> np.ndarray:
+        if domain is None:
+            return np.arange(len(self._ids))
+        return np.flatnonzero(self._domain == self._code(domain))
+
+    def _doc(self, row: int) -> dict:
+        return json.loads(bytes(self._text[int(self._starts[row]):int(self._starts[row + 1])]))
+
+    def ids(self, domain: str | None = None) -> list[int]:
+        return self._ids[self._rows(domain)].tolist()
+
+    def key(self) -> list[tuple[int, int, str]]:
+        """``(id, correct, domain)`` for every item — the scorer's view of the bank."""
+        names = [self._domains[c] for c in self._domain.tolist()]
+        return list(zip(self._ids.tolist(), self._correct.tolist(), names))
+
+    def key_columns(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """:meth:`key` as mapped arrays in id order: ids, correct options, indexes into ``DOMAINS``."""
+        return self._ids, self._correct, self._domain
+
+    def public(self, ids: list[int]) -> list[dict]:
+        """Stem and options for *ids*, in the given order — no key, no explanation."""
+        return [{k: d[k] for k in _PUBLIC} for d in self.full(ids)]
+
+    def full(self, ids: list[int]) -> list[dict]:
+        """Complete rows for *ids*, in the given order."""
+        if not ids or not len(self._ids):
+            return []
+        want = np.asarray(ids, np.int64)
+        rows = np.searchsorted(self._ids, want).clip(0, len(self._ids) - 1)
+        return [self._doc(r) for r in rows[self._ids[rows] == want].tolist()]
+
+    def page(self, domain: str | None, offset: int, limit: int) -> list[dict]:
+        """Complete rows in id order, optionally for one domain (Review screen)."""
+        return [self._doc(r) for r in self._rows(domain)[offset:offset + limit].tolist()]
+
+    def search(self, text: str, domain: str | None, offset: int, limit: int) -> tuple[int, list[dict]]:
+        """``(total, rows)`` as :meth:`QuestionBank.search <capm_sim.bank.QuestionBank.search>`."""
+        if not tokens(text):
+            rows = self._rows(domain)
+            return len(rows), [self._doc(r) for r in rows[offset:offset + limit].tolist()]
+        ids = self.index().query(text, domain)
+        return len(ids), self.full(ids[offset:offset + limit].tolist())
+
+    def index(self) -> SearchIndex:
+        """The search index over the mapped postings, built on first use."""
+        if self._index is None:
+            blobs = {"terms": bytes(self._sections["terms"]),
+                     "offsets": self._sections["offsets"], "postings": self._sections["postings"]}
+            self._index = SearchIndex(blobs, self._ids, np.array(self._domains, object)[self._domain])
+        return self._index
+
+
+def _run_callback(fn: Callable[[], object]) -> None:
+    try:
+        fn()
+    except Exception:
+        log.exception("bank swap callback %s failed", getattr(fn, "__qualname__", fn))
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m capm_sim.bankfile",
+                                 description="Compile the bank to the mapped format and swap it into place.")
+    ap.add_argument("db", type=Path, nargs="?", default=BANK_DB)
+    ap.add_argument("out", type=Path, nargs="?", default=BANK_FILE)
+    ap.add_argument("--source", type=Path, default=BANK_SOURCE)
+    args = ap.parse_args(argv)
+    bank = QuestionBank.open(args.db, args.source)
+    try:
+        count = write_bank_file(bank, args.out)
+    finally:
+        bank.close()
+    print(f"{count} questions -> {args.out} ({args.out.stat().st_size / 2**20:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""Ahead-of-time build of the app shell.
+
+``main.py`` ships JSX in a ``<script type="text/babel">`` block and pulls
+React, ReactDOM and babel-standalone from cdnjs, so every page load
+downloads Babel and transpiles the whole app before first paint.  This
+module does that work once, at build time::
+
+    python -m capm_sim.build                 # -> dist/
+    python -m capm_sim.build --fetch-vendor  # download React into vendor/ first
+
+The output is ``dist/index.html`` plus content-hashed, minified assets under
+``dist/assets/``, an ``asset-manifest.json`` mapping logical names to
+hashed files, and ``sw.js``, the service worker that precaches all of it
+(:mod:`capm_sim.offline`).  React and ReactDOM are served from the local ``vendor/``
+copies, and the web fonts from ``vendor/fonts/`` (``--fetch-vendor`` saves
+the Google Fonts stylesheet and its font files there; without them the
+page falls back to system fonts), so the built page needs no CDN.  The
+build prints size and parse time before and after, and the time
+babel-standalone takes to compile the app in node — the work every page
+load used to do before first paint.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import shutil
+import subprocess
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from . import APP_SHELL, ROOT
+from .jsx import transform
+from .minify import minify_css, minify_js
+from .offline import service_worker
+
+__all__ = ["BuildError", "BuildResult", "build", "compile_shell", "extract_app_script", "fetch_vendor"]
+
+DIST = ROOT / "dist"
+VENDOR = ROOT / "vendor"
+
+_BABEL_BLOCK = re.compile(r'<script type="text/babel">(.*?)</script>', re.S)
+_CDN_SCRIPT = re.compile(r'\s*<script src="(https://cdnjs\.cloudflare\.com/[^"]+)"></script>')
+_STYLE = re.compile(r"<style>(.*?)</style>", re.S)
+_FONT_LINK = re.compile(r'<link href="(https://fonts\.googleapis\.com/[^"]+)" rel="stylesheet">')
+_FONT_URL = re.compile(r"url\((https://fonts\.gstatic\.com/[^)]+)\)")
+# Google Fonts serves woff2 only to browsers it recognises.
+_FONT_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+               "Chrome/120.0 Safari/537.36")
+
+
+class BuildError(RuntimeError):
+    """Raised when the app shell cannot be built."""
+
+
+@dataclass
+class BuildResult:
+    files: dict[str, bytes] = field(default_factory=dict)   # output path -> content
+    assets: dict[str, str] = field(default_factory=dict)    # logical name -> hashed path
+    report: list[tuple[str, int, int, float | None]] = field(default_factory=list)
+
+    def write(self, out_dir: Path) -> None:
+        """Replace *out_dir* with the built files."""
+        if out_dir.exists():
+            shutil.rmtree(out_dir)
+        for rel, data in self.files.items():
+            path = out_dir / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+
+
+def extract_app_script(html: str) -> str:
+    """Return the JSX source of the ``text/babel`` block in *html*."""
+    m = _BABEL_BLOCK.search(html)
+    if not m:
+        raise BuildError("no <script type=\"text/babel\"> block in the app shell")
+    return m.group(1)
+
+
+def cdn_scripts(html: str) -> dict[str, str]:
+    """Map vendored file names (``react.production.min.js``…) to their CDN URLs."""
+    urls = (m.group(1) for m in _CDN_SCRIPT.finditer(html))
+    return {url.rsplit("/", 1)[1]: url for url in urls}
+
+
+def fetch_vendor(html: str, vendor_dir: Path = VENDOR) -> list[Path]:
+    """Download the CDN scripts and web fonts referenced by *html* into *vendor_dir* (once)."""
+    vendor_dir.mkdir(parents=True, exist_ok=True)
+    fetched = []
+    for name, url in cdn_scripts(html).items():
+        path = vendor_dir / name
+        if not path.exists():
+            with urllib.request.urlopen(url, timeout=30) as resp:
+                path.write_bytes(resp.read())
+        fetched.append(path)
+    fonts = vendor_dir / "fonts"
+    if not (fonts / "fonts.css").exists() and _FONT_LINK.search(html):
+        fonts.mkdir(exist_ok=True)
+        request = urllib.request.Request(_FONT_LINK.search(html).group(1), headers={"User-Agent": _FONT_AGENT})
+        with urllib.request.urlopen(request, timeout=30) as resp:
+            css = resp.read().decode()
+        for url in dict.fromkeys(_FONT_URL.findall(css)):
+            with urllib.request.urlopen(url, timeout=30) as resp:
+                (fonts / url.rsplit("/", 1)[1]).write_bytes(resp.read())
+        # Files are referenced by name, beside the stylesheet; the build rewrites them to hashed assets.
+        (fonts / "fonts.css").write_text(_FONT_URL.sub(lambda m: f"url({m.group(1).rsplit('/', 1)[1]})", css))
+    if (fonts / "fonts.css").exists():
+        fetched.append(fonts / "fonts.css")
+    return fetched
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _add_hashed(result: BuildResult, name: str, data: bytes) -> str:
+    stem, suffix = name.split(".", 1)[0], "." + name.rsplit(".", 1)[1]
+    rel = f"assets/{stem}.{content_hash(data)}{suffix}"
+    result.files[rel] = data
+    result.assets[name] = rel
+    return rel
+
+
+def compile_shell(src: Path = APP_SHELL, vendor_dir: Path = VENDOR, measure: bool = False) -> BuildResult:
+    """Compile *src* into a self-contained, CDN-free bundle held in memory.
+
+    With *measure*, also fill :attr:`BuildResult.report` with before/after
+    sizes and parse times.
+    """
+    html = src.read_text(encoding="utf-8")
+    jsx_src = extract_app_script(html)
+
+    t0 = time.perf_counter()
+    app_js = minify_js(transform(jsx_src))
+    transform_ms = (time.perf_counter() - t0) * 1000
+
+    result = BuildResult()
+    tags = []
+    for name in cdn_scripts(html):
+        if name.startswith("babel"):
+            continue
+        path = vendor_dir / name
+        if not path.exists():
+            raise BuildError(f"{path} is missing; run with --fetch-vendor or copy it there")
+        tags.append(_add_hashed(result, name, path.read_bytes()))
+    tags.append(_add_hashed(result, "app.js", app_js.encode()))
+
+    page = _CDN_SCRIPT.sub("", html)
+    page = _FONT_LINK.sub(lambda _: _vendor_fonts(result, vendor_dir / "fonts"), page)
+    page = _STYLE.sub(lambda m: f"<style>{minify_css(m.group(1))}</style>", page)
+    scripts = "".join(f'<script src="{rel}"></script>' for rel in tags)
+    page = _BABEL_BLOCK.sub(lambda _: scripts, page)
+    page = re.sub(r">\s+<", "><", page).strip() + "\n"
+    result.files["index.html"] = page.encode()
+    result.files["asset-manifest.json"] = (json.dumps(result.assets, indent=2) + "\n").encode()
+    shell = ["/", *("/" + rel for rel in result.assets.values())]
+    version = content_hash("".join(content_hash(result.files[u.lstrip("/") or "index.html"]) for u in shell).encode())
+    result.files["sw.js"] = minify_js(service_worker(shell, version)).encode()
+    if not measure:
+        return result
+
+    babel = vendor_dir / next((n for n in cdn_scripts(html) if n.startswith("babel")), "babel.min.js")
+    babel_js = babel.read_text(encoding="utf-8") if babel.exists() else None
+    babel_transform = babel_ms(babel, jsx_src) if babel_js else None
+    result.report = [
+        ("before: main.py (inline JSX)", *_sizes(html.encode()), None),
+        ("before: babel-standalone", *_sizes(babel_js.encode()), parse_ms(babel_js)) if babel_js
+        else ("before: babel-standalone (not vendored, size n/a)", 0, 0, None),
+        ("before: in-browser JSX transform (Babel, node)", 0, 0, babel_transform) if babel_transform is not None
+        else ("before: in-browser JSX transform (needs Babel + node)", 0, 0, None),
+        ("build:  JSX transform + minify (Python, once)", 0, 0, transform_ms),
+        ("after:  index.html", *_sizes(page.encode()), None),
+        ("after:  " + result.assets["app.js"], *_sizes(app_js.encode()), parse_ms(app_js)),
+    ]
+    return result
+
+
+def _vendor_fonts(result: BuildResult, fonts: Path) -> str:
+    """Add the vendored font stylesheet and files as hashed assets; return the ``<link>`` (empty without them)."""
+    css_path = fonts / "fonts.css"
+    if not css_path.exists():
+        return ""
+    # Stylesheet and fonts both land in assets/, so each url() stays a bare (now hashed) file name.
+    css = re.sub(r"url\(([\w.\-]+)\)",
+                 lambda m: "url({})".format(
+                     _add_hashed(result, m.group(1), (fonts / m.group(1)).read_bytes()).rsplit("/", 1)[1]),
+                 css_path.read_text(encoding="utf-8"))
+    return f'<link href="{_add_hashed(result, "fonts.css", minify_css(css).encode())}" rel="stylesheet">'
+
+
+def build(src: Path = APP_SHELL, out_dir: Path = DIST, vendor_dir: Path = VENDOR) -> BuildResult:
+    """Compile *src* and write the bundle to *out_dir*."""
+    result = compile_shell(src, vendor_dir, measure=True)
+    result.write(out_dir)
+    return result
+
+
+def _sizes(data: bytes) -> tuple[int, int]:
+    return len(data), len(gzip.compress(data, 9))
+
+
+_NODE_PARSE = r"""
+const vm = require('vm'); let src = '';
+process.stdin.on('data', d => src += d).on('end', () => {
+  let best = Infinity;
+  for (let i = 0; i < 5; i++) {
+    const t = process.hrtime.bigint();
+    new vm.Script(src + '\n//' + i);
+    best = Math.min(best, Number(process.hrtime.bigint() - t) / 1e6);
+  }
+  console.log(best);
+});
+"""
+
+
+def parse_ms(js: str) -> float | None:
+    """Best-of-5 V8 compile time of *js* in ms, or ``None`` without node."""
+    node = shutil.which("node")
+    if not node:
+        return None
+    proc = subprocess.run([node, "-e", _NODE_PARSE], input=js, capture_output=True, text=True)
+    if proc.returncode:
+        raise BuildError(f"bundle does not parse:\n{proc.stderr}")
+    return float(proc.stdout)
+
+
+_NODE_BABEL = r"""
+const Babel = require(process.argv[1]); let src = '';
+process.stdin.on('data', d => src += d).on('end', () => {
+  let best = Infinity;
+  for (let i = 0; i < 3; i++) {
+    const t = process.hrtime.bigint();
+    Babel.transform(src, {presets: ['react', 'env']});   // babel-standalone's defaults for text/babel
+    best = Math.min(best, Number(process.hrtime.bigint() - t) / 1e6);
+  }
+  console.log(best);
+});
+"""
+
+
+def babel_ms(babel: Path, jsx: str) -> float | None:
+    """Best-of-3 time for the vendored babel-standalone at *babel* to compile *jsx* in node, in ms.
+
+    ``None`` without node, or if that file does not load as Babel.
+    """
+    node = shutil.which("node")
+    if not node:
+        return None
+    proc = subprocess.run([node, "-e", _NODE_BABEL, str(babel.resolve())], input=jsx, capture_output=True, text=True)
+    return None if proc.returncode else float(proc.stdout)
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m capm_sim.build", description=__doc__.split("\n\n")[0])
+    ap.add_argument("--src", type=Path, default=APP_SHELL)
+    ap.add_argument("--out", type=Path, default=DIST)
+    ap.add_argument("--vendor", type=Path, default=VENDOR)
+    ap.add_argument("--fetch-vendor", action="store_true", help="download the CDN scripts into --vendor first")
+    args = ap.parse_args(argv)
+
+    if args.fetch_vendor:
+        fetch_vendor(args.src.read_text(encoding="utf-8"), args.vendor)
+    try:
+        result = build(args.src, args.out, args.vendor)
+    except BuildError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"{'':52} {'bytes':>9} {'gzip':>9} {'ms':>9}")
+    for label, raw, gz, ms in result.report:
+        print(f"{label:52} {raw or '':>9} {gz or '':>9} {'' if ms is None else f'{ms:.2f}':>9}")
+    print(f"\nwrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""Where a score stands among every candidate's: KLL quantile sketches.
+
+Every submitted score — overall and per domain, in percent — is added to a
+:class:`KLLSketch` for its series, and the submit response says what share
+of earlier candidates scored lower ("better than 72 % of candidates").
+
+A KLL sketch keeps a stack of compactors.  Level *h* holds values that each
+stand for 2ʰ observations; when a level fills, it is sorted and every other
+value (from a random offset) is promoted to the level above, so total size
+stays around ``3k`` values however many scores are added — constant memory
+for millions of attempts — with rank error about ``1/k`` (≈0.5 % at the
+default *k* of 200).  Two sketches merge by concatenating their levels and
+compacting, so the sketches of different workers combine into one view.
+
+Each worker adds scores to its own sketches and, every
+:data:`SYNC_SECONDS`, writes them to ``var/cohort/worker-<pid>.npz`` and
+rebuilds its view from its own sketches plus the other workers' snapshots.
+A snapshot left by a worker that has exited is claimed by one live worker,
+folded into its own sketches and deleted, so the directory holds one file
+per live worker and nothing is counted twice.  A rank query is a binary
+search over the view's sorted values — well under a millisecond::
+
+    python -m capm_sim.cohort report      # quantiles of each series
+    python -m capm_sim.cohort backfill    # seed an empty cohort from submitted exams
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from . import ROOT
+from .bank import BANK_DB, DOMAINS, QuestionBank
+from .exams import EXAMS_DB, ExamStore
+from .scoring import AnswerKey, BatchScores, pad, score_batch
+
+__all__ = ["COHORT_DIR", "Cohort", "KLLSketch"]
+
+COHORT_DIR = ROOT / "var" / "cohort"
+OVERALL = "overall"
+SERIES = (OVERALL, *DOMAINS)
+K = 200
+SYNC_SECONDS = 5.0
+_SHRINK = 2 / 3      # each level's capacity relative to the one above it
+
+
+class KLLSketch:
+    """Mergeable quantile sketch over floats (Karnin, Lang and Liberty)."""
+
+    def __init__(self, k: int = K, rng: np.random.Generator | None = None):
+        self.k = k
+        self.n = 0
+        self.levels: list[np.ndarray] = [np.empty(0)]
+        self._rng = rng or np.random.default_rng()
+        self._sorted: tuple[np.ndarray, np.ndarray] | None = None    # values and cumulative weights, for ranks
+
+    def _capacity(self, level: int) -> int:
+        return max(2, math.ceil(self.k * _SHRINK ** (len(self.levels) - 1 - level)))
+
+    def update(self, values: Iterable[float]) -> None:
+        values = np.fromiter(values, np.float64)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        for h, values in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], values])
+        self.n += other.n
+        self._compress()
+
+    def _compress(self) -> None:
+        self._sorted = None
+        while sum(map(len, self.levels)) > sum(self._capacity(h) for h in range(len(self.levels))):
+            h = next(h for h in range(len(self.levels)) if len(self.levels[h]) >= self._capacity(h))
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            values = np.sort(self.levels[h])
+            odd = len(values) % 2     # an odd one out stays behind
+            self.levels[h] = values[:odd]
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], values[odd:][self._rng.integers(2)::2]])
+
+    def _view(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._sorted is None:
+            values = np.concatenate(self.levels)
+            weights = np.concatenate([np.full(len(v), 2.0 ** h) for h, v in enumerate(self.levels)])
+            order = np.argsort(values, kind="stable")
+            self._sorted = values[order], np.cumsum(weights[order])
+        return self._sorted
+
+    def rank(self, value: float) -> float:
+        """Estimated share of observations strictly below *value* (0 for an empty sketch)."""
+        values, cumulative = self._view()
+        if not len(values):
+            return 0.0
+        i = int(np.searchsorted(values, value, side="left"))
+        return float(cumulative[i - 1] / cumulative[-1]) if i else 0.0
+
+    def quantile(self, q: float) -> float:
+        values, cumulative = self._view()
+        if not len(values):
+            return math.nan
+        return float(values[min(int(np.searchsorted(cumulative, q * cumulative[-1], side="left")), len(values) - 1)])
+
+    def copy(self) -> "KLLSketch":
+        out = KLLSketch(self.k, self._rng)
+        out.n, out.levels = self.n, list(self.levels)
+        return out
+
+
+def _save(sketches: dict[str, KLLSketch], path: Path) -> None:
+    names = list(sketches)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, names=np.array(names), n=np.array([sketches[s].n for s in names], np.int64),
+                 depth=np.array([len(sketches[s].levels) for s in names], np.int64),
+                 sizes=np.array([len(v) for s in names for v in sketches[s].levels], np.int64),
+                 values=np.concatenate([v for s in names for v in sketches[s].levels] or [np.empty(0)]))
+    os.replace(tmp, path)
+
+
+def _load(path: Path, k: int = K) -> dict[str, KLLSketch]:
+    out = {}
+    with np.load(path) as data:
+        sizes, values = data["sizes"], data["values"]
+        level = offset = 0
+        for name, n, depth in zip(data["names"].tolist(), data["n"].tolist(), data["depth"].tolist()):
+            sketch = out[name] = KLLSketch(k)
+            sketch.n, sketch.levels = n, []
+            for size in sizes[level:level + depth].tolist():
+                sketch.levels.append(values[offset:offset + size])
+                offset += size
+            level += depth
+    return out
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _pid(path: Path) -> int:
+    try:
+        return int(path.stem.removeprefix("worker-"))
+    except ValueError:
+        return -1
+
+
+class Cohort:
+    """This worker's sketches, and the cohort-wide view ranks are read from."""
+
+    def __init__(self, directory: Path | None = COHORT_DIR, k: int = K):
+        self.directory = directory
+        self.k = k
+        self.local = {s: KLLSketch(k) for s in SERIES}     # what this worker owns and writes
+        self.view = {s: KLLSketch(k) for s in SERIES}      # local plus everyone else's last snapshot
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._dirty = False
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+            own = directory / f"worker-{os.getpid()}.npz"
+            if own.exists():
+                self._claim(own)    # left by an exited process that had our pid
+            self.sync()
+
+    @staticmethod
+    def values(score: dict) -> dict[str, float]:
+        """The series values of one score (as from :meth:`BatchScores.as_dicts`): percent correct."""
+        return {OVERALL: score["pct"], **{d: c * 100 / t for d, (c, t) in score["domains"].items() if t}}
+
+    def record(self, score: dict) -> dict:
+        """Add *score*; return ``{"overall": %, "domains": {domain: %}}`` of earlier scores it beats.
+
+        A series nobody has scored in yet gives ``None``.
+        """
+        values = self.values(score)
+        with self._lock:
+            better = {s: round(self.view[s].rank(v) * 100, 1) if self.view[s].n else None for s, v in values.items()}
+            for s, v in values.items():
+                self.local[s].update((v,))
+                self.view[s].update((v,))
+            self._dirty = True
+        return {"overall": better.pop(OVERALL), "domains": better}
+
+    def extend(self, scores: BatchScores) -> None:
+        """Add a batch of scores without ranking them (backfill)."""
+        with self._lock:
+            self.local[OVERALL].update(scores.pct)
+            for j, d in enumerate(DOMAINS):
+                taken = scores.domain_total[:, j] > 0
+                self.local[d].update(scores.domain_correct[taken, j] * 100 / scores.domain_total[taken, j])
+            self._dirty = True
+
+    def sync(self) -> None:
+        """Write this worker's snapshot, fold in those of exited workers, and rebuild the view."""
+        if self.directory is None:
+            return
+        me = os.getpid()
+        others = {}
+        for path in sorted(self.directory.glob("worker-*.npz")):
+            pid = _pid(path)
+            if pid == me:
+                continue
+            if not _alive(pid):
+                self._claim(path)
+                continue
+            try:
+                others[path] = _load(path, self.k)
+            except (OSError, ValueError, KeyError):
+                pass    # claimed or replaced under us; the next sync reads it
+        rest = {s: KLLSketch(self.k) for s in SERIES}
+        for snapshot in others.values():
+            for s, sketch in snapshot.items():
+                rest.setdefault(s, KLLSketch(self.k)).merge(sketch)
+        with self._lock:
+            view = {s: sk.copy() for s, sk in self.local.items()}
+            for s, sketch in rest.items():
+                view.setdefault(s, KLLSketch(self.k)).merge(sketch)
+            self.view = view
+        self.flush()
+
+    def flush(self) -> None:
+        """Write this worker's snapshot if anything was added since the last one."""
+        if self.directory is None:
+            return
+        own = self.directory / f"worker-{os.getpid()}.npz"
+        with self._lock:
+            if not self._dirty and own.exists():
+                return
+            local = {s: sk.copy() for s, sk in self.local.items()}
+            self._dirty = False
+        _save(local, own)
+
+    def _claim(self, path: Path) -> None:
+        claimed = path.with_name(f"{path.name}.{os.getpid()}.claim")
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return      # another worker got there first
+        try:
+            snapshot = _load(claimed, self.k)
+        except (OSError, ValueError, KeyError):
+            claimed.unlink(missing_ok=True)
+            return
+        with self._lock:
+            for s, sketch in snapshot.items():
+                self.local.setdefault(s, KLLSketch(self.k)).merge(sketch)
+            self._dirty = True
+        self.flush()    # persisted in our snapshot before the claimed one goes
+        claimed.unlink()
+
+    def start(self, interval: float = SYNC_SECONDS) -> None:
+        def loop() -> None:
+            while not self._stop.wait(interval):
+                self.sync()
+        threading.Thread(target=loop, name="cohort", daemon=True).start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self.sync()
+
+
+def backfill(cohort: Cohort, bank: QuestionBank, exams: ExamStore, chunk: int = 50_000) -> int:
+    """Score every submitted exam into *cohort*; return how many."""
+    key = AnswerKey.from_bank(bank)
+    count = 0
+    batch: list[tuple[list[int], list[int | None]]] = []
+
+    def flush() -> None:
+        nonlocal count
+        items = pad([b[0] for b in batch])
+        key.retire(items)   # scored over the items the bank still has, as a rescore would
+        cohort.extend(score_batch(key, items, pad([b[1] for b in batch])))
+        count += len(batch)
+        batch.clear()
+
+    for _, items, answers, _ in exams.attempts():
+        batch.append((items, answers))
+        if len(batch) >= chunk:
+            flush()
+    if batch:
+        flush()
+    cohort.flush()
+    return count
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m capm_sim.cohort")
+    ap.add_argument("command", choices=["report", "backfill"])
+    ap.add_argument("--dir", type=Path, default=COHORT_DIR)
+    ap.add_argument("--bank", type=Path, default=BANK_DB)
+    ap.add_argument("--exams", type=Path, default=EXAMS_DB)
+    ap.add_argument("--force", action="store_true", help="backfill even if the cohort already has scores")
+    args = ap.parse_args(argv)
+
+    if args.command == "backfill":
+        if any(args.dir.glob("worker-*.npz")) and not args.force:
+            print(f"{args.dir} already holds scores; backfilling again would count them twice (--force)")
+            return 1
+        bank, exams = QuestionBank.open(args.bank), ExamStore(args.exams)
+        try:
+            # Written as this process's snapshot; a running server claims it once we exit.
+            print(f"{backfill(Cohort(args.dir), bank, exams)} submitted exams added")
+        finally:
+            bank.close()
+            exams.close()
+        return 0
+
+    merged = {s: KLLSketch() for s in SERIES}
+    for path in sorted(args.dir.glob("worker-*.npz")):
+        for s, sketch in _load(path).items():
+            merged.setdefault(s, KLLSketch()).merge(sketch)
+    print(f"{'series':<20} {'scores':>10} {'p10':>7} {'p25':>7} {'p50':>7} {'p75':>7} {'p90':>7}")
+    for s, sketch in merged.items():
+        qs = " ".join(f"{sketch.quantile(q):>7.1f}" for q in (0.1, 0.25, 0.5, 0.75, 0.9))
+        print(f"{s:<20} {sketch.n:>10} {qs}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Exam forms handed out to candidates, and their submissions."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+from . import ROOT
+
+__all__ = ["EXAM_LENGTH", "EXAM_SECONDS", "EXAMS_DB", "GRACE_SECONDS", "PASS_PCT", "ExamStore", "form_seconds"]
+
+EXAM_LENGTH = 150
+EXAM_SECONDS = 180 * 60
+# Allowance for the client's auto-submit to reach us after the deadline.
+GRACE_SECONDS = 30
+PASS_PCT = 61
+EXAMS_DB = ROOT / "var" / "exams.sqlite3"
+
+
+def form_seconds(length: int) -> int:
+    """Time allowed for a form of *length* items: the full exam's pace (72 s an item), pro rata."""
+    return round(EXAM_SECONDS * length / EXAM_LENGTH)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS exams (
+    id        TEXT PRIMARY KEY,
+    created   REAL NOT NULL,
+    deadline  REAL NOT NULL,   -- epoch seconds; after deadline + grace only journaled answers count
+    items     TEXT NOT NULL,   -- JSON array of question ids, in form order
+    answers   TEXT,            -- JSON array, option index or null per item
+    correct   INTEGER,
+    submitted REAL,
+    seconds   TEXT,            -- JSON array, seconds spent on each item (client-reported)
+    candidate BLOB,            -- 16-byte candidate id, when the client sent one
+    seq       INTEGER          -- submission order, taken when the submission commits
+);
+CREATE INDEX IF NOT EXISTS exams_submitted ON exams (submitted);
+CREATE UNIQUE INDEX IF NOT EXISTS exams_seq ON exams (seq);
+CREATE INDEX IF NOT EXISTS exams_open ON exams (deadline) WHERE submitted IS NULL;
+"""
+
+
+class ExamStore:
+    def __init__(self, db_path: Path = EXAMS_DB):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._con = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        if self._con.execute("SELECT 1 FROM sqlite_master WHERE name = 'exams'").fetchone():
+            columns = {r[1] for r in self._con.execute("PRAGMA table_info(exams)")}
+            if "seconds" not in columns:
+                self._con.execute("ALTER TABLE exams ADD COLUMN seconds TEXT")
+            if "candidate" not in columns:
+                self._con.execute("ALTER TABLE exams ADD COLUMN candidate BLOB")
+            if "seq" not in columns:
+                self._con.execute("ALTER TABLE exams ADD COLUMN seq INTEGER")
+                self._con.execute(
+                    "UPDATE exams SET seq = o.n FROM (SELECT id, row_number() OVER (ORDER BY submitted, id) AS n "
+                    "FROM exams WHERE submitted IS NOT NULL) AS o WHERE exams.id = o.id")
+        self._con.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._con.close()
+
+    def create(self, items: list[int], seconds: int = EXAM_SECONDS) -> str:
+        exam_id = uuid.uuid4().hex
+        now = time.time()
+        self._con.execute("INSERT INTO exams (id, created, deadline, items) VALUES (?, ?, ?, ?)",
+                          (exam_id, now, now + seconds, json.dumps(items)))
+        return exam_id
+
+    def remaining(self, exam_id: str) -> float:
+        """Seconds left on *exam_id* (negative once it has expired); ``KeyError`` if unknown."""
+        row = self._con.execute("SELECT deadline FROM exams WHERE id = ?", (exam_id,)).fetchone()
+        if row is None:
+            raise KeyError(exam_id)
+        return row[0] - time.time()
+
+    def items(self, exam_id: str) -> list[int]:
+        """Question ids of *exam_id*, in form order; ``KeyError`` if unknown."""
+        row = self._con.execute("SELECT items FROM exams WHERE id = ?", (exam_id,)).fetchone()
+        if row is None:
+            raise KeyError(exam_id)
+        return json.loads(row[0])
+
+    def held(self, ids: Sequence[int], until: float) -> set[int]:
+        """Those of *ids* on some form not yet submitted whose deadline is after *until*."""
+        if not ids:
+            return set()
+        marks = ",".join("?" * len(ids))
+        return {item for (item,) in self._con.execute(
+            f"SELECT DISTINCT f.value FROM exams, json_each(exams.items) AS f "
+            f"WHERE exams.submitted IS NULL AND exams.deadline > ? AND f.value IN ({marks})", (until, *ids))}
+
+    def submitted(self, exam_id: str) -> bool:
+        row = self._con.execute("SELECT submitted FROM exams WHERE id = ?", (exam_id,)).fetchone()
+        return row is not None and row[0] is not None
+
+    def record(self, exam_id: str, answers: list[int | None], correct: int,
+               seconds: list[int] | None = None, candidate: bytes | None = None) -> None:
+        # seq is read under the write lock, so it follows commit order even when workers' clocks interleave.
+        with self._con:
+            self._con.execute("BEGIN IMMEDIATE")
+            self._con.execute(
+                "UPDATE exams SET answers = ?, correct = ?, submitted = ?, seconds = ?, candidate = ?, "
+                "seq = (SELECT coalesce(max(seq), 0) + 1 FROM exams) WHERE id = ?",
+                (json.dumps(answers), correct, time.time(), None if seconds is None else json.dumps(seconds),
+                 candidate, exam_id))
+
+    def submissions(self) -> Iterator[tuple[str, list[int], list[int | None], int]]:
+        """``(id, items, answers, correct)`` for every submitted exam, streamed."""
+        for exam_id, items, answers, correct in self._con.execute(
+                "SELECT id, items, answers, correct FROM exams WHERE submitted IS NOT NULL"):
+            yield exam_id, json.loads(items), json.loads(answers), correct
+
+    def attempts(self, after: int = 0) -> Iterator[tuple[int, list[int], list[int | None], list[int] | None]]:
+        """``(seq, items, answers, seconds)`` for exams submitted after submission *after*, in commit order."""
+        for seq, items, answers, seconds in self._con.execute(
+                "SELECT seq, items, answers, seconds FROM exams WHERE seq > ? ORDER BY seq", (after,)):
+            yield seq, json.loads(items), json.loads(answers), seconds and json.loads(seconds)
+
+    def seq_at(self, when: float) -> int:
+        """The last submission committed by *when* (epoch seconds); 0 if none."""
+        row = self._con.execute("SELECT max(seq) FROM exams WHERE submitted <= ?", (when,)).fetchone()
+        return row[0] or 0
+
+    def window(self, since: float = 0.0, until: float = float("inf")
+               ) -> Iterator[tuple[str, float, list[int], list[int | None], bytes | None]]:
+        """``(id, submitted, items, answers, candidate)`` for exams submitted in ``(since, until]``, oldest first."""
+        for exam_id, submitted, items, answers, candidate in self._con.execute(
+                "SELECT id, submitted, items, answers, candidate FROM exams WHERE submitted > ? AND submitted <= ? "
+                "ORDER BY submitted", (since, until)):
+            yield exam_id, submitted, json.loads(items), json.loads(answers), candidate
+
+    def update_scores(self, rows: Iterable[tuple[int, str]]) -> None:
+        """Apply ``(correct, exam_id)`` pairs in one transaction."""
+        with self._con:
+            self._con.execute("BEGIN")
+            self._con.executemany("UPDATE exams SET correct = ? WHERE id = ?", rows)
@@ -0,0 +1,355 @@
+"""Bulk question import from CSV or JSONL, with validation and near-duplicate detection.
+
+    python -m capm_sim.importer new.csv more.jsonl [--dry-run] [--report rejects.jsonl]
+
+Rows are appended to the bank source (``data/questions.jsonl``; the
+compiled bank picks the change up on its next open).  A JSONL row has the
+bank's own shape; a CSV row — as exported from a spreadsheet — has
+``domain``, ``question``, ``explanation``, ``correct`` and one column per
+option, named ``option_a``, ``option_b``… (empty trailing options are
+dropped).  ``correct`` is a 0-based option index or its letter (``B``);
+``id`` is optional and assigned after the bank's highest when missing.
+
+Every row is validated — a known domain, a non-empty stem, 2 to
+``MAX_OPTION + 1`` non-empty options, ``correct`` within them, a non-empty
+explanation — and rejected rows are reported with their line, never
+imported.
+
+Near-duplicates (the same stem and options up to small edits, e.g. a
+copy prefixed "[Practice]") are found with MinHash over word bigrams and
+banded LSH, so no pair of rows is ever compared unless their signatures
+already collide: each row gets :data:`NUM_PERM` min-hashes, split into
+:data:`BANDS` bands, and rows sharing any band are candidates whose
+estimated Jaccard similarity must reach ``--threshold``.  The existing
+bank takes part, so a row that repeats a bank question is rejected too;
+of two new near-duplicates the first is kept.
+
+Input is read in chunks of :data:`CHUNK` rows; parsing, validation and
+signatures run in a process pool with a bounded number of chunks in
+flight, and accepted rows are spooled to a temporary file rather than
+held.  What grows with the input is the signatures and where each row came
+from — ``NUM_PERM × 4 + BANDS × 8 + 10`` bytes a row — plus the set of ids
+given explicitly.  Sources must have distinct names.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+
+from .bank import BANK_SOURCE, DOMAINS
+from .state import MAX_OPTION
+
+__all__ = ["ImportResult", "import_rows", "read_rows"]
+
+CHUNK = 5000
+NUM_PERM = 64
+BANDS = 8                  # of NUM_PERM // BANDS rows each: pairs at Jaccard 0.8 collide in some band ~99% of the time
+THRESHOLD = 0.8
+_PRIME = (1 << 61) - 1
+_PERM = np.random.default_rng(20240611).integers(1, _PRIME, size=(2, NUM_PERM), dtype=np.uint64)
+_LETTER = re.compile(r"[A-Za-z]")
+_WORD = re.compile(r"\w+")
+
+# One chunk of raw input: (source name, [(line number, raw row), ...]).
+Chunk = tuple[str, list[tuple[int, "str | dict"]]]
+
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    imported: int = 0
+    errors: list[tuple[str, int, str]] = field(default_factory=list)        # (source, line, message)
+    duplicates: list[tuple[str, int, str, float]] = field(default_factory=list)   # (source, line, of, similarity)
+    seconds: float = 0.0
+
+
+def read_rows(path: Path) -> Iterator[tuple[int, str | dict]]:
+    """``(line, raw row)`` from a CSV or JSONL file: JSONL lines stay text, to be parsed in the pool."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for n, line in enumerate(f, 1):
+                if line.strip():
+                    yield n, line
+
+
+def _question(raw: str | dict) -> dict:
+    """One raw row as a bank row (without checking it); raises ValueError for unreadable input."""
+    if isinstance(raw, str):
+        row = json.loads(raw)
+        if not isinstance(row, dict):
+            raise ValueError("not a JSON object")
+        return row
+    options = [raw[k] for k in sorted(k for k in raw if k and k.lower().startswith("option"))]
+    while options and not (options[-1] or "").strip():
+        options.pop()
+    correct = (raw.get("correct") or "").strip()
+    if _LETTER.fullmatch(correct):
+        correct = ord(correct.upper()) - ord("A")
+    elif correct.lstrip("-").isdigit():
+        correct = int(correct)
+    row = {"domain": (raw.get("domain") or "").strip(), "question": raw.get("question") or "",
+           "options": options, "correct": correct, "explanation": raw.get("explanation") or ""}
+    if (raw.get("id") or "").strip():
+        row["id"] = int(raw["id"])
+    return row
+
+
+def _problem(row: dict) -> str | None:
+    if "id" in row and not (isinstance(row["id"], int) and not isinstance(row["id"], bool) and row["id"] > 0):
+        return "id must be a positive integer"
+    if row.get("domain") not in DOMAINS:
+        return f"unknown domain {row.get('domain')!r}"
+    if not isinstance(row.get("question"), str) or not row["question"].strip():
+        return "question is empty"
+    options = row.get("options")
+    if not isinstance(options, list) or not 2 <= len(options) <= MAX_OPTION + 1:
+        return f"options must list 2 to {MAX_OPTION + 1} choices"
+    if not all(isinstance(o, str) and o.strip() for o in options):
+        return "options must be non-empty text"
+    correct = row.get("correct")
+    if not isinstance(correct, int) or isinstance(correct, bool) or not 0 <= correct < len(options):
+        return f"correct must index one of the {len(options)} options"
+    if not isinstance(row.get("explanation"), str) or not row["explanation"].strip():
+        return "explanation is empty"
+    return None
+
+
+def _shingles(row: dict) -> list[int]:
+    words = _WORD.findall(" ".join([row["question"], *row["options"]]).lower())
+    grams = [" ".join(p) for p in zip(words, words[1:])] or words
+    return sorted({zlib.crc32(g.encode()) for g in grams}) or [0]
+
+
+def signatures(shingles: list[list[int]]) -> np.ndarray:
+    """MinHash signatures (rows × :data:`NUM_PERM`, uint32) for each row's shingle hashes, in one pass."""
+    sizes = np.fromiter(map(len, shingles), np.int64, len(shingles))
+    flat = np.fromiter((h for s in shingles for h in s), np.uint64, int(sizes.sum()))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    out = np.empty((len(shingles), NUM_PERM), np.uint32)
+    # (a·x + b) mod p, one permutation at a time so the scratch space is one row of hashes; a and b run up
+    # to p and the product wraps at 2⁶⁴, which only mixes it further.
+    for k, (a, b) in enumerate(_PERM.T):
+        out[:, k] = np.minimum.reduceat((a * flat + b) % np.uint64(_PRIME), starts) & np.uint64(0xFFFFFFFF)
+    return out
+
+
+def band_keys(sigs: np.ndarray) -> np.ndarray:
+    """One 64-bit key per band (rows × :data:`BANDS`): rows collide in a band iff its min-hashes agree."""
+    bands = sigs.reshape(len(sigs), BANDS, -1).astype(np.uint64)
+    keys = np.zeros((len(sigs), BANDS), np.uint64)
+    for col in range(bands.shape[2]):
+        keys = keys * np.uint64(0x100000001B3) ^ bands[:, :, col]
+    return keys
+
+
+def _check_chunk(chunk: Chunk) -> tuple[list[tuple[int, dict]], list[tuple[int, str]], np.ndarray]:
+    """Parse and validate one chunk; ``(valid rows with their line, errors, signatures of the valid rows)``."""
+    _, raws = chunk
+    rows, errors = [], []
+    for line, raw in raws:
+        try:
+            row = _question(raw)
+        except (ValueError, TypeError) as e:
+            errors.append((line, f"unreadable row: {e}"))
+            continue
+        problem = _problem(row)
+        if problem:
+            errors.append((line, problem))
+        else:
+            rows.append((line, row))
+    sigs = signatures([_shingles(r) for _, r in rows]) if rows else np.zeros((0, NUM_PERM), np.uint32)
+    return rows, errors, sigs
+
+
+def _chunks(sources: Iterable[tuple[str, Iterable[tuple[int, str | dict]]]]) -> Iterator[Chunk]:
+    for name, rows in sources:
+        it = iter(rows)
+        while batch := list(islice(it, CHUNK)):
+            yield name, batch
+
+
+def _bounded_map(pool: ProcessPoolExecutor | None, fn: Callable, items: Iterator, depth: int) -> Iterator:
+    """``map(fn, items)`` in order, with at most *depth* items submitted ahead of the consumer."""
+    if pool is None:
+        for item in items:
+            yield item, fn(item)
+        return
+    pending: deque[tuple[object, Future]] = deque()
+    for item in items:
+        pending.append((item, pool.submit(fn, item)))
+        if len(pending) >= depth:
+            item, future = pending.popleft()
+            yield item, future.result()
+    while pending:
+        item, future = pending.popleft()
+        yield item, future.result()
+
+
+def _near_duplicates(sigs: np.ndarray, keys: np.ndarray, first_new: int,
+                     threshold: float) -> dict[int, tuple[int, float]]:
+    """``{row: (earlier row, similarity)}`` for every row from *first_new* on that repeats an earlier one."""
+    found: dict[int, tuple[int, float]] = {}
+    for band in range(BANDS):
+        col = keys[:, band]
+        order = np.argsort(col, kind="stable")       # equal keys stay in row order, so a run starts at its earliest
+        run_start = np.flatnonzero(np.r_[True, col[order][1:] != col[order][:-1]])
+        lead = order[np.repeat(run_start, np.diff(np.r_[run_start, len(order)]))]
+        pairs = np.flatnonzero((lead != order) & (order >= first_new))
+        if not len(pairs):
+            continue
+        rows, leads = order[pairs], lead[pairs]
+        similarity = (sigs[rows] == sigs[leads]).mean(axis=1)
+        for row, earlier, s in zip(rows.tolist(), leads.tolist(), similarity.tolist()):
+            if s >= threshold and (row not in found or s > found[row][1]):
+                found[row] = (earlier, s)
+    return found
+
+
+def import_rows(sources: list[tuple[str, Iterable[tuple[int, str | dict]]]], bank: Path = BANK_SOURCE,
+                workers: int | None = None, threshold: float = THRESHOLD, dry_run: bool = False) -> ImportResult:
+    """Validate and de-duplicate *sources* (named ``(line, raw row)`` streams) and append them to *bank*."""
+    t0 = time.perf_counter()
+    result = ImportResult()
+    workers = workers or os.cpu_count() or 1
+    sig_parts, key_parts = [], []
+    names = [name for name, _ in sources]
+    origin, lines = array("H"), array("q")    # source index and line of each spooled row
+    bank_ids = array("q")
+    used: set[int] = set()                      # ids given explicitly, in the bank or the input
+
+    # The bank goes first, so its rows are the earlier side of any duplicate pair.
+    chunks = _chunks([("", read_rows(bank) if bank.exists() else []), *sources])
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+            for (name, _), (rows, errors, sigs) in _bounded_map(pool, _check_chunk, chunks, 2 * workers):
+                if not name:
+                    bank_ids.extend(row["id"] for _, row in rows)
+                    used.update(row["id"] for _, row in rows)
+                else:
+                    result.read += len(rows) + len(errors)
+                    result.errors.extend((name, line, msg) for line, msg in errors)
+                    keep, src = [], names.index(name)
+                    for i, (line, row) in enumerate(rows):
+                        if "id" in row:
+                            if row["id"] in used:
+                                result.errors.append((name, line, f"id {row['id']} is already in use"))
+                                continue
+                            used.add(row["id"])
+                        keep.append(i)
+                        origin.append(src)
+                        lines.append(line)
+                        if "id" in row:
+                            row = {"id": row.pop("id"), **row}
+                        spool.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+                    sigs = sigs[keep]
+                sig_parts.append(sigs)
+                key_parts.append(band_keys(sigs))
+            if pool is not None:
+                pool.shutdown()
+                pool = None
+
+            first_new = len(bank_ids)
+            dups = _near_duplicates(np.concatenate(sig_parts), np.concatenate(key_parts), first_new,
+                                    threshold) if lines else {}
+            for row, (earlier, s) in sorted(dups.items()):
+                while earlier in dups:      # its match was dropped too: name the row that stays
+                    earlier = dups[earlier][0]
+                if earlier < first_new:
+                    of = f"bank id {bank_ids[earlier]}"
+                else:
+                    of = f"{names[origin[earlier - first_new]]}:{lines[earlier - first_new]}"
+                result.duplicates.append((names[origin[row - first_new]], lines[row - first_new], of, s))
+            result.imported = len(lines) - len(dups)
+            if not dry_run and result.imported:
+                spool.seek(0)
+                _append(bank, spool, {row - first_new for row in dups}, max(used, default=0))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    result.seconds = time.perf_counter() - t0
+    return result
+
+
+def _append(bank: Path, spool, skip: set[int], max_id: int) -> None:
+    """Rewrite *bank* (atomically) with the spooled rows not in *skip* added, numbering any without an id."""
+    tmp = bank.with_name(bank.name + ".tmp")
+    bank.parent.mkdir(parents=True, exist_ok=True)
+    with open(tmp, "w", encoding="utf-8") as out:
+        if bank.exists():
+            with open(bank, encoding="utf-8") as f:
+                shutil.copyfileobj(f, out)
+            if out.tell() and not _ends_with_newline(bank):
+                out.write("\n")
+        for i, line in enumerate(spool):
+            if i in skip:
+                continue
+            if not line.startswith('{"id":'):     # spooled rows keep an id they came with as their first key
+                max_id += 1
+                line = f'{{"id":{max_id},{line[1:]}'
+            out.write(line)
+    os.replace(tmp, bank)
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m capm_sim.importer",
+                                 description="Validate CSV/JSONL questions and append them to the bank source.")
+    ap.add_argument("files", type=Path, nargs="+")
+    ap.add_argument("--bank", type=Path, default=BANK_SOURCE, help="bank source to append to")
+    ap.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD, help="Jaccard similarity that counts as a duplicate")
+    ap.add_argument("--dry-run", action="store_true", help="check only; leave the bank untouched")
+    ap.add_argument("--report", type=Path, help="write every rejected row to this JSONL file")
+    ap.add_argument("--show", type=int, default=20, help="rejections to print")
+    args = ap.parse_args(argv)
+
+    result = import_rows([(str(p), read_rows(p)) for p in args.files], args.bank, args.workers, args.threshold,
+                         args.dry_run)
+    rejects = [{"source": s, "line": n, "error": msg} for s, n, msg in result.errors]
+    rejects += [{"source": s, "line": n, "duplicate_of": of, "similarity": round(sim, 3)}
+                for s, n, of, sim in result.duplicates]
+    rejects.sort(key=lambda r: (r["source"], r["line"]))
+    for r in rejects[:args.show]:
+        why = r.get("error") or f"near-duplicate of {r['duplicate_of']} ({r['similarity']:.0%} similar)"
+        print(f"{r['source']}:{r['line']}: {why}")
+    if len(rejects) > args.show:
+        print(f"… and {len(rejects) - args.show} more")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in rejects)
+    verb = "would import" if args.dry_run else "imported"
+    print(f"{result.read} rows read, {len(result.errors)} invalid, {len(result.duplicates)} near-duplicates; "
+          f"{verb} {result.imported} into {args.bank} in {result.seconds:.1f}s")
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
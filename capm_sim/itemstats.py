@@ -0,0 +1,324 @@
+"""Streaming item analysis over submitted attempts.
+
+Attempts are folded into per-item running sums in fixed-size chunks, so
+memory is proportional to the bank, never to the number of attempts::
+
+    python -m capm_sim.itemstats update                  # new submissions since the checkpoint
+    python -m capm_sim.itemstats update --jsonl a.jsonl  # or exported results
+    python -m capm_sim.itemstats report [--json report.json] [--all]
+
+For every item the accumulator keeps:
+
+* ``n`` and ``correct`` — the p-value is ``correct / n``;
+* sums of the *rest score* ``x`` (proportion correct on the other items of
+  the form), ``x²`` and ``x`` over correct answers — enough for the
+  corrected point-biserial ``(M₁ - M₀) · √(pq) / σₓ`` without revisiting
+  an attempt;
+* a row of option counts (column 0 = omitted, column *k* + 1 = option *k*);
+* total seconds and the number of timed responses.
+
+State is checkpointed to ``var/itemstats.npz`` together with a cursor (the
+submission sequence number of the last exam folded in, or the line number
+of a JSONL file), so an interrupted run resumes where it stopped.  The checkpoint also
+records which source the cursor belongs to — the exam store or one JSONL
+file — and ``update`` refuses to continue it from any other.  The report flags
+items that are too easy, at or below chance (one over the item's number of
+options), weakly or negatively discriminating, whose key is outdrawn by a distractor, that have dead
+distractors, or that take far longer than the typical item.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
+
+from . import ROOT
+from .bank import BANK_DB, QuestionBank, read_jsonl
+from .exams import EXAMS_DB, ExamStore
+from .scoring import AnswerKey, pad
+from .state import MAX_OPTION
+
+__all__ = ["CHECKPOINT", "ItemStats", "analyse", "report"]
+
+CHECKPOINT = ROOT / "var" / "itemstats.npz"
+WIDTH = MAX_OPTION + 2          # omitted + every encodable option
+
+# Report thresholds.
+MIN_RESPONSES = 50
+EASY_P = 0.95
+LOW_RPB = 0.15
+DEAD_SHARE = 0.02
+SLOW_FACTOR = 2.0
+
+Attempt = tuple[float, Sequence[int], Sequence[int | None], Sequence[int] | None]
+
+
+@dataclass
+class ItemStats:
+    ids: np.ndarray          # int64, the key's item ids
+    n: np.ndarray            # int64, responses seen (including omits)
+    correct: np.ndarray      # int64
+    sum_x: np.ndarray        # float64, rest score
+    sum_xx: np.ndarray       # float64
+    sum_xc: np.ndarray       # float64, rest score over correct responses
+    options: np.ndarray      # int64 (items, WIDTH)
+    time_sum: np.ndarray     # float64 seconds
+    time_n: np.ndarray       # int64
+    attempts: int = 0
+    cursor: float = 0.0
+    source: str = ""         # what *cursor* positions into: "exams:<db>" or "jsonl:<file>"
+
+    _FIELDS = ("ids", "n", "correct", "sum_x", "sum_xx", "sum_xc", "options", "time_sum", "time_n")
+
+    @classmethod
+    def empty(cls, ids: np.ndarray) -> "ItemStats":
+        k = len(ids)
+        return cls(ids.copy(), np.zeros(k, np.int64), np.zeros(k, np.int64), np.zeros(k), np.zeros(k),
+                   np.zeros(k), np.zeros((k, WIDTH), np.int64), np.zeros(k), np.zeros(k, np.int64))
+
+    # ── checkpoints ──────────────────────────────────────────────────────
+    @classmethod
+    def load(cls, path: Path, key: AnswerKey) -> "ItemStats":
+        """Load *path* (or start empty), re-indexed onto the rows of *key*.
+
+        Items added to the bank since the checkpoint start at zero; items
+        that have been removed are dropped.
+        """
+        stats = cls.empty(key.ids)
+        if not path.exists():
+            return stats
+        with np.load(path) as data:
+            old = cls(*(data[f] for f in cls._FIELDS), int(data["attempts"]), float(data["cursor"]),
+                      str(data["source"]) if "source" in data.files else "")
+        pos = np.searchsorted(old.ids, key.ids).clip(0, max(len(old.ids) - 1, 0))
+        keep = (pos < len(old.ids)) & (old.ids[pos] == key.ids) if len(old.ids) else np.zeros(len(key.ids), bool)
+        for f in cls._FIELDS[1:]:
+            getattr(stats, f)[keep] = getattr(old, f)[pos[keep]]
+        stats.attempts, stats.cursor, stats.source = old.attempts, old.cursor, old.source
+        return stats
+
+    def save(self, path: Path) -> None:
+        """Write a checkpoint atomically (built beside *path*, then renamed)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, attempts=self.attempts, cursor=self.cursor, source=np.array(self.source),
+                     **{name: getattr(self, name) for name in self._FIELDS})
+        os.replace(tmp, path)
+
+    # ── accumulation ─────────────────────────────────────────────────────
+    def update(self, key: AnswerKey, items: np.ndarray, responses: np.ndarray,
+               seconds: np.ndarray | None = None) -> None:
+        """Fold one batch in: *items* and *responses* as for :func:`~capm_sim.scoring.score_batch`,
+        *seconds* the same shape with ``-1`` where no time was reported."""
+        k = len(self.ids)
+        idx = key.index(items)
+        present = idx >= 0
+        safe = np.where(present, idx, 0)
+        hit = present & (key.correct[safe] == responses)
+        got, total = hit.sum(axis=1), present.sum(axis=1)
+        rest = (got[:, None] - hit) / np.maximum(total - 1, 1)[:, None]
+
+        rows, h, x = idx[present], hit[present], rest[present]
+        self.n += np.bincount(rows, minlength=k)
+        self.correct += np.bincount(rows, weights=h, minlength=k).astype(np.int64)
+        self.sum_x += np.bincount(rows, weights=x, minlength=k)
+        self.sum_xx += np.bincount(rows, weights=x * x, minlength=k)
+        self.sum_xc += np.bincount(rows, weights=x * h, minlength=k)
+
+        chosen = responses[present]
+        col = np.where((chosen >= 0) & (chosen < WIDTH - 1), chosen + 1, 0)
+        self.options += np.bincount(rows * WIDTH + col, minlength=k * WIDTH).reshape(k, WIDTH)
+
+        if seconds is not None:
+            timed = present & (seconds >= 0)
+            self.time_sum += np.bincount(idx[timed], weights=seconds[timed], minlength=k)
+            self.time_n += np.bincount(idx[timed], minlength=k)
+        self.attempts += len(items)
+
+    # ── statistics ───────────────────────────────────────────────────────
+    def p_value(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.correct / self.n
+
+    def point_biserial(self) -> np.ndarray:
+        """Corrected item–rest point-biserial; ``nan`` where it is undefined."""
+        n, c = self.n.astype(float), self.correct.astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sum_x / n
+            sd = np.sqrt(np.maximum(self.sum_xx / n - mean * mean, 0.0))
+            m1 = self.sum_xc / c
+            m0 = (self.sum_x - self.sum_xc) / (n - c)
+            p = c / n
+            r = (m1 - m0) * np.sqrt(p * (1 - p)) / sd
+        return np.where(sd > 1e-12, r, np.nan)
+
+    def mean_seconds(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.time_sum / self.time_n
+
+
+def analyse(stats: ItemStats, key: AnswerKey, attempts: Iterable[Attempt], chunk: int = 20_000,
+            checkpoint: Path | None = None) -> tuple[int, int]:
+    """Fold *attempts* into *stats* *chunk* at a time; return ``(attempts read, retired items skipped)``.
+
+    Each attempt is ``(position, items, answers, seconds)``; *position* is the
+    cursor recorded after its chunk, and *stats* is saved to *checkpoint*
+    after every chunk.  Items no longer in *key* are left out of the sums.
+    """
+    it, seen, skipped = iter(attempts), 0, 0
+    while batch := list(islice(it, chunk)):
+        items = pad([a[1] for a in batch])
+        skipped += key.retire(items)
+        responses = pad([a[2] for a in batch])
+        timed = any(a[3] for a in batch)
+        seconds = pad([a[3] or [] for a in batch]) if timed else None
+        if seconds is not None and seconds.shape != items.shape:
+            seconds = np.pad(seconds, ((0, 0), (0, items.shape[1] - seconds.shape[1])), constant_values=-1)
+        stats.update(key, items, responses, seconds)
+        stats.cursor = float(batch[-1][0])
+        seen += len(batch)
+        if checkpoint is not None:
+            stats.save(checkpoint)
+    return seen, skipped
+
+
+def jsonl_attempts(path: Path, skip: int = 0) -> Iterator[Attempt]:
+    """Attempts from a JSONL export, positioned by line number.
+
+    Lines hold ``{"items", "answers", "seconds"?}``, or a result as the app
+    produces it (``questions`` with ids in place of ``items``).
+    """
+    for line_no, row in enumerate(read_jsonl(path), 1):
+        if line_no <= skip:
+            continue
+        items = row.get("items") or [q["id"] for q in row["questions"]]
+        yield line_no, items, row["answers"], row.get("seconds")
+
+
+def report(stats: ItemStats, bank: QuestionBank, min_responses: int = MIN_RESPONSES,
+           flagged_only: bool = True) -> list[dict]:
+    """Per-item statistics with a ``flags`` list, weakest (lowest discrimination) first."""
+    p, rpb, secs = stats.p_value(), stats.point_biserial(), stats.mean_seconds()
+    typical = float(np.nanmedian(secs)) if np.isfinite(secs).any() else float("nan")
+    rows = np.flatnonzero(stats.n >= min_responses)
+    ids = [int(i) for i in stats.ids[rows]]
+    questions = {}
+    for start in range(0, len(ids), 500):
+        questions.update((q["id"], q) for q in bank.full(ids[start:start + 500]))
+
+    out = []
+    for r, item_id in zip(rows, ids):
+        q = questions.get(item_id)
+        if q is None:
+            continue
+        counts = stats.options[r, 1:len(q["options"]) + 1]
+        answered = int(counts.sum())
+        flags = []
+        if p[r] > EASY_P:
+            flags.append("too easy")
+        if p[r] <= 1 / len(q["options"]):
+            flags.append("at or below chance")
+        if rpb[r] < 0:
+            flags.append("negative discrimination")
+        elif rpb[r] < LOW_RPB:
+            flags.append("weak discrimination")
+        if answered:
+            key_count = counts[q["correct"]]
+            for opt, count in enumerate(counts):
+                if opt == q["correct"]:
+                    continue
+                if count > key_count:
+                    flags.append(f"distractor {chr(65 + opt)} outdraws key")
+                elif count < DEAD_SHARE * answered:
+                    flags.append(f"dead distractor {chr(65 + opt)}")
+        if np.isfinite(secs[r]) and secs[r] > SLOW_FACTOR * typical:
+            flags.append("slow")
+        if flagged_only and not flags:
+            continue
+        out.append({
+            "id": item_id, "domain": q["domain"], "n": int(stats.n[r]),
+            "p": round(float(p[r]), 4),
+            "rpb": None if np.isnan(rpb[r]) else round(float(rpb[r]), 4),
+            "omitted": int(stats.options[r, 0]),
+            "options": [int(c) for c in counts], "correct": q["correct"],
+            "seconds": None if not np.isfinite(secs[r]) else round(float(secs[r]), 1),
+            "flags": flags,
+        })
+    out.sort(key=lambda d: (d["rpb"] is not None, d["rpb"] if d["rpb"] is not None else 0))
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m capm_sim.itemstats")
+    ap.add_argument("command", choices=["update", "report"])
+    ap.add_argument("--bank", type=Path, default=BANK_DB)
+    ap.add_argument("--exams", type=Path, default=EXAMS_DB)
+    ap.add_argument("--jsonl", type=Path, help="read attempts from a JSONL export instead of the exam store")
+    ap.add_argument("--checkpoint", type=Path, default=CHECKPOINT)
+    ap.add_argument("--chunk", type=int, default=20_000)
+    ap.add_argument("--min-responses", type=int, default=MIN_RESPONSES)
+    ap.add_argument("--all", action="store_true", help="report every item, not only flagged ones")
+    ap.add_argument("--json", type=Path, help="write the report here instead of printing a table")
+    args = ap.parse_args(argv)
+
+    bank = QuestionBank.open(args.bank)
+    try:
+        key = AnswerKey.from_bank(bank)
+        stats = ItemStats.load(args.checkpoint, key)
+        if args.command == "update":
+            source = f"jsonl:{args.jsonl.resolve()}" if args.jsonl else f"exams:{args.exams.resolve()}"
+            # A cursor is a submission number in one source and a line number in another: never carry it
+            # across.  (Checkpoints written before sources were recorded are adopted by the first update;
+            # older store checkpoints hold a submitted time, which is converted to the submission number.)
+            legacy = bool(stats.attempts and not args.jsonl
+                          and stats.source in ("", f"store:{args.exams.resolve()}"))
+            if stats.attempts and stats.source and stats.source != source and not legacy:
+                print(f"error: {args.checkpoint} continues {stats.source.split(':', 1)[1]}, not "
+                      f"{source.split(':', 1)[1]}; use another --checkpoint", file=sys.stderr)
+                return 1
+            stats.source = source
+            if args.jsonl:
+                attempts = jsonl_attempts(args.jsonl, skip=int(stats.cursor))
+                seen, skipped = analyse(stats, key, attempts, args.chunk, args.checkpoint)
+            else:
+                exams = ExamStore(args.exams)
+                try:
+                    if legacy:
+                        stats.cursor = exams.seq_at(stats.cursor)
+                    seen, skipped = analyse(stats, key, exams.attempts(int(stats.cursor)), args.chunk,
+                                            args.checkpoint)
+                finally:
+                    exams.close()
+            print(f"{seen} attempts folded in ({stats.attempts} total) -> {args.checkpoint}"
+                  + (f"; {skipped} retired items left out" if skipped else ""))
+            return 0
+
+        rows = report(stats, bank, args.min_responses, flagged_only=not args.all)
+        if args.json:
+            args.json.write_text(json.dumps({"attempts": stats.attempts, "items": rows}, indent=1))
+            print(f"{len(rows)} items -> {args.json}")
+            return 0
+        print(f"{stats.attempts} attempts; {len(rows)} items"
+              f"{'' if args.all else ' flagged'} (n >= {args.min_responses})")
+        print(f"{'id':>7} {'domain':<18} {'n':>7} {'p':>6} {'rpb':>6} {'sec':>6}  flags")
+        for d in rows:
+            rpb = "—" if d["rpb"] is None else f"{d['rpb']:.2f}"
+            sec = "—" if d["seconds"] is None else f"{d['seconds']:.0f}"
+            print(f"{d['id']:>7} {d['domain']:<18} {d['n']:>7} {d['p']:>6.2f} {rpb:>6} {sec:>6}  "
+                  + ", ".join(d["flags"]))
+    finally:
+        bank.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""Append-only exam session journal.
+
+The client batches exam events and posts them as compact binary writes;
+each batch is appended to a per-exam write-ahead log under ``var/journal``
+and can be replayed to restore the session exactly.  Remaining time is not
+journaled: it is always derived from the deadline stored with the exam.
+
+Event (4 bytes, little-endian)::
+
+    u8  kind     1 = answer, 2 = flag, 3 = navigate
+    u16 item
+    i8  value    answer: option or -1 to clear; flag: 1 / 0; navigate: unused
+
+Record::
+
+    u32 seq      client batch number; replays of an older seq are ignored
+    u8  kind     0 = event batch, 1 = snapshot (encoded state + u16 current item)
+    u16 length
+    u32 crc32    of the payload; a torn tail record fails this and ends the log
+    payload
+
+Writes go straight to the OS with ``O_APPEND``; :meth:`Journal.sync` flushes
+dirty logs to disk in one pass and is run on a timer, so a burst of writes
+costs one ``fsync`` per log per interval rather than one per request.
+Several server processes may share a log: an append holds a shared
+``flock`` on it and a compaction an exclusive one while it swaps in the
+snapshot, and an append whose descriptor no longer names the log (another
+process compacted it) reopens it first.
+A submitted exam's log is discarded; logs that stop growing (abandoned
+exams) are swept by the sync thread once idle for ``max_age`` seconds.
+Server memory per session is one dictionary entry and at most one cached
+file descriptor.  Events carry absolute values (flag on/off, not toggle), so
+a batch applied twice by two workers replays to the same state.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from . import ROOT
+from .state import ExamState, StateError, decode_state, encode_state
+
+__all__ = ["JOURNAL_DIR", "Journal", "JournalError", "Replay"]
+
+JOURNAL_DIR = ROOT / "var" / "journal"
+
+EV_ANSWER, EV_FLAG, EV_NAV = 1, 2, 3
+REC_EVENTS, REC_SNAPSHOT = 0, 1
+
+_HEADER = struct.Struct("<IBHI")
+_EVENT = struct.Struct("<BHb")
+_CURRENT = struct.Struct("<H")
+SWEEP_SECONDS = 600.0
+
+
+class JournalError(ValueError):
+    """Raised for malformed or oversized writes."""
+
+
+@dataclass
+class Replay:
+    state: ExamState
+    current: int
+    seq: int
+
+
+class Journal:
+    """Per-exam write-ahead logs with a bounded descriptor and sequence cache."""
+
+    def __init__(self, root: Path = JOURNAL_DIR, max_bytes: int = 256 * 1024,
+                 compact_bytes: int = 16 * 1024, max_open: int = 256, max_tracked: int = 65536,
+                 max_age: float | None = None):
+        self.root = root
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.compact_bytes = compact_bytes
+        self.max_open = max_open
+        self.max_tracked = max_tracked
+        root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._fds: OrderedDict[str, int] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._seq: OrderedDict[str, int] = OrderedDict()
+        self._stop = threading.Event()
+
+    def path(self, exam_id: str) -> Path:
+        if not exam_id.isalnum():
+            raise JournalError("bad exam id")
+        return self.root / f"{exam_id}.wal"
+
+    # ── writes ────────────────────────────────────────────────────────────
+    def append(self, exam_id: str, seq: int, events: bytes) -> bool:
+        """Append one client batch; return ``False`` if *seq* was already applied."""
+        if not events or len(events) % _EVENT.size or len(events) > 0xFFFF:
+            raise JournalError("event batch has the wrong size")
+        for off in range(0, len(events), _EVENT.size):
+            if events[off] not in (EV_ANSWER, EV_FLAG, EV_NAV):
+                raise JournalError("unknown event kind")
+        with self._lock:
+            if seq <= self._last_seq(exam_id):
+                return False
+            fd = self._locked_fd(exam_id)
+            try:
+                if os.fstat(fd).st_size + _HEADER.size + len(events) > self.max_bytes:
+                    raise JournalError("journal is full")
+                os.write(fd, _HEADER.pack(seq, REC_EVENTS, len(events), zlib.crc32(events)) + events)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._dirty.add(exam_id)
+            self._remember(exam_id, seq)
+        return True
+
+    def start_sync(self, interval: float = 1.0) -> None:
+        """Run :meth:`sync` every *interval* seconds, and :meth:`sweep` every few minutes if ``max_age`` is
+        set, on a daemon thread until :meth:`close`."""
+        def loop() -> None:
+            swept = float("-inf")
+            while not self._stop.wait(interval):
+                self.sync()
+                if self.max_age is not None and time.monotonic() - swept >= SWEEP_SECONDS:
+                    swept = time.monotonic()
+                    self.sweep(self.max_age)
+        threading.Thread(target=loop, name="journal-sync", daemon=True).start()
+
+    def sync(self) -> None:
+        """``fsync`` every log written since the last call."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            fds = [self._fds[e] for e in dirty if e in self._fds]
+        for fd in fds:
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        self._stop.set()
+        self.sync()
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+
+    def discard(self, exam_id: str) -> None:
+        """Drop the log of *exam_id* (submitted, or abandoned) and its cached descriptor."""
+        with self._lock:
+            fd = self._fds.pop(exam_id, None)
+            if fd is not None:
+                os.close(fd)
+            self._dirty.discard(exam_id)
+            self._seq.pop(exam_id, None)
+        self.path(exam_id).unlink(missing_ok=True)
+
+    def sweep(self, max_age: float) -> int:
+        """Discard every log not written for *max_age* seconds; return how many went."""
+        cutoff = time.time() - max_age
+        swept = 0
+        for path in self.root.glob("*.wal"):
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue   # discarded by another worker meanwhile
+            self.discard(path.stem)
+            swept += 1
+        return swept
+
+    # ── replay ────────────────────────────────────────────────────────────
+    def replay(self, exam_id: str, n: int) -> Replay:
+        """Fold the log of *exam_id* into the state of an *n*-item exam.
+
+        Logs past ``compact_bytes`` are rewritten as a single snapshot record.
+        """
+        path = self.path(exam_id)
+        data = path.read_bytes() if path.exists() else b""
+        state, current, seq = ExamState([None] * n), 0, 0
+        for rec_seq, kind, payload in _records(data):
+            if rec_seq <= seq:
+                continue   # a resent batch appended by another worker after a newer one
+            seq = rec_seq
+            if kind == REC_SNAPSHOT:
+                try:
+                    state = decode_state(payload[:-_CURRENT.size].decode("ascii"), n)
+                except (StateError, UnicodeDecodeError):
+                    continue
+                (current,) = _CURRENT.unpack_from(payload, len(payload) - _CURRENT.size)
+                continue
+            for kind_, item, value in _EVENT.iter_unpack(payload):
+                if item >= n:
+                    continue
+                if kind_ == EV_ANSWER:
+                    state.responses[item] = value if value >= 0 else None
+                elif kind_ == EV_FLAG:
+                    (state.flagged.add if value else state.flagged.discard)(item)
+                elif kind_ == EV_NAV:
+                    current = item
+        if len(data) > self.compact_bytes:
+            self._compact(exam_id, state, current, seq, len(data))
+        return Replay(state, min(current, max(n - 1, 0)), seq)
+
+    def _compact(self, exam_id: str, state: ExamState, current: int, seq: int, replayed: int) -> None:
+        payload = encode_state(state).encode("ascii") + _CURRENT.pack(current)
+        record = _HEADER.pack(seq, REC_SNAPSHOT, len(payload), zlib.crc32(payload)) + payload
+        path = self.path(exam_id)
+        with self._lock:
+            fd = self._fds.pop(exam_id, None)
+            if fd is not None:
+                os.close(fd)
+            try:
+                log = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                return
+            try:
+                # Appenders in other processes wait on this lock, then see the swapped inode and reopen.
+                fcntl.flock(log, fcntl.LOCK_EX)
+                if os.fstat(log).st_size != replayed or os.stat(path).st_ino != os.fstat(log).st_ino:
+                    return   # a batch landed after we read the log; compact next time
+                tmp = path.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp, "wb") as f:
+                    f.write(record)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, path)
+            finally:
+                os.close(log)
+
+    # ── caches (callers hold self._lock) ─────────────────────────────────
+    def _fd(self, exam_id: str) -> int:
+        fd = self._fds.get(exam_id)
+        if fd is not None:
+            self._fds.move_to_end(exam_id)
+            return fd
+        if len(self._fds) >= self.max_open:
+            old, old_fd = self._fds.popitem(last=False)
+            if old in self._dirty:
+                os.fsync(old_fd)
+                self._dirty.discard(old)
+            os.close(old_fd)
+        fd = self._fds[exam_id] = os.open(self.path(exam_id), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        return fd
+
+    def _locked_fd(self, exam_id: str) -> int:
+        """The log's descriptor under a shared ``flock``, reopened if another process compacted the log."""
+        while True:
+            fd = self._fd(exam_id)
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            try:
+                if os.stat(self.path(exam_id)).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(self._fds.pop(exam_id))
+            self._dirty.discard(exam_id)
+
+    def _last_seq(self, exam_id: str) -> int:
+        seq = self._seq.get(exam_id)
+        if seq is None:
+            path = self.path(exam_id)
+            data = path.read_bytes() if path.exists() else b""
+            seq = max((s for s, _, _ in _records(data)), default=0)
+            self._remember(exam_id, seq)
+        return seq
+
+    def _remember(self, exam_id: str, seq: int) -> None:
+        self._seq[exam_id] = seq
+        self._seq.move_to_end(exam_id)
+        while len(self._seq) > self.max_tracked:
+            self._seq.popitem(last=False)
+
+
+def _records(data: bytes):
+    off = 0
+    while off + _HEADER.size <= len(data):
+        seq, kind, length, crc = _HEADER.unpack_from(data, off)
+        payload = data[off + _HEADER.size: off + _HEADER.size + length]
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            return   # torn write at the tail
+        yield seq, kind, payload
+        off += _HEADER.size + length
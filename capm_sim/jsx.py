@@ -0,0 +1,308 @@
+"""A small JSX → ``React.createElement`` transform.
+
+This covers the JSX dialect used by the simulator (elements, fragments,
+string/expression/spread attributes, text and expression children) so the
+page can be compiled at build time instead of by babel-standalone in the
+browser.  It is a source-to-source rewrite: everything that is not JSX is
+copied through unchanged.
+"""
+
+from __future__ import annotations
+
+import re
+
+__all__ = ["EXPR_KEYWORDS", "STATEMENT_HEADS", "JSXSyntaxError", "transform"]
+
+_IDENT = re.compile(r"[A-Za-z_$][\w$]*")
+_TAG = re.compile(r"[A-Za-z_$][\w$.\-:]*")
+_ATTR = re.compile(r"[A-Za-z_$][\w$\-:]*")
+_ENTITIES = {"&amp;": "&", "&lt;": "<", "&gt;": ">", "&quot;": '"', "&apos;": "'", "&nbsp;": "\u00a0"}
+# A `<` or `/` after one of these starts an expression (JSX / regex), not an operator.
+_EXPR_PRECEDERS = set("(,=:[!&|?{;>")
+EXPR_KEYWORDS = frozenset({"return", "case", "default", "typeof", "void", "in", "of", "new", "delete", "throw",
+                           "yield", "await", "do", "else"})
+# So does the `)` closing the head of one of these: `if (x) <div/>` is a statement, not a comparison.
+STATEMENT_HEADS = frozenset({"if", "for", "while", "with"})
+
+
+class JSXSyntaxError(ValueError):
+    """Raised when the input cannot be parsed."""
+
+    def __init__(self, msg: str, src: str, pos: int):
+        line = src.count("\n", 0, pos) + 1
+        col = pos - (src.rfind("\n", 0, pos) + 1) + 1
+        super().__init__(f"{msg} at line {line}, column {col}")
+        self.pos = pos
+
+
+def transform(src: str, pragma: str = "React.createElement", fragment: str = "React.Fragment") -> str:
+    """Return *src* with every JSX expression compiled to *pragma* calls."""
+    out, end = _Transformer(src, pragma, fragment).js(0)
+    if end != len(src):
+        raise JSXSyntaxError("unbalanced '}'", src, end)
+    return out
+
+
+class _Transformer:
+    def __init__(self, src: str, pragma: str, fragment: str):
+        self.src = src
+        self.pragma = pragma
+        self.fragment = fragment
+
+    def error(self, msg: str, pos: int) -> JSXSyntaxError:
+        return JSXSyntaxError(msg, self.src, pos)
+
+    # ── plain JavaScript ──────────────────────────────────────────────────
+    def js(self, i: int, in_braces: bool = False) -> tuple[str, int]:
+        """Copy JS from *i*, compiling JSX; stop at the unmatched ``}`` if *in_braces*."""
+        src, n = self.src, len(self.src)
+        out: list[str] = []
+        depth = 0
+        prev = ""        # last significant character emitted
+        word = ""        # last identifier emitted, for `return <div/>` and friends
+        parens: list[bool] = []   # open parens: does each close a statement head?
+        while i < n:
+            c = src[i]
+            if c in " \t\r\n":
+                out.append(c)
+                i += 1
+                continue
+            if src.startswith("//", i):
+                j = src.find("\n", i)
+                j = n if j < 0 else j
+                out.append(src[i:j])
+                i = j
+                continue
+            if src.startswith("/*", i):
+                j = src.find("*/", i + 2)
+                if j < 0:
+                    raise self.error("unterminated comment", i)
+                out.append(src[i:j + 2])
+                i = j + 2
+                continue
+            starts_expr = prev == "" or prev in _EXPR_PRECEDERS or word in EXPR_KEYWORDS
+            if c == "<" and starts_expr and i + 1 < n and (src[i + 1] == ">" or _IDENT.match(src, i + 1)):
+                code, i = self.element(i)
+                out.append(code)
+                prev, word = ")", ""
+                continue
+            if c == "/" and starts_expr:
+                j = self.regex_end(i)
+                out.append(src[i:j])
+                i, prev, word = j, "/", ""
+                continue
+            if c in "'\"":
+                j = self.string_end(i)
+                out.append(src[i:j])
+                i, prev, word = j, c, ""
+                continue
+            if c == "`":
+                code, i = self.template(i)
+                out.append(code)
+                prev, word = "`", ""
+                continue
+            if c == "{":
+                depth += 1
+            elif c == "}":
+                if depth == 0 and in_braces:
+                    return "".join(out), i
+                depth -= 1
+            m = _IDENT.match(src, i)
+            if m:
+                word = m.group()
+                out.append(word)
+                i, prev = m.end(), "a"
+                continue
+            out.append(c)
+            i += 1
+            if c == "(":
+                parens.append(word in STATEMENT_HEADS)
+            elif c == ")" and parens and parens.pop():
+                prev, word = ";", ""
+                continue
+            # `a.b` / numbers: treat like identifiers for the operator heuristic
+            prev, word = ("a" if c.isdigit() or c == "." else c), ""
+        if in_braces:
+            raise self.error("unterminated '{'", n)
+        return "".join(out), i
+
+    def string_end(self, i: int) -> int:
+        src, q = self.src, self.src[i]
+        j = i + 1
+        while j < len(src):
+            if src[j] == "\\":
+                j += 2
+                continue
+            if src[j] == q:
+                return j + 1
+            if src[j] == "\n":
+                break
+            j += 1
+        raise self.error("unterminated string", i)
+
+    def regex_end(self, i: int) -> int:
+        src, j, in_class = self.src, i + 1, False
+        while j < len(src) and src[j] != "\n":
+            c = src[j]
+            if c == "\\":
+                j += 2
+                continue
+            if c == "[":
+                in_class = True
+            elif c == "]":
+                in_class = False
+            elif c == "/" and not in_class:
+                j += 1
+                while j < len(src) and (src[j].isalnum()):
+                    j += 1
+                return j
+            j += 1
+        raise self.error("unterminated regular expression", i)
+
+    def template(self, i: int) -> tuple[str, int]:
+        src, out, j = self.src, ["`"], i + 1
+        while j < len(src):
+            c = src[j]
+            if c == "\\":
+                out.append(src[j:j + 2])
+                j += 2
+            elif c == "`":
+                out.append("`")
+                return "".join(out), j + 1
+            elif src.startswith("${", j):
+                code, j = self.js(j + 2, in_braces=True)
+                out.append("${" + code + "}")
+                j += 1
+            else:
+                out.append(c)
+                j += 1
+        raise self.error("unterminated template literal", i)
+
+    # ── JSX ───────────────────────────────────────────────────────────────
+    def skip_ws(self, i: int) -> int:
+        while i < len(self.src) and self.src[i] in " \t\r\n":
+            i += 1
+        return i
+
+    def expression(self, i: int) -> tuple[str, int]:
+        """Compile the ``{...}`` container at *i*; return (code, index after ``}``)."""
+        code, j = self.js(i + 1, in_braces=True)
+        return code.strip(), j + 1
+
+    def element(self, i: int) -> tuple[str, int]:
+        src = self.src
+        i += 1
+        if src[i] == ">":
+            children, i = self.children(i + 1, "")
+            return self.create(self.fragment, "null", children), i
+        m = _TAG.match(src, i)
+        name = m.group()
+        i = m.end()
+        # Lower-case names and dashed ones are host elements; `a.B` is a member expression, like `Foo`.
+        tag = repr_js(name) if "." not in name and (name[0].islower() or "-" in name) else name
+        props: list[str] = []
+        while True:
+            i = self.skip_ws(i)
+            if src.startswith("/>", i):
+                return self.create(tag, self.props(props), []), i + 2
+            if src.startswith(">", i):
+                children, i = self.children(i + 1, name)
+                return self.create(tag, self.props(props), children), i
+            if src.startswith("{", i):
+                i = self.skip_ws(i + 1)
+                if not src.startswith("...", i):
+                    raise self.error("expected spread attribute", i)
+                code, i = self.js(i + 3, in_braces=True)
+                props.append("..." + code.strip())
+                i += 1
+                continue
+            m = _ATTR.match(src, i)
+            if not m:
+                raise self.error(f"unexpected character {src[i]!r} in <{name}>", i)
+            key = m.group()
+            key_js = key if _IDENT.fullmatch(key) else repr_js(key)
+            i = self.skip_ws(m.end())
+            if not src.startswith("=", i):
+                props.append(f"{key_js}:true")
+                continue
+            i = self.skip_ws(i + 1)
+            if src[i] in "'\"":
+                j = self.string_end(i)
+                props.append(f"{key_js}:{repr_js(src[i + 1:j - 1])}")
+                i = j
+            elif src[i] == "{":
+                code, i = self.expression(i)
+                props.append(f"{key_js}:{code}")
+            elif src[i] == "<":
+                code, i = self.element(i)
+                props.append(f"{key_js}:{code}")
+            else:
+                raise self.error(f"bad value for attribute {key!r}", i)
+
+    def children(self, i: int, name: str) -> tuple[list[str], int]:
+        src, n = self.src, len(self.src)
+        out: list[str] = []
+        start = i
+        while i < n:
+            c = src[i]
+            if c == "<" and src.startswith("</", i):
+                self.text(src[start:i], out)
+                j = self.skip_ws(i + 2)
+                m = _TAG.match(src, j)
+                closing = m.group() if m else ""
+                if closing != name:
+                    raise self.error(f"expected </{name}>, found </{closing}>", i)
+                j = self.skip_ws(m.end() if m else j)
+                if not src.startswith(">", j):
+                    raise self.error("expected '>'", j)
+                return out, j + 1
+            if c == "<":
+                self.text(src[start:i], out)
+                code, i = self.element(i)
+                out.append(code)
+                start = i
+                continue
+            if c == "{":
+                self.text(src[start:i], out)
+                code, i = self.expression(i)
+                if _strip_comments(code):
+                    out.append(code)
+                start = i
+                continue
+            i += 1
+        raise self.error(f"unterminated <{name}>", start)
+
+    @staticmethod
+    def text(raw: str, out: list[str]) -> None:
+        """Apply JSX whitespace rules to a text run and append it if non-empty."""
+        lines = raw.split("\n")
+        kept = []
+        for k, line in enumerate(lines):
+            if k > 0:
+                line = line.lstrip(" \t")
+            if k < len(lines) - 1:
+                line = line.rstrip(" \t\r")
+            if line:
+                kept.append(line)
+        text = " ".join(kept)
+        for entity, ch in _ENTITIES.items():
+            text = text.replace(entity, ch)
+        if text:
+            out.append(repr_js(text))
+
+    @staticmethod
+    def props(props: list[str]) -> str:
+        return "{" + ",".join(props) + "}" if props else "null"
+
+    def create(self, tag: str, props: str, children: list[str]) -> str:
+        return f"{self.pragma}({', '.join([tag, props, *children])})"
+
+
+def _strip_comments(code: str) -> str:
+    return re.sub(r"/\*.*?\*/", "", code, flags=re.S).strip()
+
+
+def repr_js(s: str) -> str:
+    """Return *s* as a double-quoted JS string literal."""
+    return '"' + (s.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                  .replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")) + '"'
@@ -0,0 +1,148 @@
+"""Conservative JavaScript / CSS minification for the build.
+
+This is deliberately not a full minifier: it never renames or reorders
+anything.  It drops comments and collapses whitespace, keeping a newline
+wherever removing it could change automatic semicolon insertion.  String,
+template and regex literals are copied through untouched.
+"""
+
+from __future__ import annotations
+
+import re
+
+from .jsx import EXPR_KEYWORDS, STATEMENT_HEADS
+
+__all__ = ["minify_js", "minify_css"]
+
+_WORD = re.compile(r"[\w$\\]")
+# A newline after one of these, or before one of the next set, never ends a statement.
+_JOIN_AFTER = set("{([,;:=&|?!+-*/%<>~^")
+_JOIN_BEFORE = set("})],;:.?=&|*/%<>")
+_EXPR_PRECEDERS = set("(,=:[!&|?{};*%<>~^")
+
+
+def minify_js(src: str) -> str:
+    """Return *src* with comments removed and whitespace collapsed."""
+    out: list[str] = []
+    n, i = len(src), 0
+    pending = ""                     # "", " " or "\n": whitespace seen since the last token
+    parens: list[bool] = []          # open parens: does each close a statement head?
+    after_head = False               # the last token closed `if (...)` and friends
+
+    def last() -> str:
+        return out[-1][-1] if out else ""
+
+    def emit(tok: str) -> None:
+        nonlocal pending
+        if pending and out:
+            p, c = last(), tok[0]
+            if pending == "\n" and p not in _JOIN_AFTER and c not in _JOIN_BEFORE:
+                out.append("\n")
+            elif (_WORD.match(p) and _WORD.match(c)) or (p + c) in ("++", "--", "//", "+-", "-+"):
+                out.append(" ")
+        pending = ""
+        out.append(tok)
+
+    while i < n:
+        c = src[i]
+        if c in " \t\r\n":
+            if c == "\n" or pending == "\n":
+                pending = "\n"
+            elif not pending:
+                pending = " "
+            i += 1
+            continue
+        if src.startswith("//", i):
+            j = src.find("\n", i)
+            i = n if j < 0 else j
+            continue
+        if src.startswith("/*", i):
+            j = src.find("*/", i + 2)
+            i = n if j < 0 else j + 2
+            if not pending:
+                pending = " "
+            continue
+        if c in "'\"`":
+            j = _literal_end(src, i)
+        elif c == "/" and (not out or last() in _EXPR_PRECEDERS or out[-1] in EXPR_KEYWORDS or out[-1] == "/"
+                           or after_head):
+            j = _regex_end(src, i)
+        else:
+            m = _WORD.match(src, i)
+            j = i + 1
+            if m:
+                while j < n and _WORD.match(src, j):
+                    j += 1
+        tok = src[i:j]
+        after_head = False
+        if tok == "(":
+            parens.append(len(out) > 0 and out[-1] in STATEMENT_HEADS)
+        elif tok == ")" and parens:
+            after_head = parens.pop()
+        emit(tok)
+        i = j
+    return "".join(out).strip()
+
+
+def _literal_end(src: str, i: int) -> int:
+    """End of the string or template literal starting at *i*."""
+    q, j = src[i], i + 1
+    while j < len(src):
+        c = src[j]
+        if c == "\\":
+            j += 2
+            continue
+        if c == q:
+            return j + 1
+        if q == "`" and src.startswith("${", j):
+            j = _substitution_end(src, j + 2)
+            continue
+        j += 1
+    return j
+
+
+def _substitution_end(src: str, i: int) -> int:
+    """End of the ``${...}`` whose expression starts at *i*: braces balanced, literals (and templates) skipped."""
+    depth = 0
+    while i < len(src):
+        c = src[i]
+        if c in "'\"`":
+            i = _literal_end(src, i)
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            if not depth:
+                return i + 1
+            depth -= 1
+        i += 1
+    return i
+
+
+def _regex_end(src: str, i: int) -> int:
+    j, in_class = i + 1, False
+    while j < len(src) and src[j] != "\n":
+        c = src[j]
+        if c == "\\":
+            j += 2
+            continue
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            j += 1
+            while j < len(src) and src[j].isalnum():
+                j += 1
+            return j
+        j += 1
+    return j
+
+
+def minify_css(src: str) -> str:
+    """Strip comments and redundant whitespace from a stylesheet."""
+    src = re.sub(r"/\*.*?\*/", "", src, flags=re.S)
+    src = re.sub(r"\s+", " ", src)
+    src = re.sub(r"\s*([{};,>])\s*", r"\1", src)
+    src = re.sub(r":\s+", ":", src)
+    return src.replace(";}", "}").strip()
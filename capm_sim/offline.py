@@ -0,0 +1,120 @@
+"""Offline support: the service worker and the sharded question bank.
+
+The build emits ``sw.js`` (see :func:`service_worker`), which precaches the
+app shell — ``index.html`` and every hashed asset — when it installs and
+serves it cache-first afterwards, so a repeat visit starts without touching
+the network.  Google Fonts are cached the first time they load.
+
+The server splits the public half of the bank (stem and options, never the
+key) into one JSON shard per domain, named by content hash, and publishes
+``/bank/manifest.json`` listing them.  The worker keeps the shards in their
+own cache and, on every visit, fetches only the manifest and whichever
+shards it does not already hold — an edit to one domain re-downloads that
+domain, nothing else — then drops shards the manifest no longer lists.  An
+exam that has started renders its remaining pages from these shards when
+the network is gone.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+
+from .bank import DOMAINS
+from .bankfile import MappedBank
+
+__all__ = ["MANIFEST", "BankShards", "bank_shards", "service_worker"]
+
+MANIFEST = "/bank/manifest.json"
+
+
+@dataclass
+class BankShards:
+    files: dict[str, bytes] = field(default_factory=dict)   # URL path -> shard JSON
+    manifest: dict = field(default_factory=dict)
+
+
+def bank_shards(bank: MappedBank) -> BankShards:
+    """One content-hashed shard per domain, plus the manifest that lists them."""
+    out = BankShards()
+    shards = []
+    for domain in DOMAINS:
+        rows = bank.public(bank.ids(domain))
+        if not rows:
+            continue
+        data = json.dumps(rows, separators=(",", ":"), ensure_ascii=False).encode()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        url = f"/bank/{re.sub(r'[^a-z]+', '-', domain.lower())}.{digest}.json"
+        out.files[url] = data
+        shards.append({"domain": domain, "url": url, "hash": digest, "count": len(rows), "bytes": len(data)})
+    version = hashlib.sha256("".join(s["hash"] for s in shards).encode()).hexdigest()[:12]
+    out.manifest = {"version": version, "shards": shards}
+    return out
+
+
+_SERVICE_WORKER = r"""
+const VERSION = %(version)s;
+const PRECACHE = %(precache)s;
+const SHELL = "shell-" + VERSION, BANK = "bank", FONTS = "fonts";
+const MANIFEST = %(manifest)s;
+
+self.addEventListener("install", e => {
+  e.waitUntil(caches.open(SHELL).then(c => c.addAll(PRECACHE)).then(() => self.skipWaiting()));
+});
+
+self.addEventListener("activate", e => {
+  e.waitUntil(caches.keys()
+    .then(keys => Promise.all(keys.filter(k => k.startsWith("shell-") && k !== SHELL).map(k => caches.delete(k))))
+    .then(() => self.clients.claim())
+    .then(syncBank));
+});
+
+self.addEventListener("message", e => { if (e.data === "sync-bank") e.waitUntil(syncBank()); });
+
+// Fetch the manifest, download only the shards not already cached, drop the rest.
+let syncing = null;
+function syncBank() {
+  return syncing || (syncing = (async () => {
+    const res = await fetch(MANIFEST, {cache: "no-store"});
+    if (!res.ok) return;
+    const manifest = await res.clone().json();
+    const cache = await caches.open(BANK);
+    const want = new Set(manifest.shards.map(s => s.url));
+    const have = new Set((await cache.keys()).map(r => new URL(r.url).pathname));
+    await Promise.all([...want].filter(u => !have.has(u)).map(u => cache.add(u)));
+    await Promise.all([...have].filter(u => u !== MANIFEST && !want.has(u)).map(u => cache.delete(u)));
+    await cache.put(MANIFEST, res);
+  })().catch(() => {}).finally(() => { syncing = null; }));
+}
+
+self.addEventListener("fetch", e => {
+  const req = e.request;
+  if (req.method !== "GET") return;
+  const url = new URL(req.url);
+  if (url.origin === location.origin) {
+    if (url.pathname.startsWith("/api/") || url.pathname === MANIFEST) return;
+    if (req.mode === "navigate") {
+      e.respondWith(caches.match("/", {cacheName: SHELL}).then(hit => hit || fetch(req)));
+    } else {
+      e.respondWith(caches.match(req).then(hit => hit || fetch(req)));
+    }
+  } else if (url.hostname === "fonts.googleapis.com" || url.hostname === "fonts.gstatic.com") {
+    // Stale-while-revalidate: fonts never block a start, and refresh when online.
+    e.respondWith(caches.open(FONTS).then(async cache => {
+      const hit = await cache.match(req);
+      const fresh = fetch(req).then(r => { if (r.ok || r.type === "opaque") cache.put(req, r.clone()); return r; });
+      if (!hit) return fresh;
+      fresh.catch(() => {});
+      return hit;
+    }));
+  }
+});
+"""
+
+
+def service_worker(precache: list[str], version: str) -> str:
+    """Source of ``sw.js`` for a shell made of *precache* (site-absolute URLs)."""
+    return _SERVICE_WORKER.lstrip() % {"version": json.dumps(version), "precache": json.dumps(precache),
+                                       "manifest": json.dumps(MANIFEST)}
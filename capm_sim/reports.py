@@ -0,0 +1,265 @@
+"""Batch score reports: one self-contained HTML page per submitted exam, zipped.
+
+    python -m capm_sim.reports reports.zip [--since 2026-09-01] [--until 2026-10-01] [--workers N]
+
+Every exam submitted in the window gets ``reports/<exam id>.html`` — score,
+pass/fail, the domain breakdown and each item answered wrong with the
+chosen option, the keyed one and the explanation — with its styles inline
+so it opens anywhere, offline.  ``index.csv`` lists the exams with
+candidate, score and outcome.
+
+Attempts are streamed from the exam store in chunks of ``--chunk`` and
+rendered in a process pool.  Each worker maps the bank file once (the
+pages are shared with every other worker and the server), builds the
+answer key from the mapped columns and scores its chunk as one matrix, so
+only the items a candidate got wrong are ever decoded; their rendered
+fragments are kept in a bounded per-worker cache, as most of a cohort
+misses the same few hundred items.  At most two chunks per worker are in
+flight and the parent writes each report into the archive as its chunk
+comes back, so memory is fixed by ``--chunk`` and ``--workers``, not by the
+size of the cohort (``index.csv`` is spooled to disk until the end).  Compression is the one serial step, so it defaults
+to deflate level 1 (``--level``): a sixth larger than level 6 at half the
+cost.  The archive is written beside *out* and moved into
+place when complete.  A bank swapped during the run does not affect it:
+workers keep the file they mapped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import html
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+from typing import Iterator
+
+import numpy as np
+
+from .bank import BANK_DB, DOMAINS
+from .bankfile import BANK_FILE, MappedBank
+from .exams import EXAMS_DB, PASS_PCT, ExamStore
+from .scoring import AnswerKey, pad, score_batch
+
+__all__ = ["ReportStats", "write_reports"]
+
+CHUNK = 200            # attempts per pool task
+ITEM_CACHE = 20_000    # rendered (item, chosen option) fragments kept per worker
+
+Attempt = tuple[str, float, list[int], list[int | None], bytes | None]
+
+_PAGE = Template("""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">
+<title>CAPM practice exam report — $when</title>
+<style>
+body{margin:0;background:#0f172a;color:#e2e8f0;font:15px/1.5 system-ui,-apple-system,Segoe UI,sans-serif}
+main{max-width:760px;margin:0 auto;padding:32px 20px}
+h1{font-size:22px;margin:0 0 4px}h2{font-size:17px;margin:32px 0 12px}
+.muted{color:#94a3b8;font-size:13px}
+.card{background:#1e293b;border-radius:12px;padding:20px;margin-top:16px}
+.score{display:flex;align-items:center;gap:24px}
+.ring{width:120px;height:120px;border-radius:50%;display:grid;place-items:center;flex:none;
+background:conic-gradient($colour ${pct}%,#334155 0)}
+.ring b{width:96px;height:96px;border-radius:50%;background:#1e293b;display:grid;place-items:center;font-size:26px}
+.verdict{font-size:20px;font-weight:700;color:$colour}
+table{width:100%;border-collapse:collapse}td{padding:6px 0}td.n{text-align:right;width:90px;color:#94a3b8}
+.bar{height:8px;background:#334155;border-radius:4px;overflow:hidden}.bar i{display:block;height:100%}
+.q{border-top:1px solid #334155;padding:16px 0}.q:first-child{border:0}
+.tag{font-size:12px;color:#94a3b8;text-transform:uppercase;letter-spacing:.05em}
+ol{margin:8px 0;padding-left:22px}li{margin:2px 0}
+.picked{color:#f87171}.key{color:#4ade80;font-weight:600}
+.why{background:#0f172a;border-radius:8px;padding:10px 12px;margin-top:8px;color:#cbd5e1}
+</style></head><body><main>
+<h1>Practice exam report</h1>
+<div class="muted">Submitted $when · exam $exam$candidate</div>
+<div class="card score"><div class="ring"><b>$pct_text%</b></div>
+<div><div class="verdict">$verdict</div><div>$correct of $total correct · pass mark $pass_pct%</div>
+<div class="muted">$unanswered unanswered</div></div></div>
+<h2>By domain</h2>
+<div class="card"><table>$domains</table></div>
+<h2>Incorrect items ($wrong)</h2>
+<div class="card">$items</div>
+</main></body></html>
+""")
+
+_DOMAIN = Template("""<tr><td>$name<div class="bar"><i style="width:$pct%;background:$colour"></i></div></td>\
+<td class="n">$correct / $total</td></tr>""")
+
+_ITEM = Template("""<div class="q"><div class="tag">$domain · item $id</div><div>$question</div>\
+<ol type="A">$options</ol>\
+<div>Your answer: <span class="picked">$chosen</span> · correct: <span class="key">$key</span></div>$why</div>""")
+
+_NONE_WRONG = '<div class="muted">None — every item was answered correctly.</div>'
+
+
+def _colour(pct: float) -> str:
+    return "#4ade80" if pct >= PASS_PCT else "#fbbf24" if pct >= PASS_PCT - 10 else "#f87171"
+
+
+@dataclass
+class ReportStats:
+    reports: int
+    skipped: int       # items dropped because the bank no longer has them
+    bytes: int         # size of the archive
+    seconds: float
+
+
+_bank: MappedBank | None = None
+_key: AnswerKey | None = None
+
+
+def _init_worker(bank_path: Path) -> None:
+    global _bank, _key
+    _bank = MappedBank(bank_path)
+    _key = AnswerKey.from_bank(_bank)
+    _render_item.cache_clear()
+
+
+@lru_cache(maxsize=ITEM_CACHE)
+def _render_item(item: int, picked: int) -> str:
+    """*item* as shown to a candidate who chose option *picked* (-1 = none), explanation included."""
+    row = _bank.full([item])[0]
+    correct, options = row["correct"], row["options"]
+    marks = "".join(f'<li class="key">{html.escape(o)}</li>' if i == correct
+                    else f'<li class="picked">{html.escape(o)}</li>' if i == picked
+                    else f"<li>{html.escape(o)}</li>" for i, o in enumerate(options))
+    why = html.escape(row.get("explanation", ""))
+    return _ITEM.substitute(domain=html.escape(row["domain"]), id=item, question=html.escape(row["question"]),
+                            options=marks, chosen=chr(65 + picked) if 0 <= picked < len(options) else "not answered",
+                            key=chr(65 + correct), why=f'<div class="why">{why}</div>' if why else "")
+
+
+def _render_chunk(chunk: list[Attempt]) -> tuple[list[tuple[str, float, bytes, list]], int]:
+    """Reports for *chunk*: ``([(exam id, submitted, html, index row), ...], items skipped)``."""
+    items, responses = pad([a[2] for a in chunk]), pad([a[3] for a in chunk])
+    # Items retired from the bank since the exam was taken are left out rather than failing the chunk.
+    gone = _key.retire(items)
+    scores = score_batch(_key, items, responses)
+    idx = _key.index(items)
+    wrong = (idx >= 0) & (_key.correct[np.where(idx >= 0, idx, 0)] != responses)
+    pct = scores.pct
+    out = []
+    for r, (exam_id, submitted, _, _, candidate) in enumerate(chunk):
+        p = float(pct[r])
+        colour = _colour(p)
+        domains = "".join(
+            _DOMAIN.substitute(name=html.escape(d), pct=f"{c * 100 / t:.0f}", colour=_colour(c * 100 / t),
+                               correct=c, total=t)
+            for d, c, t in zip(DOMAINS, scores.domain_correct[r].tolist(), scores.domain_total[r].tolist()) if t)
+        missed = np.flatnonzero(wrong[r])
+        body = "".join(_render_item(int(items[r, j]), int(responses[r, j])) for j in missed.tolist())
+        when = datetime.fromtimestamp(submitted, timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+        who = candidate.hex() if candidate else ""
+        page = _PAGE.substitute(
+            when=when, exam=exam_id, candidate=f" · candidate {who[:8]}" if who else "", colour=colour,
+            pct=f"{p:.1f}", pct_text=f"{p:.0f}", verdict="Pass" if p >= PASS_PCT else "Not yet passing",
+            correct=int(scores.correct[r]), total=int(scores.total[r]), pass_pct=PASS_PCT,
+            unanswered=int(((items[r] >= 0) & (responses[r] < 0)).sum()), domains=domains, wrong=len(missed),
+            items=body or _NONE_WRONG)
+        row = [exam_id, who, when, int(scores.correct[r]), int(scores.total[r]), f"{p:.1f}", int(p >= PASS_PCT)]
+        out.append((exam_id, submitted, page.encode(), row))
+    return out, gone
+
+
+def _chunks(exams: ExamStore, since: float, until: float, size: int) -> Iterator[list[Attempt]]:
+    chunk: list[Attempt] = []
+    for attempt in exams.window(since, until):
+        chunk.append(attempt)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_reports(exams: ExamStore, out: Path, bank_path: Path = BANK_FILE, since: float = 0.0,
+                  until: float = float("inf"), workers: int | None = None, chunk: int = CHUNK,
+                  level: int = 1) -> ReportStats:
+    """Render a report for every exam submitted in ``(since, until]`` into the zip archive *out*."""
+    t0 = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    reports = skipped = 0
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    # Index rows go to an unnamed file on disk (a zip takes one member at a time) and are copied in at the end.
+    with tempfile.TemporaryFile("w+", newline="", encoding="utf-8") as index, \
+            zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED, compresslevel=level) as archive:
+        csv.writer(index).writerow(["exam", "candidate", "submitted", "correct", "total", "pct", "passed"])
+        def store(done: tuple[list[tuple[str, float, bytes, list]], int]) -> None:
+            nonlocal reports, skipped
+            rendered, gone = done
+            rows = csv.writer(index)
+            for exam_id, submitted, page, row in rendered:
+                info = zipfile.ZipInfo(f"reports/{exam_id}.html", time.gmtime(submitted)[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                archive.writestr(info, page, compresslevel=level)
+                rows.writerow(row)
+            reports += len(rendered)
+            skipped += gone
+
+        if workers > 1:
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(bank_path,)) as pool:
+                # Reports are stored in submission order; the window keeps the pool busy without letting
+                # finished chunks pile up behind a slow one.
+                pending: deque[Future] = deque()
+                for part in _chunks(exams, since, until, chunk):
+                    pending.append(pool.submit(_render_chunk, part))
+                    if len(pending) >= 2 * workers:
+                        store(pending.popleft().result())
+                while pending:
+                    store(pending.popleft().result())
+        else:
+            _init_worker(bank_path)
+            for part in _chunks(exams, since, until, chunk):
+                store(_render_chunk(part))
+        index.seek(0)
+        with archive.open("index.csv", "w") as member:
+            for line in index:
+                member.write(line.encode())
+    os.replace(tmp, out)
+    return ReportStats(reports, skipped, out.stat().st_size, time.perf_counter() - t0)
+
+
+def _when(text: str) -> float:
+    """Epoch seconds of an ISO date or date-time (UTC unless it says otherwise)."""
+    dt = datetime.fromisoformat(text)
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m capm_sim.reports",
+                                 description="Render an HTML score report per submitted exam into a zip archive.")
+    ap.add_argument("out", type=Path)
+    ap.add_argument("--since", type=_when, default=0.0, help="ISO date; exams submitted after it")
+    ap.add_argument("--until", type=_when, default=float("inf"), help="ISO date; exams submitted up to it")
+    ap.add_argument("--bank", type=Path, default=BANK_FILE, help="mapped bank file (compiled first if stale)")
+    ap.add_argument("--exams", type=Path, default=EXAMS_DB)
+    ap.add_argument("--workers", type=int, default=None, help="render processes (default: all cores)")
+    ap.add_argument("--chunk", type=int, default=CHUNK, help="attempts per task")
+    ap.add_argument("--level", type=int, default=1, choices=range(10), metavar="0-9", help="deflate level")
+    args = ap.parse_args(argv)
+
+    MappedBank.open(args.bank, args.bank.with_name(BANK_DB.name)).close()
+    exams = ExamStore(args.exams)
+    try:
+        stats = write_reports(exams, args.out, args.bank, args.since, args.until, args.workers, args.chunk,
+                              args.level)
+    finally:
+        exams.close()
+    print(f"{stats.reports} reports -> {args.out} ({stats.bytes / 2**20:.1f} MB) in {stats.seconds:.1f}s"
+          + (f"; {stats.skipped} retired items left out" if stats.skipped else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
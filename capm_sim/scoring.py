@@ -0,0 +1,185 @@
+"""Vectorised scoring against the answer key.
+
+A batch of attempts is scored as one response matrix: row *r* holds the
+options chosen on attempt *r* (``-1`` = unanswered) and a parallel matrix
+holds the bank row of each item, so correctness is a single comparison with
+the key vector and per-domain totals are one ``bincount`` each.  Forms of
+different lengths are padded with item index ``-1``.
+
+Rescoring every stored attempt after a key correction::
+
+    python -m capm_sim.scoring rescore
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from .bank import BANK_DB, DOMAINS, QuestionBank
+from .bankfile import MappedBank
+from .exams import EXAMS_DB, PASS_PCT, ExamStore
+
+__all__ = ["AnswerKey", "BatchScores", "rescore", "score_attempts", "score_batch"]
+
+
+@dataclass
+class AnswerKey:
+    """Key vector and domain codes for every bank item, sorted by id."""
+
+    ids: np.ndarray        # int64, ascending
+    correct: np.ndarray    # int8
+    domain: np.ndarray     # int8, index into DOMAINS
+
+    def __post_init__(self) -> None:
+        # Banks with reasonably dense ids get a direct id -> row table instead of a binary search.
+        top = int(self.ids[-1]) if len(self.ids) else -1
+        self._rows = None
+        if 0 <= top < 4 * len(self.ids) + 1024:
+            self._rows = np.full(top + 2, -2, dtype=np.int64)   # last slot: out-of-range ids
+            self._rows[self.ids] = np.arange(len(self.ids))
+
+    @classmethod
+    def from_bank(cls, bank: QuestionBank | MappedBank) -> "AnswerKey":
+        if isinstance(bank, MappedBank):
+            # Already columns in id order: the key is views of the mapping, no row scan.
+            return cls(*bank.key_columns())
+        rows = bank.key()
+        ids = np.fromiter((r[0] for r in rows), np.int64, len(rows))
+        correct = np.fromiter((r[1] for r in rows), np.int8, len(rows))
+        codes = {d: i for i, d in enumerate(DOMAINS)}
+        domain = np.fromiter((codes[r[2]] for r in rows), np.int8, len(rows))
+        order = np.argsort(ids, kind="stable")
+        return cls(ids[order], correct[order], domain[order])
+
+    def retire(self, item_ids: np.ndarray) -> int:
+        """Turn ids the key no longer has (items retired since the attempt) into padding, in place; how many."""
+        gone = (item_ids >= 0) & ~np.isin(item_ids, self.ids)
+        item_ids[gone] = -1
+        return int(gone.sum())
+
+    def index(self, item_ids: np.ndarray) -> np.ndarray:
+        """Map question ids to key rows; ``-1`` ids stay ``-1``, unknown ids raise."""
+        if self._rows is not None:
+            top = len(self._rows) - 1
+            idx = self._rows[np.where((item_ids < 0) | (item_ids >= top), top, item_ids)]
+            idx = np.where(item_ids < 0, -1, idx)
+            if (idx == -2).any():
+                raise KeyError("attempt references items missing from the key")
+            return idx
+        idx = np.searchsorted(self.ids, item_ids)
+        idx = np.minimum(idx, len(self.ids) - 1)
+        pad = item_ids < 0
+        if not np.all(pad | (self.ids[idx] == item_ids)):
+            raise KeyError("attempt references items missing from the key")
+        return np.where(pad, -1, idx)
+
+
+@dataclass
+class BatchScores:
+    correct: np.ndarray          # (m,) items correct per attempt
+    total: np.ndarray            # (m,) items on each form
+    domain_correct: np.ndarray   # (m, len(DOMAINS))
+    domain_total: np.ndarray     # (m, len(DOMAINS))
+
+    @property
+    def pct(self) -> np.ndarray:
+        return np.divide(self.correct * 100.0, self.total, out=np.zeros(len(self.total)), where=self.total > 0)
+
+    @property
+    def passed(self) -> np.ndarray:
+        return self.pct >= PASS_PCT
+
+    def as_dicts(self) -> list[dict]:
+        pct, passed = self.pct, self.passed
+        return [
+            {"correct": int(self.correct[r]), "total": int(self.total[r]), "pct": float(pct[r]),
+             "passed": bool(passed[r]),
+             "domains": {d: [int(self.domain_correct[r, j]), int(self.domain_total[r, j])]
+                         for j, d in enumerate(DOMAINS) if self.domain_total[r, j]}}
+            for r in range(len(self.total))
+        ]
+
+
+def pad(rows: Sequence[Sequence[int | None]], fill: int = -1) -> np.ndarray:
+    """Stack ragged rows into an int matrix, ``None`` and padding as *fill*."""
+    width = max((len(r) for r in rows), default=0)
+    out = np.full((len(rows), width), fill, dtype=np.int64)
+    for i, r in enumerate(rows):
+        out[i, :len(r)] = [fill if v is None else v for v in r]
+    return out
+
+
+def score_batch(key: AnswerKey, items: np.ndarray, responses: np.ndarray) -> BatchScores:
+    """Score *responses* (m×k options, -1 = none) on forms *items* (m×k question ids, -1 = pad)."""
+    m, nd = items.shape[0], len(DOMAINS)
+    idx = key.index(items)
+    present = idx >= 0
+    safe = np.where(present, idx, 0)
+    hit = present & (key.correct[safe] == responses)
+    dom = key.domain[safe].astype(np.int64)
+    # One flat bincount per statistic: bucket = attempt * nd + domain.
+    bucket = (np.arange(m, dtype=np.int64)[:, None] * nd + dom)[present]
+    domain_total = np.bincount(bucket, minlength=m * nd).reshape(m, nd)
+    domain_correct = np.bincount(bucket, weights=hit[present], minlength=m * nd).reshape(m, nd).astype(np.int64)
+    return BatchScores(hit.sum(axis=1), present.sum(axis=1), domain_correct, domain_total)
+
+
+def score_attempts(key: AnswerKey, attempts: Iterable[tuple[Sequence[int], Sequence[int | None]]]) -> BatchScores:
+    """Convenience wrapper over :func:`score_batch` for ``(items, responses)`` pairs."""
+    attempts = list(attempts)
+    return score_batch(key, pad([a[0] for a in attempts]), pad([a[1] for a in attempts]))
+
+
+def rescore(bank: QuestionBank, exams: ExamStore, chunk: int = 50_000) -> tuple[int, int]:
+    """Rescore every submitted exam against the current key; return ``(attempts changed, items skipped)``.
+
+    Items retired from the bank since an exam was taken are left out of its score.
+    """
+    key = AnswerKey.from_bank(bank)
+    changed = skipped = 0
+    batch: list[tuple[str, list[int], list[int | None], int]] = []
+
+    def flush() -> None:
+        nonlocal changed, skipped
+        items = pad([b[1] for b in batch])
+        skipped += key.retire(items)
+        scores = score_batch(key, items, pad([b[2] for b in batch]))
+        updates = [(int(c), b[0]) for b, c in zip(batch, scores.correct) if int(c) != b[3]]
+        exams.update_scores(updates)
+        changed += len(updates)
+        batch.clear()
+
+    for row in exams.submissions():
+        batch.append(row)
+        if len(batch) >= chunk:
+            flush()
+    if batch:
+        flush()
+    return changed, skipped
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m capm_sim.scoring")
+    ap.add_argument("command", choices=["rescore"])
+    ap.add_argument("--bank", type=Path, default=BANK_DB)
+    ap.add_argument("--exams", type=Path, default=EXAMS_DB)
+    args = ap.parse_args(argv)
+
+    bank, exams = QuestionBank.open(args.bank), ExamStore(args.exams)
+    try:
+        changed, skipped = rescore(bank, exams)
+        print(f"{changed} attempts changed score" + (f"; {skipped} retired items left out" if skipped else ""))
+    finally:
+        bank.close()
+        exams.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
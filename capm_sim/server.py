@@ -0,0 +1,324 @@
+"""ASGI server for the simulator.
+
+Serves the compiled app shell (see :mod:`capm_sim.build`) and its assets
+from memory, precompressed at startup, the question-bank shards the
+service worker keeps for offline use (:mod:`capm_sim.offline`), the study
+sections (:mod:`capm_sim.study`), plus the JSON API the page talks to::
+
+    python -m capm_sim.server --port 8000 --workers 4
+
+or under any ASGI server with ``capm_sim.server:create_app`` as a factory.
+``--var DIR`` (or ``$CAPM_SIM_VAR``) keeps all runtime data (bank, exams,
+journal, item parameters, review queue, study links, score sketches,
+telemetry) in *DIR* instead of ``var/``.
+
+Workers read the bank from the memory-mapped ``bank.bin``
+(:mod:`capm_sim.bankfile`), compiled once by the parent before they fork,
+and pick up a swapped file without restarting.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterable
+from urllib.parse import parse_qsl
+
+from . import APP_SHELL
+from .adaptive import IRT_PARAMS, PracticeStore
+from .assets import IMMUTABLE, REVALIDATE, AssetStore
+from .bank import BANK_DB
+from .bankfile import BANK_FILE, MappedBank
+from .build import VENDOR, BuildError, compile_shell
+from .cohort import COHORT_DIR, Cohort
+from .exams import EXAM_SECONDS, EXAMS_DB, GRACE_SECONDS, ExamStore
+from .journal import JOURNAL_DIR, Journal
+from .offline import MANIFEST, bank_shards
+from .srs import SRS_DB, SRSStore
+from .study import STUDY_INDEX, StudyIndex
+from .telemetry import TELEMETRY_DIR, Telemetry
+
+__all__ = ["App", "HTTPError", "Request", "Response", "create_app"]
+
+log = logging.getLogger(__name__)
+
+MAX_BODY = 1 << 20
+# Journal writes stop at an exam's deadline plus grace, so a log idle this long is past both; it is kept a
+# day more so an attempt finished offline can still be submitted late with its synced answers.
+JOURNAL_MAX_AGE = EXAM_SECONDS + GRACE_SECONDS + 24 * 3600
+VAR_ENV = "CAPM_SIM_VAR"
+
+
+class HTTPError(Exception):
+    """Raised by handlers to produce a JSON error response."""
+
+    def __init__(self, status: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: dict[str, str]
+    headers: dict[str, str]
+    body: bytes = b""
+    params: dict[str, str] = field(default_factory=dict)
+
+    def json(self) -> Any:
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError:
+            raise HTTPError(400, "request body is not valid JSON") from None
+
+
+@dataclass
+class Response:
+    body: bytes = b""
+    status: int = 200
+    content_type: str = "application/json"
+    headers: list[tuple[bytes, bytes]] = field(default_factory=list)
+
+    @classmethod
+    def json(cls, data: Any, status: int = 200) -> "Response":
+        return cls(json.dumps(data, separators=(",", ":")).encode(), status)
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class App:
+    """Minimal ASGI application: static assets plus a table of JSON routes."""
+
+    def __init__(self, assets: AssetStore):
+        self.assets = assets
+        self._routes: list[tuple[str, re.Pattern[str], Handler, int]] = []
+        self._startup: list[Callable[[], Any]] = []
+        self._shutdown: list[Callable[[], Any]] = []
+        self._before: list[Callable[[], Any]] = []
+
+    def route(self, method: str, pattern: str, max_body: int = MAX_BODY) -> Callable[[Handler], Handler]:
+        """Register a handler; ``{name}`` segments are exposed as ``request.params``.
+
+        Request bodies over *max_body* bytes are refused with 413.
+        """
+        regex = re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", pattern) + "$")
+
+        def decorator(fn: Handler) -> Handler:
+            self._routes.append((method, regex, fn, max_body))
+            return fn
+        return decorator
+
+    def on_startup(self, fn: Callable[[], Any]) -> Callable[[], Any]:
+        self._startup.append(fn)
+        return fn
+
+    def on_shutdown(self, fn: Callable[[], Any]) -> Callable[[], Any]:
+        self._shutdown.append(fn)
+        return fn
+
+    def before_request(self, fn: Callable[[], Any]) -> Callable[[], Any]:
+        """Run *fn* ahead of every HTTP request; keep it cheap."""
+        self._before.append(fn)
+        return fn
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                for fn in self._startup:
+                    fn()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for fn in self._shutdown:
+                    fn()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope: dict, receive: Callable, send: Callable) -> None:
+        method, path = scope["method"], scope["path"]
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        for fn in self._before:
+            fn()
+
+        if method in ("GET", "HEAD"):
+            hit = self.assets.lookup(path, headers)
+            if hit is not None:
+                status, out, body = hit
+                await send({"type": "http.response.start", "status": status, "headers": out})
+                await send({"type": "http.response.body", "body": b"" if method == "HEAD" else body})
+                return
+
+        try:
+            handler, params, max_body = self._match(method, path)
+            body = await _read_body(receive, headers, max_body)
+            query = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+            response = await handler(Request(method, path, query, headers, body, params))
+        except HTTPError as e:
+            response = Response.json({"error": e.detail}, e.status)
+        except Exception:
+            log.exception("%s %s failed", method, path)
+            response = Response.json({"error": "internal server error"}, 500)
+
+        out = [(b"content-type", response.content_type.encode()),
+               (b"content-length", str(len(response.body)).encode()),
+               (b"cache-control", b"no-store"), *response.headers]
+        await send({"type": "http.response.start", "status": response.status, "headers": out})
+        await send({"type": "http.response.body", "body": b"" if method == "HEAD" else response.body})
+
+    def _match(self, method: str, path: str) -> tuple[Handler, dict[str, str], int]:
+        allowed = False
+        for m, regex, fn, max_body in self._routes:
+            match = regex.match(path)
+            if match:
+                if m == method:
+                    return fn, match.groupdict(), max_body
+                allowed = True
+        raise HTTPError(405 if allowed else 404, "method not allowed" if allowed else "not found")
+
+
+async def _read_body(receive: Callable, headers: dict[str, str], max_body: int = MAX_BODY) -> bytes:
+    try:
+        declared = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise HTTPError(400, "malformed content-length") from None
+    if declared > max_body:
+        raise HTTPError(413, "request body too large")
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > max_body:
+            raise HTTPError(413, "request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def load_shell(assets: AssetStore, shell: Path = APP_SHELL, vendor_dir: Path = VENDOR) -> None:
+    """Compile the app shell and add it, and its hashed assets, to *assets*."""
+    try:
+        bundle = compile_shell(shell, vendor_dir)
+    except BuildError as e:
+        # Without vendored React we can still serve the page as authored.
+        log.warning("serving %s uncompiled: %s", shell.name, e)
+        assets.add("/index.html", shell.read_bytes(), REVALIDATE, "text/html")
+    else:
+        for rel, data in bundle.files.items():
+            cache = IMMUTABLE if rel.startswith("assets/") else REVALIDATE
+            assets.add("/" + rel, data, cache)
+    assets.alias("/", "/index.html")
+
+
+def load_bank_shards(assets: AssetStore, bank: MappedBank, previous: Iterable[str] = ()) -> set[str]:
+    """Publish the per-domain bank shards and their manifest for the service worker; return the shard paths.
+
+    Shards in *previous* (the last call's paths) that the new manifest no longer lists are dropped.
+    """
+    shards = bank_shards(bank)
+    for path, data in shards.files.items():
+        assets.add(path, data, IMMUTABLE)
+    assets.add(MANIFEST, json.dumps(shards.manifest, separators=(",", ":")).encode(), REVALIDATE)
+    for path in set(previous) - shards.files.keys():
+        assets.remove(path)
+    return set(shards.files)
+
+
+def load_study(assets: AssetStore, study: StudyIndex) -> None:
+    """Publish the study sections for the Study screen."""
+    assets.add("/study.json", study.content, REVALIDATE)
+
+
+def create_app(shell: Path = APP_SHELL, vendor_dir: Path = VENDOR,
+               bank_db: Path = BANK_DB, exams_db: Path = EXAMS_DB, journal_dir: Path = JOURNAL_DIR,
+               irt_params: Path = IRT_PARAMS, srs_db: Path = SRS_DB, bank_file: Path | None = None,
+               telemetry_dir: Path = TELEMETRY_DIR, study_file: Path = STUDY_INDEX,
+               cohort_dir: Path = COHORT_DIR, var_dir: Path | None = None) -> App:
+    from . import api
+
+    if var_dir is None and os.environ.get(VAR_ENV):
+        var_dir = Path(os.environ[VAR_ENV])
+    if var_dir is not None:
+        bank_db, exams_db, journal_dir = var_dir / BANK_DB.name, var_dir / EXAMS_DB.name, var_dir / JOURNAL_DIR.name
+        irt_params, srs_db = var_dir / IRT_PARAMS.name, var_dir / SRS_DB.name
+        telemetry_dir, study_file = var_dir / TELEMETRY_DIR.name, var_dir / STUDY_INDEX.name
+        cohort_dir = var_dir / COHORT_DIR.name
+
+    assets = AssetStore()
+    load_shell(assets, shell, vendor_dir)
+    app = App(assets)
+    # The mapped file sits beside the SQLite bank it is compiled from (var/bank.bin by default).
+    bank = MappedBank.open(bank_file or bank_db.with_name(BANK_FILE.name), bank_db)
+    shard_paths = load_bank_shards(assets, bank)
+
+    @bank.on_swap
+    def reshard() -> None:
+        nonlocal shard_paths
+        shard_paths = load_bank_shards(assets, bank, shard_paths)
+
+    app.before_request(bank.refresh)
+    # Links are rebuilt by the parent (see main); a worker only relinks the few items a swap changed.
+    study = StudyIndex.open(bank, study_file, workers=1)
+    load_study(assets, study)
+
+    @bank.on_swap
+    def relink() -> None:
+        study.update(bank)
+        load_study(assets, study)
+
+    exams = ExamStore(exams_db)
+    journal = Journal(journal_dir, max_age=JOURNAL_MAX_AGE)
+    practice = PracticeStore(exams_db)
+    srs = SRSStore(srs_db)
+    cohort = Cohort(cohort_dir)
+    telemetry = Telemetry(telemetry_dir)
+    api.install(app, bank, exams, journal, practice, srs, study, cohort, telemetry, irt_params)
+    app.on_startup(journal.start_sync)
+    app.on_startup(cohort.start)
+    app.on_startup(telemetry.start)
+    app.on_shutdown(bank.close)
+    app.on_shutdown(exams.close)
+    app.on_shutdown(journal.close)
+    app.on_shutdown(practice.close)
+    app.on_shutdown(srs.close)
+    app.on_shutdown(cohort.close)
+    app.on_shutdown(telemetry.close)
+    return app
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m capm_sim.server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--var", type=Path, help="directory for runtime data (default: var/)")
+    args = ap.parse_args(argv)
+    # One directory for this process and the workers (which read it from the environment), so the bank file
+    # and the study links compiled here are the ones they open instead of each racing to compile its own.
+    var_dir = (args.var or Path(os.environ.get(VAR_ENV) or BANK_FILE.parent)).resolve()
+    os.environ[VAR_ENV] = str(var_dir)
+    bank = MappedBank.open(var_dir / BANK_FILE.name, var_dir / BANK_DB.name)
+    StudyIndex.open(bank, var_dir / STUDY_INDEX.name)
+    bank.close()
+
+    import uvicorn
+    uvicorn.run("capm_sim.server:create_app", factory=True, host=args.host, port=args.port,
+                workers=args.workers, access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Spaced-repetition review queue (SM-2).
+
+Every item a candidate gets wrong on an exam becomes a card in
+``var/srs.sqlite3``.  Cards are rows of a ``WITHOUT ROWID`` table keyed by
+``(candidate, item)`` with a secondary ``(candidate, due)`` index, so
+"what is due now" is one B-tree descent plus the rows returned — no scan
+of the candidate's history — and a card costs a few dozen bytes: the
+candidate is a 16-byte id and everything else is a small integer.
+
+Scheduling follows SM-2: a review is graded 0–5; below 3 the card lapses
+back to a short relearning step, otherwise the interval grows 1 → 6 →
+interval × ease days and the ease factor moves with the grade.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from . import ROOT
+
+__all__ = ["SRS_DB", "Card", "SRSStore", "candidate_key", "schedule"]
+
+SRS_DB = ROOT / "var" / "srs.sqlite3"
+
+START_EASE = 250          # ease factor × 100
+MIN_EASE = 130
+RELEARN_MINUTES = 10
+DAY = 24 * 60             # minutes
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    candidate BLOB    NOT NULL,   -- 16-byte candidate id
+    item      INTEGER NOT NULL,
+    due       INTEGER NOT NULL,   -- epoch minutes
+    interval  INTEGER NOT NULL,   -- days; 0 while (re)learning
+    ease      INTEGER NOT NULL,   -- ease factor × 100
+    reps      INTEGER NOT NULL,   -- successful reviews in a row
+    lapses    INTEGER NOT NULL,
+    PRIMARY KEY (candidate, item)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cards_due ON cards (candidate, due);
+"""
+
+
+def candidate_key(candidate: str) -> bytes:
+    """The stored form of a candidate id (32 hex digits); ``ValueError`` otherwise."""
+    if len(candidate) != 32:
+        raise ValueError("candidate id must be 32 hex digits")
+    return bytes.fromhex(candidate)
+
+
+def now_minutes() -> int:
+    return int(time.time() // 60)
+
+
+@dataclass
+class Card:
+    item: int
+    due: int
+    interval: int
+    ease: int
+    reps: int
+    lapses: int
+
+    def as_dict(self) -> dict:
+        return {"item": self.item, "due": self.due * 60, "interval": self.interval, "ease": self.ease / 100,
+                "reps": self.reps, "lapses": self.lapses}
+
+
+def schedule(card: Card, quality: int, now: int) -> Card:
+    """The card after a review graded *quality* (0–5) at *now* (epoch minutes)."""
+    if not 0 <= quality <= 5:
+        raise ValueError("quality must be 0-5")
+    ease = max(MIN_EASE, card.ease + round(100 * (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))))
+    if quality < 3:
+        return Card(card.item, now + RELEARN_MINUTES, 0, ease, 0, card.lapses + 1)
+    reps = card.reps + 1
+    interval = 1 if reps == 1 else 6 if reps == 2 else max(1, round(card.interval * ease / 100))
+    return Card(card.item, now + interval * DAY, interval, ease, reps, card.lapses)
+
+
+class SRSStore:
+    def __init__(self, db_path: Path = SRS_DB):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._con = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._con.close()
+
+    def add(self, candidate: bytes, items: Iterable[int], now: int | None = None) -> None:
+        """Queue *items* as missed: new cards are due now; cards already queued lapse."""
+        now = now_minutes() if now is None else now
+        with self._con:
+            self._con.execute("BEGIN")
+            self._con.executemany(
+                "INSERT INTO cards VALUES (?, ?, ?, 0, ?, 0, 0) ON CONFLICT (candidate, item) DO UPDATE SET "
+                "due = min(due, excluded.due), interval = 0, reps = 0, lapses = lapses + 1, "
+                f"ease = max({MIN_EASE}, ease - 20)",
+                ((candidate, item, now, START_EASE) for item in items))
+
+    def due(self, candidate: bytes, limit: int, now: int | None = None) -> list[Card]:
+        """Cards due at *now*, most overdue first."""
+        now = now_minutes() if now is None else now
+        rows = self._con.execute(
+            "SELECT item, due, interval, ease, reps, lapses FROM cards "
+            "WHERE candidate = ? AND due <= ? ORDER BY due LIMIT ?", (candidate, now, limit))
+        return [Card(*r) for r in rows]
+
+    def counts(self, candidate: bytes, now: int | None = None) -> tuple[int, int | None]:
+        """``(cards due now, due time of the next card in epoch minutes or None)``."""
+        now = now_minutes() if now is None else now
+        (due,) = self._con.execute("SELECT count(*) FROM cards WHERE candidate = ? AND due <= ?",
+                                   (candidate, now)).fetchone()
+        (upcoming,) = self._con.execute("SELECT min(due) FROM cards WHERE candidate = ?", (candidate,)).fetchone()
+        return due, upcoming
+
+    def review(self, candidate: bytes, item: int, quality: int, now: int | None = None) -> Card:
+        """Grade one review; ``KeyError`` if the card is not queued."""
+        now = now_minutes() if now is None else now
+        row = self._con.execute(
+            "SELECT item, due, interval, ease, reps, lapses FROM cards WHERE candidate = ? AND item = ?",
+            (candidate, item)).fetchone()
+        if row is None:
+            raise KeyError(item)
+        card = schedule(Card(*row), quality, now)
+        self._con.execute(
+            "UPDATE cards SET due = ?, interval = ?, ease = ?, reps = ?, lapses = ? WHERE candidate = ? AND item = ?",
+            (card.due, card.interval, card.ease, card.reps, card.lapses, candidate, item))
+        return card
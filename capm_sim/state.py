@@ -0,0 +1,74 @@
+"""Compact exam-state encoding shared with the client (``ExamState`` in main.py).
+
+Layout, base64-encoded::
+
+    u8       version (1)
+    u16 LE   n, the number of items
+    ⌈n/2⌉    responses, one nibble per item (low nibble first): option + 1, 0 = unanswered
+    ⌈n/8⌉    flag bitset, bit i & 7 of byte i >> 3
+
+A 150-item exam is 98 bytes (132 base64 characters).
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from dataclasses import dataclass, field
+
+__all__ = ["ExamState", "StateError", "decode_state", "encode_state"]
+
+VERSION = 1
+MAX_OPTION = 14
+
+
+class StateError(ValueError):
+    """Raised for payloads that do not decode to a valid state."""
+
+
+@dataclass
+class ExamState:
+    responses: list[int | None]
+    flagged: set[int] = field(default_factory=set)
+
+    @property
+    def answered(self) -> int:
+        return sum(r is not None for r in self.responses)
+
+
+def encode_state(state: ExamState) -> str:
+    n = len(state.responses)
+    out = bytearray([VERSION, n & 0xFF, n >> 8])
+    packed = bytearray((n + 1) // 2)
+    for i, r in enumerate(state.responses):
+        if r is not None:
+            if not 0 <= r <= MAX_OPTION:
+                raise StateError(f"option {r} out of range")
+            packed[i >> 1] |= (r + 1) << (4 * (i & 1))
+    flags = bytearray((n + 7) // 8)
+    for i in state.flagged:
+        flags[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(out + packed + flags).decode("ascii")
+
+
+def decode_state(payload: str, n: int | None = None) -> ExamState:
+    """Decode *payload*; if *n* is given the state must cover exactly *n* items."""
+    try:
+        raw = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError, TypeError):
+        raise StateError("state is not valid base64") from None
+    if len(raw) < 3 or raw[0] != VERSION:
+        raise StateError("unsupported state version")
+    size = raw[1] | raw[2] << 8
+    if n is not None and size != n:
+        raise StateError(f"state covers {size} items, exam has {n}")
+    packed, nflags = (size + 1) // 2, (size + 7) // 8
+    if len(raw) != 3 + packed + nflags:
+        raise StateError("state has the wrong length")
+    responses: list[int | None] = []
+    for i in range(size):
+        v = (raw[3 + (i >> 1)] >> (4 * (i & 1))) & 0xF
+        responses.append(v - 1 if v else None)
+    base = 3 + packed
+    flagged = {i for i in range(size) if raw[base + (i >> 3)] >> (i & 7) & 1}
+    return ExamState(responses, flagged)
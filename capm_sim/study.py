@@ -0,0 +1,253 @@
+"""Study sections and the question → section cross-reference.
+
+Study material lives in ``data/study.jsonl``, one section per line (``id``,
+``domain``, ``title``, ``body``).  It is compiled, together with a link from
+every bank question to the section that covers it, into ``var/study.npz``::
+
+    python -m capm_sim.study [--workers N] [--full]
+
+A link is the section with the highest TF-IDF cosine similarity to the
+question's stem, options and explanation, preferring sections of the
+question's own domain; a question that shares no weighted term with any
+section gets none.  Weights come from the sections alone (a term found in
+every section weighs nothing), so one question's link never depends on the
+rest of the bank.  That keeps rebuilds incremental: the store keeps a
+64-bit digest of each question's text, and only questions whose digest
+changed, or which are new, are scored again — unless the sections
+themselves changed, which invalidates every link.  Large batches are
+scored in a process pool, one chunk per task.  Server workers that see the
+same bank swap rebuild under ``study.npz.lock``: the first one does the
+work and the rest load its result.
+
+The server loads the store into a dict and annotates the rows it sends to
+Results and Review with ``study`` (a section id), and publishes the
+sections as ``/study.json`` for the Study screen.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from . import ROOT
+from .bank import BANK_DB, DOMAINS, read_jsonl
+from .bankfile import BANK_FILE, MappedBank
+from .search import tokens
+
+__all__ = ["STUDY_INDEX", "STUDY_SOURCE", "StudyIndex", "build_study_index"]
+
+STUDY_SOURCE = ROOT / "data" / "study.jsonl"
+STUDY_INDEX = ROOT / "var" / "study.npz"
+CHUNK = 2000          # questions per pool task
+MIN_PARALLEL = 5000   # fewer changed questions than this are scored in-process
+
+
+@dataclass
+class SectionVectors:
+    """The sections as L2-normalised TF-IDF rows over their own vocabulary."""
+    vocab: dict[str, int]
+    idf: np.ndarray
+    matrix: np.ndarray      # sections × terms, float32
+    domain: np.ndarray      # each section's index into DOMAINS (-1 if none)
+
+    @classmethod
+    def build(cls, sections: Sequence[dict]) -> "SectionVectors":
+        docs = [Counter(_terms(f"{s['title']} {s['body']}")) for s in sections]
+        vocab = {t: i for i, t in enumerate(sorted({t for d in docs for t in d}))}
+        df = np.zeros(len(vocab))
+        for d in docs:
+            df[[vocab[t] for t in d]] += 1
+        idf = np.log((1 + len(docs)) / (1 + df))
+        matrix = np.zeros((len(docs), len(vocab)), np.float32)
+        for row, d in enumerate(docs):
+            cols = [vocab[t] for t in d]
+            matrix[row, cols] = (1 + np.log([d[t] for t in d])) * idf[cols]
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        domain = np.array([DOMAINS.index(s["domain"]) if s["domain"] in DOMAINS else -1 for s in sections], np.int8)
+        return cls(vocab, idf, matrix, domain)
+
+    def link(self, text: str, domain: str) -> tuple[int, float]:
+        """``(section index, cosine)`` of the best section for one question; ``(-1, 0.0)`` if none fits."""
+        counts = Counter(t for t in _terms(text) if t in self.vocab)
+        if not counts:
+            return -1, 0.0
+        cols = [self.vocab[t] for t in counts]
+        weights = (1 + np.log(list(counts.values()))) * self.idf[cols]
+        norm = float(np.linalg.norm(weights))
+        if norm == 0:
+            return -1, 0.0
+        scores = self.matrix[:, cols] @ weights / norm
+        own = self.domain == (DOMAINS.index(domain) if domain in DOMAINS else -2)
+        if own.any() and scores[own].max() > 0:
+            scores = np.where(own, scores, -1)
+        best = int(scores.argmax())
+        return (best, float(scores[best])) if scores[best] > 0 else (-1, 0.0)
+
+
+def _terms(text: str) -> list[str]:
+    # Search tokens with plural "s" folded, so "risks" meets "risk"; bare numbers carry no topic.
+    return [t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t
+            for t in tokens(text) if not t.isdigit()]
+
+
+def _text(row: dict) -> str:
+    return "\n".join([row["question"], *row["options"], row.get("explanation", "")])
+
+
+def _digest(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+_vectors: SectionVectors | None = None
+
+
+def _init_worker(vectors: SectionVectors) -> None:
+    global _vectors
+    _vectors = vectors
+
+
+def _link_chunk(chunk: list[tuple[str, str]]) -> list[tuple[int, float]]:
+    return [_vectors.link(text, domain) for text, domain in chunk]
+
+
+@dataclass
+class BuildStats:
+    items: int
+    scored: int      # questions (re)linked by this build
+    linked: int      # questions with a section
+    seconds: float
+
+
+def build_study_index(bank: MappedBank, path: Path = STUDY_INDEX, source: Path = STUDY_SOURCE,
+                      workers: int | None = None, full: bool = False) -> BuildStats:
+    """Compile *source* and the links for every question of *bank* into *path* (atomically)."""
+    t0 = time.perf_counter()
+    sections = list(read_jsonl(source))
+    content = json.dumps(sections, separators=(",", ":"), ensure_ascii=False).encode()
+    content_digest = _digest(content)
+    rows = bank.page(None, 0, len(bank))
+    ids = np.array([r["id"] for r in rows], np.int64)
+    digests = np.array([_digest(_text(r).encode()) for r in rows], np.uint64)
+    section = np.full(len(rows), -1, np.int16)
+    score = np.zeros(len(rows), np.float32)
+
+    todo = np.ones(len(rows), bool)
+    if not full and path.exists():
+        with np.load(path) as old:
+            if int(old["content_digest"]) == content_digest and len(old["ids"]):
+                # Unchanged questions keep their link; ids are sorted in both, so match by searchsorted.
+                at = np.searchsorted(old["ids"], ids).clip(0, len(old["ids"]) - 1)
+                same = (old["ids"][at] == ids) & (old["digests"][at] == digests)
+                section[same], score[same] = old["section"][at[same]], old["score"][at[same]]
+                todo = ~same
+
+    vectors = SectionVectors.build(sections)
+    work = [(_text(rows[i]), rows[i]["domain"]) for i in np.flatnonzero(todo).tolist()]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(work) >= MIN_PARALLEL:
+        chunks = [work[i:i + CHUNK] for i in range(0, len(work), CHUNK)]
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(vectors,)) as pool:
+            links = [link for part in pool.map(_link_chunk, chunks) for link in part]
+    else:
+        links = [vectors.link(text, domain) for text, domain in work]
+    if links:
+        section[todo], score[todo] = zip(*links)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, content=np.frombuffer(content, np.uint8), content_digest=np.uint64(content_digest),
+                 ids=ids, digests=digests, section=section, score=score)
+    os.replace(tmp, path)
+    return BuildStats(len(rows), len(work), int((section >= 0).sum()), time.perf_counter() - t0)
+
+
+class StudyIndex:
+    """The compiled store, loaded: section content and an id → section lookup."""
+
+    def __init__(self, path: Path = STUDY_INDEX, source: Path = STUDY_SOURCE):
+        self.path = path
+        self.source = source
+        self._load()
+
+    @classmethod
+    def open(cls, bank: MappedBank, path: Path = STUDY_INDEX, source: Path = STUDY_SOURCE,
+             workers: int | None = None) -> "StudyIndex":
+        """Load *path*, rebuilding it first if *source* or the bank file is newer."""
+        _refresh(bank, path, source, workers)
+        return cls(path, source)
+
+    def _load(self) -> None:
+        with np.load(self.path) as data:
+            self.sections: list[dict] = json.loads(data["content"].tobytes())
+            ids, section = data["ids"], data["section"]
+        linked = section >= 0
+        names = [s["id"] for s in self.sections]
+        self._link = dict(zip(ids[linked].tolist(), (names[i] for i in section[linked].tolist())))
+        self.content = json.dumps({"domains": list(dict.fromkeys(s["domain"] for s in self.sections)),
+                                   "sections": self.sections}, separators=(",", ":"), ensure_ascii=False).encode()
+
+    def update(self, bank: MappedBank, workers: int | None = 1) -> None:
+        """Relink what changed after *bank* was swapped (another worker may already have) and reload."""
+        _refresh(bank, self.path, self.source, workers)
+        self._load()
+
+    def section(self, item: int) -> str | None:
+        return self._link.get(item)
+
+    def annotate(self, rows: list[dict]) -> list[dict]:
+        """Add each row's ``study`` section id (or ``None``) in place; returns *rows*."""
+        for row in rows:
+            row["study"] = self._link.get(row["id"])
+        return rows
+
+
+def _refresh(bank: MappedBank, path: Path, source: Path, workers: int | None) -> None:
+    # Workers see a bank swap together: the first to take the lock rebuilds, the rest find the store fresh.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if _stale(path, bank.path, source):
+            build_study_index(bank, path, source, workers)
+
+
+def _stale(path: Path, bank_file: Path, source: Path) -> bool:
+    if not path.exists():
+        return True
+    mtime = path.stat().st_mtime
+    return mtime < source.stat().st_mtime or (bank_file.exists() and mtime < bank_file.stat().st_mtime)
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m capm_sim.study",
+                                 description="Compile the study sections and relink changed questions to them.")
+    ap.add_argument("--bank", type=Path, default=BANK_FILE, help="mapped bank file (compiled first if stale)")
+    ap.add_argument("--source", type=Path, default=STUDY_SOURCE)
+    ap.add_argument("--out", type=Path, default=STUDY_INDEX)
+    ap.add_argument("--workers", type=int, default=None, help="processes for large batches (default: all cores)")
+    ap.add_argument("--full", action="store_true", help="relink every question, not just changed ones")
+    args = ap.parse_args(argv)
+    bank = MappedBank.open(args.bank, args.bank.with_name(BANK_DB.name))
+    try:
+        stats = build_study_index(bank, args.out, args.source, args.workers, args.full)
+    finally:
+        bank.close()
+    print(f"{stats.items} questions, {stats.scored} relinked, {stats.linked} linked to a section "
+          f"-> {args.out} in {stats.seconds:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
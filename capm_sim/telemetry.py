@@ -0,0 +1,220 @@
+"""Performance telemetry folded into fixed-bucket histograms.
+
+Everything is a duration in milliseconds recorded under a series name:
+client marks posted by the page (``client.screen.exam``, ``client.exam.nav``,
+``client.timer.tick_lag``…) and, while profiling is on, the server's hot
+paths (``server.questions``, ``server.journal``, ``server.score``…).
+
+A series is a :class:`Histogram` over one shared set of log-spaced bucket
+edges — 16 per decade from 0.01 ms to 10⁷ ms, so a reported quantile (its
+bucket's upper edge) is at most 15 % above the truth — and only counts are
+kept, so memory is fixed per series and :data:`MAX_SERIES` bounds the
+number of series.
+Identical buckets also make histograms mergeable by addition: each worker
+writes its own snapshot to ``var/telemetry/`` and the report sums them::
+
+    python -m capm_sim.telemetry on        # start profiling server hot paths
+    python -m capm_sim.telemetry report    # merged summary of all workers
+    python -m capm_sim.telemetry off
+    python -m capm_sim.telemetry reset     # drop collected snapshots
+
+Profiling is switched by a flag file that every worker polls, so it takes
+effect across the whole server within a second, without a restart.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from . import ROOT
+
+__all__ = ["EDGES", "MAX_SERIES", "TELEMETRY_DIR", "Histogram", "Telemetry", "load_snapshots", "summary"]
+
+TELEMETRY_DIR = ROOT / "var" / "telemetry"
+PROFILE_FLAG = "profile.on"
+EDGES = 10.0 ** np.arange(-2, 7 + 1 / 32, 1 / 16)   # ms; bucket 0 is below EDGES[0], the last above EDGES[-1]
+MAX_SERIES = 256
+FLUSH_SECONDS = 10.0
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+@dataclass
+class Histogram:
+    counts: np.ndarray = field(default_factory=lambda: np.zeros(len(EDGES) + 1, np.int64))
+    total: float = 0.0     # sum of observed values, for the mean
+    peak: float = 0.0      # largest observed value
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def observe(self, values: np.ndarray) -> None:
+        self.counts += np.bincount(np.searchsorted(EDGES, values, side="right"), minlength=len(self.counts))
+        self.total += float(values.sum())
+        self.peak = max(self.peak, float(values.max()))
+
+    def merge(self, other: "Histogram") -> None:
+        self.counts += other.counts
+        self.total += other.total
+        self.peak = max(self.peak, other.peak)
+
+    def quantile(self, q: float) -> float:
+        """Upper edge of the bucket holding the *q* quantile (the peak for the overflow bucket)."""
+        n = self.count
+        if not n:
+            return 0.0
+        b = int(np.searchsorted(np.cumsum(self.counts), q * n, side="left"))
+        return min(float(EDGES[b]), self.peak) if b < len(EDGES) else self.peak
+
+
+class Telemetry:
+    """One process's histograms, optionally persisted to *directory* for the merged report."""
+
+    def __init__(self, directory: Path | None = TELEMETRY_DIR, max_series: int = MAX_SERIES):
+        self.directory = directory
+        self.max_series = max_series
+        self.series: dict[str, Histogram] = {}
+        self.dropped = 0         # observations refused because the series table was full
+        self.profiling = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._dirty = False
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+            self.check_flag()
+
+    def observe(self, name: str, values: Iterable[float]) -> None:
+        values = np.fromiter(values, np.float64)
+        if not len(values):
+            return
+        with self._lock:
+            hist = self.series.get(name)
+            if hist is None:
+                if len(self.series) >= self.max_series:
+                    self.dropped += len(values)
+                    return
+                hist = self.series[name] = Histogram()
+            hist.observe(values)
+            self._dirty = True
+
+    @contextmanager
+    def timed(self, name: str) -> Iterator[None]:
+        """Record the block's wall time under *name* while profiling is on."""
+        if not self.profiling:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, ((time.perf_counter() - t0) * 1000,))
+
+    def check_flag(self) -> None:
+        self.profiling = self.directory is not None and (self.directory / PROFILE_FLAG).exists()
+
+    def flush(self) -> None:
+        """Write this process's snapshot (if anything changed since the last one)."""
+        if self.directory is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            names = list(self.series)
+            counts = np.stack([self.series[n].counts for n in names])
+            totals = np.array([self.series[n].total for n in names])
+            peaks = np.array([self.series[n].peak for n in names])
+            dropped, self._dirty = self.dropped, False
+        path = self.directory / f"worker-{os.getpid()}.npz"
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, names=np.array(names), counts=counts, totals=totals, peaks=peaks, dropped=dropped)
+        os.replace(tmp, path)
+
+    def start(self, interval: float = 1.0) -> None:
+        """Poll the profiling flag every *interval* seconds and flush every :data:`FLUSH_SECONDS`."""
+        def loop() -> None:
+            last = time.monotonic()
+            while not self._stop.wait(interval):
+                self.check_flag()
+                if time.monotonic() - last >= FLUSH_SECONDS:
+                    self.flush()
+                    last = time.monotonic()
+        threading.Thread(target=loop, name="telemetry", daemon=True).start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self.flush()
+
+
+def load_snapshots(directory: Path = TELEMETRY_DIR) -> tuple[dict[str, Histogram], int]:
+    """Every worker snapshot in *directory* merged: ``(series, dropped observations)``."""
+    merged: dict[str, Histogram] = {}
+    dropped = 0
+    for path in sorted(directory.glob("worker-*.npz")):
+        with np.load(path) as data:
+            if data["counts"].shape[-1] != len(EDGES) + 1:
+                continue   # written with other bucket edges
+            for name, counts, total, peak in zip(data["names"].tolist(), data["counts"], data["totals"],
+                                                 data["peaks"]):
+                merged.setdefault(name, Histogram()).merge(Histogram(counts, float(total), float(peak)))
+            dropped += int(data["dropped"])
+    return merged, dropped
+
+
+def summary(series: dict[str, Histogram]) -> list[dict]:
+    """One row per series: count, mean, p50/p95/p99 and max, in ms."""
+    rows = []
+    for name in sorted(series):
+        h = series[name]
+        n = h.count
+        rows.append({"series": name, "count": n, "mean": round(h.total / n, 3) if n else 0.0,
+                     **{f"p{round(q * 100)}": round(h.quantile(q), 3) for q in QUANTILES},
+                     "max": round(h.peak, 3)})
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m capm_sim.telemetry")
+    ap.add_argument("command", choices=["report", "on", "off", "reset"])
+    ap.add_argument("--dir", type=Path, default=TELEMETRY_DIR)
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args(argv)
+
+    flag = args.dir / PROFILE_FLAG
+    if args.command == "on":
+        args.dir.mkdir(parents=True, exist_ok=True)
+        flag.touch()
+        print("server profiling on")
+    elif args.command == "off":
+        flag.unlink(missing_ok=True)
+        print("server profiling off")
+    elif args.command == "reset":
+        for path in args.dir.glob("worker-*.npz"):
+            path.unlink()
+    else:
+        series, dropped = load_snapshots(args.dir)
+        rows = summary(series)
+        if args.json:
+            print(json.dumps({"profiling": flag.exists(), "dropped": dropped, "series": rows}, indent=2))
+            return 0
+        print(f"server profiling {'on' if flag.exists() else 'off'}; {dropped} observations dropped")
+        print(f"{'series':<32} {'count':>9} {'mean':>10} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}")
+        for r in rows:
+            print(f"{r['series']:<32} {r['count']:>9} {r['mean']:>10.2f} {r['p50']:>10.2f} {r['p95']:>10.2f} "
+                  f"{r['p99']:>10.2f} {r['max']:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
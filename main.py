@@ -23,66 +23,95 @@
   <div id="root"></div>
 
   <script type="text/babel">
-    const { useState, useEffect, useRef } = React;
-
-    // ─── Question Bank ────────────────────────────────────────────────────────
-    const BASE_QUESTIONS = [
-      { id:1,  domain:"Fundamentals",       question:"Which process group includes the Develop Project Charter process?",           options:["Initiating","Planning","Executing","Monitoring and Controlling"],                         correct:0, explanation:"Develop Project Charter is in the Initiating process group — it formally starts the project." },
-      { id:2,  domain:"Fundamentals",       question:"A project is BEST defined as:",                                               options:["A repetitive operational process","A temporary endeavor creating unique deliverables","Ongoing business operations","A collection of related programs"], correct:1, explanation:"Projects are temporary (defined start/end) and produce unique deliverables, distinguishing them from operations." },
-      { id:3,  domain:"Fundamentals",       question:"Which document formally authorizes a project?",                               options:["Project Management Plan","Project Charter","Business Case","Requirements Document"],          correct:1, explanation:"The Project Charter formally authorizes the project and grants the PM authority to apply resources." },
-      { id:4,  domain:"Fundamentals",       question:"The triple constraint traditionally includes:",                                options:["Time, cost, quality","Scope, time, cost","Risk, quality, scope","Resources, time, risk"],   correct:1, explanation:"The triple constraint is scope, time, and cost — changes to one typically affect the others." },
-      { id:5,  domain:"Fundamentals",       question:"A program is BEST described as:",                                             options:["A very large project","Related projects managed together for benefits","A strategic initiative only","Daily operational activities"], correct:1, explanation:"A program is a group of related projects managed in a coordinated way for strategic benefits." },
-      { id:6,  domain:"Fundamentals",       question:"Who is responsible for authorizing the Project Charter?",                     options:["Project Manager","Sponsor or Initiator","PMO","Stakeholders"],                              correct:1, explanation:"The project sponsor or senior management authorizes the Project Charter." },
-      { id:7,  domain:"Fundamentals",       question:"The PMBOK Guide defines a portfolio as:",                                     options:["A collection of programs only","Projects and programs aligned to strategic objectives","All active projects in an organization","A set of project templates"], correct:1, explanation:"A portfolio includes projects, programs, and operations managed as a group to achieve strategic objectives." },
-      { id:8,  domain:"Fundamentals",       question:"Which process group involves developing the scope statement?",                options:["Initiating","Planning","Executing","Closing"],                                               correct:1, explanation:"Defining scope is a Planning process — you plan the scope before executing work." },
-      { id:9,  domain:"Fundamentals",       question:"Organizational process assets (OPAs) include:",                              options:["Marketplace conditions","Lessons learned and historical data","Organizational structure","Government regulations"], correct:1, explanation:"OPAs are plans, processes, policies, templates, and historical knowledge from the organization." },
-      { id:10, domain:"Fundamentals",       question:"Enterprise Environmental Factors (EEFs) include:",                           options:["Project templates","Organizational culture and market conditions","Lessons learned databases","Standard processes"], correct:1, explanation:"EEFs are conditions outside the project team's immediate control: culture, market, regulations, infrastructure." },
-      { id:11, domain:"Predictive",         question:"What does SPI = 0.8 indicate?",                                              options:["Ahead of schedule","Behind schedule","On schedule","Over budget"],                           correct:1, explanation:"SPI < 1 means behind schedule. Only 80% of planned work has been completed." },
-      { id:12, domain:"Predictive",         question:"The critical path is the:",                                                   options:["Shortest path through the network","Longest path — it determines project duration","Most expensive sequence of activities","Path with the highest risk"], correct:1, explanation:"The critical path is the longest path through the network, determining minimum project duration." },
-      { id:13, domain:"Predictive",         question:"What is the formula for Earned Value (EV)?",                                  options:["AC × % Complete","BAC × % Complete","PV − AC","BAC − AC"],                                  correct:1, explanation:"EV = BAC × % Complete. It represents the budgeted value of work actually accomplished." },
-      { id:14, domain:"Predictive",         question:"Cost Performance Index (CPI) = 1.2 means:",                                  options:["Over budget by 20%","Getting $1.20 of value per $1 spent","Behind schedule","Under budget by 20%"], correct:1, explanation:"CPI > 1 is favorable — the project gets more value than money spent. CPI = EV / AC." },
-      { id:15, domain:"Predictive",         question:"Estimate at Completion (EAC) when original estimate is flawed:",             options:["BAC/CPI","AC + BAC − EV","AC + (BAC − EV)/CPI","AC + new estimate for remaining work"],    correct:3, explanation:"When the original estimate is flawed, EAC = AC + a new bottom-up estimate for remaining work." },
-      { id:16, domain:"Predictive",         question:"A WBS is decomposed into:",                                                   options:["Activities and milestones","Work packages","Resources","Risk items"],                        correct:1, explanation:"WBS decomposition ends at work packages — the lowest level for reliable cost and duration estimates." },
-      { id:17, domain:"Predictive",         question:"Float (slack) on the critical path equals:",                                  options:["Maximum delay allowed","Zero","A positive value","Depends on project"],                     correct:1, explanation:"Activities on the critical path have zero total float — any delay delays the entire project." },
-      { id:18, domain:"Predictive",         question:"Which risk response strategy transfers risk to a third party?",              options:["Avoid","Transfer","Mitigate","Accept"],                                                      correct:1, explanation:"Transfer shifts the impact to a third party (e.g., insurance, outsourcing) but doesn't eliminate the risk." },
-      { id:19, domain:"Agile",              question:"Who manages the Product Backlog in Scrum?",                                   options:["Scrum Master","Product Owner","Development Team","Project Manager"],                        correct:1, explanation:"The Product Owner is solely accountable for Product Backlog management and ordering." },
-      { id:20, domain:"Agile",              question:"What is the maximum Sprint duration in Scrum?",                               options:["1 week","2 weeks","1 month","6 weeks"],                                                      correct:2, explanation:"The Scrum Guide states Sprints are one month or less to maintain consistency and reduce risk." },
-      { id:21, domain:"Agile",              question:"The Agile Manifesto values 'Working software over':",                        options:["Comprehensive documentation","Customer collaboration","Responding to change","Individuals and interactions"], correct:0, explanation:"The second Agile value: working software over comprehensive documentation — though docs still have value." },
-      { id:22, domain:"Agile",              question:"A Daily Scrum should be:",                                                    options:["30 minutes maximum","15 minutes or less","1 hour","As long as needed"],                     correct:1, explanation:"The Daily Scrum is time-boxed to 15 minutes for Developers to synchronize and plan the next 24 hours." },
-      { id:23, domain:"Agile",              question:"What is a 'Definition of Done' in Scrum?",                                   options:["A list of Sprint backlog items","Formal criteria for an Increment to be releasable","User acceptance criteria","The Product Owner's approval"], correct:1, explanation:"The Definition of Done is a formal description of the state of the Increment when it meets quality measures." },
-      { id:24, domain:"Agile",              question:"Velocity in Agile represents:",                                               options:["Team speed in lines of code","Amount of work completed per Sprint","Budget burn rate","Number of meetings held"], correct:1, explanation:"Velocity is the amount of work (story points) a team completes per Sprint, used for forecasting." },
-      { id:25, domain:"Business Analysis",  question:"Requirements traceability is used to:",                                       options:["Track project costs","Link requirements to deliverables and business objectives","Create project schedules","Assign team resources"], correct:1, explanation:"Traceability links requirements from source to deliverables, enabling change impact assessment." },
-      { id:26, domain:"Business Analysis",  question:"Which elicitation technique is best for stakeholders who can't articulate needs?", options:["Structured interviews","Observation (job shadowing)","Online surveys","Document analysis"], correct:1, explanation:"Observation lets the analyst see actual work performed and infer implicit requirements." },
-      { id:27, domain:"Business Analysis",  question:"Functional requirements describe:",                                           options:["System performance constraints","What the system should do","How fast it should respond","Security requirements"], correct:1, explanation:"Functional requirements describe system behavior — what it must do in response to inputs or conditions." },
-      { id:28, domain:"Business Analysis",  question:"A gap analysis compares:",                                                    options:["Budget vs. actuals","Current state vs. desired future state","Risk probability vs. impact","Planned vs. actual schedule"], correct:1, explanation:"Gap analysis identifies the difference between current and desired future state, informing solution requirements." },
-      { id:29, domain:"Business Analysis",  question:"Which document captures all identified requirements?",                        options:["Project Charter","Requirements Traceability Matrix","Requirements Management Plan","Stakeholder Register"], correct:1, explanation:"The Requirements Traceability Matrix links each requirement to its source, status, and deliverables." },
-      { id:30, domain:"Business Analysis",  question:"A use case describes:",                                                       options:["System architecture","How users interact with a system to achieve goals","Database schema","Technical specifications"], correct:1, explanation:"Use cases describe actor-system interactions that deliver value — focusing on goals, not implementation." },
-    ];
-
-    const QUESTIONS = [...BASE_QUESTIONS];
-    while (QUESTIONS.length < 150) {
-      const src = BASE_QUESTIONS[QUESTIONS.length % BASE_QUESTIONS.length];
-      QUESTIONS.push({ ...src, id: QUESTIONS.length + 1, question: `[Practice] ${src.question}` });
+    const { useState, useEffect, useLayoutEffect, useRef, useCallback, useReducer, memo } = React;
+
+    // ─── Render profile (?profile) ────────────────────────────────────────────
+    // Counts renders and render→commit time per component; logged every 10 s.
+    const PROFILE = new URLSearchParams(location.search).has("profile") ? {} : null;
+    function useProfile(name) {
+      if(!PROFILE) return;
+      const t0 = performance.now();
+      const p = PROFILE[name] || (PROFILE[name] = {renders:0, ms:0});
+      p.renders++;
+      useEffect(()=>{ p.ms += performance.now()-t0; });
+    }
+    if(PROFILE) {
+      window.__renderProfile = PROFILE;
+      setInterval(()=>console.table(Object.fromEntries(Object.entries(PROFILE).map(([k,v])=>
+        [k,{renders:v.renders,"ms total":+v.ms.toFixed(1),"ms/render":+(v.ms/v.renders).toFixed(3)}]))),10000);
+    }
+
+    // ─── API ──────────────────────────────────────────────────────────────────
+    // The question bank lives on the server; the key and explanations only come back after submit.
+    async function api(path, body) {
+      const res = await fetch(path, body===undefined ? {} : {method:"POST",headers:{"Content-Type":"application/json"},body:JSON.stringify(body)});
+      if(!res.ok) {
+        // Keep the server's reason ({"error": …}) and the status so screens can say what went wrong.
+        const detail = await res.json().then(j=>j.error, ()=>null);
+        throw Object.assign(new Error(detail || `${path}: ${res.status}`), {status:res.status});
+      }
+      return res.json();
     }
 
+    // ─── Telemetry ────────────────────────────────────────────────────────────
+    // Durations (ms) are buffered and posted in batches; the server folds them into
+    // fixed-bucket histograms (capm_sim/telemetry.py, `python -m capm_sim.telemetry report`).
+    const Telemetry = {
+      marks: [],
+      timer: null,
+      mark(name, ms) {
+        this.marks.push([name, Math.max(0, Math.round(ms*100)/100)]);
+        if (this.marks.length >= 200) this.flush();
+        else if (!this.timer) this.timer = setTimeout(()=>this.flush(), 15000);
+      },
+      flush(beacon=false) {
+        clearTimeout(this.timer); this.timer = null;
+        if (!this.marks.length) return;
+        const body = JSON.stringify({marks:this.marks});
+        this.marks = [];
+        if (beacon) navigator.sendBeacon("/api/telemetry", body);
+        else fetch("/api/telemetry", {method:"POST", headers:{"Content-Type":"application/json"}, body, keepalive:true}).catch(()=>{});
+      },
+    };
+    document.addEventListener("visibilitychange", ()=>{ if (document.visibilityState==="hidden") Telemetry.flush(true); });
+
     const DC = { Fundamentals:"#6366f1", Predictive:"#0ea5e9", Agile:"#10b981", "Business Analysis":"#f59e0b" };
     const DOMAIN_WEIGHTS = { Fundamentals:36, Predictive:17, Agile:20, "Business Analysis":27 };
 
-    function shuffle(arr) {
-      const a = [...arr];
-      for (let i = a.length-1; i > 0; i--) {
-        const j = Math.floor(Math.random()*(i+1));
-        [a[i],a[j]] = [a[j],a[i]];
-      }
-      return a;
-    }
     function fmt(s) {
       const h=Math.floor(s/3600), m=Math.floor((s%3600)/60), sec=s%60;
       return `${String(h).padStart(2,'0')}:${String(m).padStart(2,'0')}:${String(sec).padStart(2,'0')}`;
     }
+    function fmtSpan(s) {
+      const h=Math.floor(s/3600), m=Math.round((s%3600)/60);
+      return [h && `${h} hour${h>1?"s":""}`, m && `${m} min`].filter(Boolean).join(" ") || "0 min";
+    }
 
     // ─── Timer Ring ───────────────────────────────────────────────────────────
-    function TimerRing({ seconds, total }) {
+    // Owns the countdown so a tick re-renders only the ring. Time left is always
+    // derived from the absolute deadline, so throttled background tabs catch up
+    // instead of drifting.
+    const TimerRing = memo(function TimerRing({ deadline, total, onExpire }) {
+      useProfile("TimerRing");
+      const [now, setNow] = useState(()=>Date.now());
+      useEffect(()=>{
+        let id, due = null;
+        const tick = ()=>{
+          const t = Date.now();
+          // How late the tick fired; background tabs are throttled on purpose, so skip those.
+          if(due!==null && document.visibilityState==="visible") Telemetry.mark("timer.tick_lag", t-due);
+          setNow(t);
+          if(t>=deadline) { onExpire(); return; }
+          const delay = (deadline-t)%1000 || 1000;
+          due = t+delay;
+          id = setTimeout(tick, delay);
+        };
+        const wake = ()=>{ if(document.visibilityState==="visible"){ clearTimeout(id); due = null; tick(); } };
+        tick();
+        document.addEventListener("visibilitychange", wake);
+        return ()=>{ clearTimeout(id); document.removeEventListener("visibilitychange", wake); };
+      },[deadline,onExpire]);
+      const seconds = Math.max(0, Math.ceil((deadline-now)/1000));
       const pct = seconds / total;
       const color = pct > 0.5 ? "#10b981" : pct > 0.25 ? "#f59e0b" : "#ef4444";
       const size = 68, stroke = 5, r = (size - stroke*2)/2;
@@ -100,6 +129,17 @@
           </span>
         </div>
       );
+    });
+
+    // ─── Errors ───────────────────────────────────────────────────────────────
+    // A failed request's reason and a button that tries it again; error is { message, retry }.
+    function ErrorNote({ error }) {
+      return (
+        <div role="alert" style={{display:"flex",alignItems:"center",gap:12,background:"rgba(239,68,68,0.08)",border:"1px solid rgba(239,68,68,0.25)",borderRadius:10,padding:"10px 14px",marginBottom:20,color:"#fca5a5",fontSize:13}}>
+          <span style={{flex:1}}>{error.message}</span>
+          <button onClick={error.retry} style={{background:"rgba(239,68,68,0.12)",border:"1px solid rgba(239,68,68,0.35)",borderRadius:8,padding:"6px 14px",color:"#fca5a5",fontSize:13,fontWeight:600,cursor:"pointer"}}>↻ Retry</button>
+        </div>
+      );
     }
 
     // ─── Ambient BG ───────────────────────────────────────────────────────────
@@ -130,7 +170,11 @@
     }
 
     // ─── Home ─────────────────────────────────────────────────────────────────
-    function Home({ onStart, onStudy, onReview, lastResult }) {
+    function Home({ onStart, onPractice, onDrill, onStudy, onReview, lastResult }) {
+      const [due, setDue] = useState(null);
+      const [form, setForm] = useState(null);   // { total, duration } of the exam Start will assemble
+      useEffect(()=>{ api(`/api/srs/${candidateId()}?limit=0`).then(r=>setDue(r.due)).catch(()=>{}); },[]);
+      useEffect(()=>{ api("/api/exams").then(setForm).catch(()=>{}); },[]);
       return (
         <div style={{maxWidth:700,margin:"0 auto",padding:"52px 24px"}}>
           <div style={{textAlign:"center",marginBottom:52}}>
@@ -140,7 +184,7 @@
             <h1 style={{fontFamily:"'Playfair Display',serif",fontSize:"clamp(2rem,5vw,3rem)",fontWeight:700,color:"white",lineHeight:1.1,margin:"0 0 12px"}}>
               CAPM® Exam<br/><span style={{color:"#a78bfa"}}>Simulator 2026</span>
             </h1>
-            <p style={{color:"#64748b",fontSize:15,margin:0}}>150 questions · 3 hours · 4 knowledge domains</p>
+            <p style={{color:"#64748b",fontSize:15,margin:0}}>{form ? `${form.total} questions · ${fmtSpan(form.duration)} · ` : ""}4 knowledge domains</p>
           </div>
 
           <div style={{display:"grid",gridTemplateColumns:"repeat(4,1fr)",gap:10,marginBottom:32}}>
@@ -156,7 +200,13 @@
           <div style={{display:"grid",gap:10}}>
             <button onClick={onStart} style={{background:"linear-gradient(135deg,#6366f1,#4f46e5)",border:"none",borderRadius:12,padding:"18px 24px",color:"white",fontSize:16,fontWeight:700,cursor:"pointer",transition:"opacity 0.15s"}}
               onMouseOver={e=>e.currentTarget.style.opacity="0.88"} onMouseOut={e=>e.currentTarget.style.opacity="1"}>
-              ⚡ Start Full Exam (150 Questions)
+              ⚡ Start Exam{form ? ` (${form.total} Questions)` : ""}
+            </button>
+            <button onClick={onPractice} style={{background:"rgba(99,102,241,0.08)",border:"1px solid rgba(99,102,241,0.3)",borderRadius:12,padding:"14px",color:"#a78bfa",fontSize:14,fontWeight:600,cursor:"pointer"}}>
+              🎯 Adaptive Practice — stops as soon as your pass/fail is clear
+            </button>
+            <button onClick={onDrill} style={{background:"rgba(16,185,129,0.06)",border:"1px solid rgba(16,185,129,0.25)",borderRadius:12,padding:"14px",color:"#6ee7b7",fontSize:14,fontWeight:600,cursor:"pointer"}}>
+              🔁 Drill Missed Questions{due ? ` — ${due} due` : ""}
             </button>
             <div style={{display:"grid",gridTemplateColumns:"1fr 1fr",gap:10}}>
               <button onClick={onStudy} style={{background:"rgba(255,255,255,0.04)",border:"1px solid rgba(255,255,255,0.09)",borderRadius:12,padding:"14px",color:"#94a3b8",fontSize:14,fontWeight:600,cursor:"pointer"}}>
@@ -175,6 +225,19 @@
                 {lastResult.pct.toFixed(1)}% <span style={{color:"#475569",fontWeight:400,fontSize:14}}>({lastResult.correct}/{lastResult.total})</span>
                 <span style={{marginLeft:12,fontSize:14,color:lastResult.passed?"#10b981":"#ef4444"}}>{lastResult.passed?"✓ Pass":"✗ Fail"}</span>
               </p>
+              {/* Share of earlier candidates scoring lower, from the server's score sketches (capm_sim/cohort.py). */}
+              {lastResult.percentile && lastResult.percentile.overall!=null && (
+                <p style={{color:"#a78bfa",fontSize:13,margin:"6px 0 0"}}>Better than {lastResult.percentile.overall.toFixed(0)}% of candidates</p>
+              )}
+              {lastResult.percentile && (
+                <div style={{display:"flex",gap:8,flexWrap:"wrap",marginTop:10}}>
+                  {Object.entries(lastResult.percentile.domains).filter(([,p])=>p!=null).map(([d,p])=>(
+                    <span key={d} style={{display:"inline-flex",alignItems:"center",gap:6,fontSize:11,color:"#94a3b8",background:"rgba(255,255,255,0.04)",borderRadius:6,padding:"3px 9px"}}>
+                      <span style={{width:6,height:6,borderRadius:"50%",background:DC[d]}}/>{d}: better than {p.toFixed(0)}%
+                    </span>
+                  ))}
+                </div>
+              )}
             </div>
           )}
         </div>
@@ -182,47 +245,51 @@
     }
 
     // ─── Study ────────────────────────────────────────────────────────────────
-    function Study() {
-      const [topic, setTopic] = useState("Fundamentals");
-      const content = {
-        Fundamentals: [
-          { title:"Project Definition", body:"A project is a temporary endeavor with a defined beginning and end, undertaken to create a unique product, service, or result. Unlike operations, projects cease once objectives are met." },
-          { title:"Process Groups (IPECC)", body:"Initiating → Planning → Executing → Monitoring & Controlling → Closing. M&C runs in parallel throughout all phases — not just at the end." },
-          { title:"Organizational Structures", body:"Functional (PM low authority) → Weak Matrix → Balanced Matrix → Strong Matrix → Projectized (PM high authority). Structure impacts resource availability and PM power." },
-          { title:"Portfolios, Programs & Projects", body:"Portfolio: strategic alignment. Program: benefit realization across related projects. Project: specific deliverable. Each level has distinct governance needs." },
-        ],
-        Predictive: [
-          { title:"Earned Value Key Formulas", body:"EV = BAC × %Complete | CV = EV−AC | SV = EV−PV | CPI = EV/AC | SPI = EV/PV | EAC = BAC/CPI | ETC = EAC−AC | TCPI = (BAC−EV)/(BAC−AC)" },
-          { title:"Critical Path Method", body:"Forward pass: ES + Duration − 1 = EF. Backward pass: LF − Duration + 1 = LS. Total Float = LS−ES or LF−EF. Critical path has zero float." },
-          { title:"Risk Management", body:"Threat responses: Avoid, Transfer, Mitigate, Accept. Opportunity responses: Exploit, Share, Enhance, Accept. Residual risks remain after response; secondary risks arise from responses." },
-          { title:"Quality Management", body:"Quality Planning → Quality Assurance (audit processes) → Quality Control (inspect deliverables). Prevention over inspection. Fishbone diagrams identify root causes." },
-        ],
-        Agile: [
-          { title:"Scrum Framework", body:"Roles: Product Owner (backlog), Scrum Master (coach), Developers (build). Events: Sprint Planning, Daily Scrum (15 min), Sprint Review, Sprint Retrospective. Artifacts: Product Backlog, Sprint Backlog, Increment." },
-          { title:"Agile Manifesto Values", body:"Individuals & interactions over processes & tools | Working software over comprehensive documentation | Customer collaboration over contract negotiation | Responding to change over following a plan" },
-          { title:"Kanban Principles", body:"Visualize workflow, limit WIP, manage flow, make policies explicit, implement feedback loops. No prescribed roles or ceremonies unlike Scrum." },
-          { title:"Hybrid Approaches", body:"Many organizations combine waterfall for planning/governance with sprints for execution. No single approach fits all projects — CAPM tests this understanding." },
-        ],
-        "Business Analysis": [
-          { title:"Elicitation Techniques", body:"Interviews (targeted), Workshops/JAD (group consensus), Observation (implicit needs), Surveys (broad reach), Prototyping (visual feedback), Document analysis, Brainstorming." },
-          { title:"Requirements Types", body:"Business (high-level goals) | Stakeholder (stakeholder needs) | Solution — Functional (what it does) & Non-functional (how well) | Transition (temporary migration needs)." },
-          { title:"Requirements Traceability", body:"RTM links requirements → business objectives → WBS deliverables → test cases. Enables impact analysis when requirements change." },
-          { title:"Modeling Techniques", body:"Use cases (actor-system interactions), User stories (As a... I want... So that...), Process flows (current vs future state), Entity relationship diagrams, State diagrams." },
-        ],
-      };
+    // Sections are compiled on the server (capm_sim/study.py) along with a link from
+    // every question to the section that covers it; rows sent to Results and Review
+    // carry that section's id as `study`, resolved here through `byId`.
+    let studyContent = null;
+    function loadStudy() {
+      return studyContent || (studyContent = fetch("/study.json").then(r=>{ if(!r.ok) throw new Error(r.status); return r.json(); })
+        .then(s=>({...s, byId:Object.fromEntries(s.sections.map(x=>[x.id,x]))}))
+        .catch(e=>{ studyContent = null; throw e; }));
+    }
+    function useStudy() {
+      const [study, setStudy] = useState(null);
+      useEffect(()=>{ let live = true; loadStudy().then(s=>{ if(live) setStudy(s); }).catch(()=>{}); return ()=>{ live = false; }; },[]);
+      return study;
+    }
+
+    function StudyLink({ study, id, onStudy }) {
+      const s = study && id ? study.byId[id] : null;
+      if(!s) return null;
+      return (
+        <button onClick={()=>onStudy(id)} style={{background:"none",border:"none",padding:0,marginTop:8,color:DC[s.domain]||"#a78bfa",fontSize:12,fontWeight:600,cursor:"pointer"}}>
+          📚 Study this: {s.title} →
+        </button>
+      );
+    }
+
+    function Study({ focus }) {
+      const study = useStudy();
+      const [topic, setTopic] = useState(null);
+      const focusRef = useRef(null);
+      const current = topic || (study && focus && study.byId[focus] ? study.byId[focus].domain : "Fundamentals");
+      useEffect(()=>{ if(focusRef.current && focusRef.current.scrollIntoView) focusRef.current.scrollIntoView({block:"center"}); },[study]);
+      if(!study) return <div style={{maxWidth:720,margin:"0 auto",padding:"32px 24px",color:"#475569"}}>Loading…</div>;
       return (
         <div style={{maxWidth:720,margin:"0 auto",padding:"32px 24px"}}>
           <h2 style={{fontFamily:"'Playfair Display',serif",color:"white",fontSize:28,marginBottom:24}}>Study Materials</h2>
           <div style={{display:"flex",gap:8,marginBottom:28,flexWrap:"wrap"}}>
-            {Object.keys(content).map(t=>(
-              <button key={t} onClick={()=>setTopic(t)} style={{background:topic===t?DC[t]:"rgba(255,255,255,0.04)",border:`1px solid ${topic===t?DC[t]:"rgba(255,255,255,0.09)"}`,borderRadius:8,padding:"8px 16px",color:"white",fontSize:13,fontWeight:600,cursor:"pointer",transition:"all 0.2s"}}>
+            {study.domains.map(t=>(
+              <button key={t} onClick={()=>setTopic(t)} style={{background:current===t?DC[t]:"rgba(255,255,255,0.04)",border:`1px solid ${current===t?DC[t]:"rgba(255,255,255,0.09)"}`,borderRadius:8,padding:"8px 16px",color:"white",fontSize:13,fontWeight:600,cursor:"pointer",transition:"all 0.2s"}}>
                 {t}
               </button>
             ))}
           </div>
           <div style={{display:"grid",gap:14}}>
-            {content[topic].map((s,i)=>(
-              <div key={i} style={{background:"rgba(255,255,255,0.03)",border:"1px solid rgba(255,255,255,0.06)",borderLeft:`3px solid ${DC[topic]}`,borderRadius:"0 12px 12px 0",padding:"16px 20px"}}>
+            {study.sections.filter(s=>s.domain===current).map(s=>(
+              <div key={s.id} ref={s.id===focus?focusRef:null} style={{background:s.id===focus?"rgba(99,102,241,0.08)":"rgba(255,255,255,0.03)",border:"1px solid rgba(255,255,255,0.06)",borderLeft:`3px solid ${DC[current]}`,borderRadius:"0 12px 12px 0",padding:"16px 20px"}}>
                 <h4 style={{color:"white",margin:"0 0 8px",fontSize:14,fontWeight:700}}>{s.title}</h4>
                 <p style={{color:"#94a3b8",margin:0,fontSize:14,lineHeight:1.75}}>{s.body}</p>
               </div>
@@ -233,91 +300,457 @@
     }
 
     // ─── Review ───────────────────────────────────────────────────────────────
-    function Review() {
+    // Search and the domain filter run on the server against the prebuilt index
+    // (capm_sim/search.py). The list is windowed: pages are fetched as they
+    // scroll into view and only visible rows (plus overscan) are mounted.
+    // Closed rows have a fixed height and the one open row is measured, so the
+    // offset of any row is O(1).
+    const ROW_H = 50, STRIDE = ROW_H + 8, OVERSCAN = 8, REVIEW_PAGE = 50;
+    function Review({ onStudy }) {
+      useProfile("Review");
+      const study = useStudy();
       const [filter, setFilter] = useState("All");
-      const [open, setOpen] = useState(null);
-      const filtered = filter==="All" ? BASE_QUESTIONS : BASE_QUESTIONS.filter(q=>q.domain===filter);
+      const [text, setText] = useState("");
+      const [query, setQuery] = useState("");   // text, debounced
+      const [open, setOpen] = useState(null);   // index of the expanded row
+      const [openH, setOpenH] = useState(ROW_H);
+      const [total, setTotal] = useState(null);
+      const [pages, setPages] = useState({});   // page number → rows
+      const [win, setWin] = useState([0, 0]);   // [first, last) mounted rows
+      const listRef = useRef(null), openRef = useRef(null), measureRef = useRef(null);
+      const key = useRef(""), loading = useRef(new Set());
+
+      useEffect(()=>{ const t = setTimeout(()=>setQuery(text.trim()), 150); return ()=>clearTimeout(t); },[text]);
+
+      function loadPage(p) {
+        const k = key.current, tag = `${k}#${p}`;
+        if(loading.current.has(tag)) return;
+        loading.current.add(tag);
+        const dom = filter==="All" ? "" : `&domain=${encodeURIComponent(filter)}`;
+        api(`/api/questions?offset=${p*REVIEW_PAGE}&limit=${REVIEW_PAGE}${dom}&q=${encodeURIComponent(query)}`)
+          .then(r=>{ if(k!==key.current) return; setTotal(r.total); setPages(s=>({...s,[p]:r.questions})); })
+          .catch(()=>loading.current.delete(tag));
+      }
+      useEffect(()=>{
+        key.current = `${filter}|${query}`;
+        loading.current.clear();
+        setPages({}); setTotal(null); setOpen(null);
+        loadPage(0);
+      },[filter,query]);
+
+      const topOf = i => i*STRIDE + (open!==null && i>open ? openH-ROW_H : 0);
+      const indexAt = y => {
+        const i = Math.floor(y/STRIDE);
+        return open===null || i<=open ? i : Math.max(open, Math.floor((y-openH+ROW_H)/STRIDE));
+      };
+      measureRef.current = ()=>{
+        if(!listRef.current || !total) return;
+        const y = -listRef.current.getBoundingClientRect().top;
+        const first = Math.max(0, indexAt(y)-OVERSCAN), last = Math.min(total, indexAt(y+window.innerHeight)+1+OVERSCAN);
+        setWin(w=>w[0]===first&&w[1]===last ? w : [first,last]);
+      };
+      useEffect(()=>{
+        let raf = 0;
+        const onScroll = ()=>{ if(!raf) raf = requestAnimationFrame(()=>{ raf = 0; measureRef.current(); }); };
+        window.addEventListener("scroll", onScroll, {passive:true});
+        window.addEventListener("resize", onScroll);
+        return ()=>{ cancelAnimationFrame(raf); window.removeEventListener("scroll", onScroll); window.removeEventListener("resize", onScroll); };
+      },[]);
+      useEffect(()=>measureRef.current(),[total,open,openH]);
+      useLayoutEffect(()=>{ if(openRef.current) setOpenH(openRef.current.offsetHeight); },[open,pages]);
+      useEffect(()=>{
+        for(let p=Math.floor(win[0]/REVIEW_PAGE); p*REVIEW_PAGE<win[1]; p++) if(!pages[p]) loadPage(p);
+      },[win,pages]);
+
       return (
         <div style={{maxWidth:720,margin:"0 auto",padding:"32px 24px"}}>
           <h2 style={{fontFamily:"'Playfair Display',serif",color:"white",fontSize:28,marginBottom:22}}>Question Bank</h2>
-          <div style={{display:"flex",gap:8,marginBottom:22,flexWrap:"wrap"}}>
+          <input value={text} onChange={e=>setText(e.target.value)} placeholder="Search questions, options and explanations…" style={{width:"100%",boxSizing:"border-box",background:"rgba(255,255,255,0.04)",border:"1px solid rgba(255,255,255,0.09)",borderRadius:10,padding:"11px 14px",color:"white",fontSize:14,marginBottom:14,outline:"none"}}/>
+          <div style={{display:"flex",gap:8,marginBottom:14,flexWrap:"wrap"}}>
             {["All",...Object.keys(DOMAIN_WEIGHTS)].map(d=>(
               <button key={d} onClick={()=>setFilter(d)} style={{background:filter===d?(d==="All"?"#6366f1":DC[d]):"rgba(255,255,255,0.04)",border:`1px solid ${filter===d?(d==="All"?"#6366f1":DC[d]):"rgba(255,255,255,0.09)"}`,borderRadius:8,padding:"7px 14px",color:"white",fontSize:12,fontWeight:600,cursor:"pointer"}}>
                 {d}
               </button>
             ))}
           </div>
-          <div style={{display:"grid",gap:8}}>
-            {filtered.map(q=>(
-              <div key={q.id} style={{background:"rgba(255,255,255,0.03)",border:"1px solid rgba(255,255,255,0.07)",borderRadius:12,overflow:"hidden"}}>
-                <button onClick={()=>setOpen(open===q.id?null:q.id)} style={{width:"100%",background:"none",border:"none",padding:"14px 16px",cursor:"pointer",textAlign:"left",display:"flex",alignItems:"center",gap:12}}>
-                  <span style={{background:DC[q.domain],borderRadius:6,padding:"2px 8px",fontSize:10,fontWeight:700,color:"white",whiteSpace:"nowrap",flexShrink:0}}>{q.domain}</span>
-                  <span style={{color:"#94a3b8",fontSize:13,flex:1,textAlign:"left"}}>{q.question}</span>
-                  <span style={{color:"#475569",fontSize:16,flexShrink:0}}>{open===q.id?"−":"+"}</span>
-                </button>
-                {open===q.id&&(
-                  <div style={{padding:"0 16px 16px",borderTop:"1px solid rgba(255,255,255,0.05)"}}>
-                    {q.options.map((opt,j)=>(
-                      <div key={j} style={{display:"flex",alignItems:"center",gap:10,padding:"8px 12px",borderRadius:8,marginTop:6,background:j===q.correct?"rgba(16,185,129,0.08)":"rgba(255,255,255,0.02)",border:`1px solid ${j===q.correct?"rgba(16,185,129,0.25)":"rgba(255,255,255,0.05)"}`}}>
-                        <span style={{fontWeight:700,fontSize:12,color:j===q.correct?"#10b981":"#475569",minWidth:16}}>{String.fromCharCode(65+j)}</span>
-                        <span style={{color:j===q.correct?"#6ee7b7":"#64748b",fontSize:13}}>{opt}</span>
-                        {j===q.correct&&<span style={{marginLeft:"auto",color:"#10b981",fontSize:11}}>✓ Correct</span>}
+          <p style={{color:"#475569",fontSize:12,margin:"0 0 14px"}}>{total===null?"Searching…":total===0?"No questions match.":`${total} question${total===1?"":"s"}`}</p>
+          <div ref={listRef} style={{position:"relative",height:total ? topOf(total)-(STRIDE-ROW_H) : 0}}>
+            {Array.from({length:Math.max(0,Math.min(win[1],total||0)-win[0])},(_,k)=>{
+              const i = win[0]+k, q = (pages[Math.floor(i/REVIEW_PAGE)]||[])[i%REVIEW_PAGE], isOpen = open===i;
+              return (
+                <div key={q?q.id:`row${i}`} ref={isOpen?openRef:null} style={{position:"absolute",top:topOf(i),left:0,right:0,height:isOpen?undefined:ROW_H,boxSizing:"border-box",background:"rgba(255,255,255,0.03)",border:"1px solid rgba(255,255,255,0.07)",borderRadius:12,overflow:"hidden"}}>
+                  {q&&<>
+                    <button onClick={()=>setOpen(isOpen?null:i)} style={{width:"100%",minHeight:ROW_H-2,background:"none",border:"none",padding:isOpen?"14px 16px":"0 16px",cursor:"pointer",textAlign:"left",display:"flex",alignItems:"center",gap:12}}>
+                      <span style={{background:DC[q.domain],borderRadius:6,padding:"2px 8px",fontSize:10,fontWeight:700,color:"white",whiteSpace:"nowrap",flexShrink:0}}>{q.domain}</span>
+                      <span style={{color:"#94a3b8",fontSize:13,flex:1,textAlign:"left",minWidth:0,whiteSpace:isOpen?"normal":"nowrap",overflow:"hidden",textOverflow:"ellipsis"}}>{q.question}</span>
+                      <span style={{color:"#475569",fontSize:16,flexShrink:0}}>{isOpen?"−":"+"}</span>
+                    </button>
+                    {isOpen&&(
+                      <div style={{padding:"0 16px 16px",borderTop:"1px solid rgba(255,255,255,0.05)"}}>
+                        {q.options.map((opt,j)=>(
+                          <div key={j} style={{display:"flex",alignItems:"center",gap:10,padding:"8px 12px",borderRadius:8,marginTop:6,background:j===q.correct?"rgba(16,185,129,0.08)":"rgba(255,255,255,0.02)",border:`1px solid ${j===q.correct?"rgba(16,185,129,0.25)":"rgba(255,255,255,0.05)"}`}}>
+                            <span style={{fontWeight:700,fontSize:12,color:j===q.correct?"#10b981":"#475569",minWidth:16}}>{String.fromCharCode(65+j)}</span>
+                            <span style={{color:j===q.correct?"#6ee7b7":"#64748b",fontSize:13}}>{opt}</span>
+                            {j===q.correct&&<span style={{marginLeft:"auto",color:"#10b981",fontSize:11}}>✓ Correct</span>}
+                          </div>
+                        ))}
+                        <div style={{marginTop:12,padding:"10px 14px",background:"rgba(99,102,241,0.08)",borderRadius:8,borderLeft:"3px solid #6366f1"}}>
+                          {q.correct===null
+                            ? <p style={{color:"#94a3b8",fontSize:13,margin:0}}>🔒 This question is on an exam in progress; its answer shows here once that exam ends.</p>
+                            : <p style={{color:"#a78bfa",fontSize:13,margin:0}}>💡 {q.explanation}</p>}
+                        </div>
+                        <StudyLink study={study} id={q.study} onStudy={onStudy}/>
                       </div>
-                    ))}
-                    <div style={{marginTop:12,padding:"10px 14px",background:"rgba(99,102,241,0.08)",borderRadius:8,borderLeft:"3px solid #6366f1"}}>
-                      <p style={{color:"#a78bfa",fontSize:13,margin:0}}>💡 {q.explanation}</p>
-                    </div>
-                  </div>
-                )}
-              </div>
-            ))}
+                    )}
+                  </>}
+                </div>
+              );
+            })}
           </div>
         </div>
       );
     }
 
+    // ─── Exam state ───────────────────────────────────────────────────────────
+    // One Int8Array slot per item (-1 = unanswered), a flag bitset and running
+    // counters: answering, flagging and navigating are O(1) and allocate nothing.
+    // encode() is the autosave/submit payload; see capm_sim/state.py for the layout.
+    class ExamState {
+      constructor(n) {
+        this.n = n;
+        this.responses = new Int8Array(n).fill(-1);
+        this.flags = new Uint8Array((n+7)>>3);
+        this.answered = 0;
+        this.flagged = 0;
+      }
+      answer(i, opt) {
+        const was = this.responses[i];
+        this.answered += (opt>=0) - (was>=0);
+        this.responses[i] = opt;
+      }
+      isFlagged(i) { return (this.flags[i>>3]>>(i&7)&1)===1; }
+      toggleFlag(i) {
+        this.flagged += this.isFlagged(i) ? -1 : 1;
+        this.flags[i>>3] ^= 1<<(i&7);
+      }
+      encode() {
+        const n = this.n, half = (n+1)>>1;
+        const out = new Uint8Array(3+half+this.flags.length);
+        out[0] = 1; out[1] = n&0xff; out[2] = n>>8;
+        for (let i = 0; i < n; i++) out[3+(i>>1)] |= (this.responses[i]+1) << ((i&1)*4);
+        out.set(this.flags, 3+half);
+        let bin = "";
+        for (let i = 0; i < out.length; i++) bin += String.fromCharCode(out[i]);
+        return btoa(bin);
+      }
+      static decode(b64) {
+        const raw = Uint8Array.from(atob(b64), c=>c.charCodeAt(0));
+        const n = raw[1] | raw[2]<<8, half = (n+1)>>1, s = new ExamState(n);
+        for (let i = 0; i < n; i++) {
+          const v = (raw[3+(i>>1)] >> ((i&1)*4)) & 0xf;
+          if (v) s.answer(i, v-1);
+        }
+        for (let i = 0; i < n; i++) if ((raw[3+half+(i>>3)]>>(i&7))&1) s.toggleFlag(i);
+        return s;
+      }
+    }
+
+    // ─── Session journal ──────────────────────────────────────────────────────
+    // Exam events are appended to a local buffer (4 bytes each, see
+    // capm_sim/journal.py) and shipped in numbered batches: after 1.5 s of quiet,
+    // at most 10 s after the first unsent event, or by beacon when the tab is
+    // hidden. Batches are sent one at a time and retried until acknowledged;
+    // a 400/409 means the exam no longer takes them, so sending stops (the
+    // submit carries the full state anyway). A beacon ships the whole queue as
+    // one batch under the newest seq: events are absolute, so the merge replays
+    // the same, and the server ignores the older seqs if they arrive later.
+    // When the timer runs out the journal is sealed at its current seq; a submit
+    // that arrives late (after a spell offline) carries the unsent batches up to
+    // that seq, since the server no longer takes journal writes by then.
+    const EV_ANSWER = 1, EV_FLAG = 2, EV_NAV = 3;
+    class Journal {
+      constructor(examId, seq=0) {
+        this.url = `/api/exams/${examId}/journal`;
+        this.seq = seq;
+        this.buf = new DataView(new ArrayBuffer(4*128));
+        this.n = 0;
+        this.queue = [];        // [{seq, body}] not yet acknowledged
+        this.sending = false;
+        this.idle = null;
+        this.cap = null;
+        this.closed = false;
+        this.until = null;      // seq when time ran out; later events are not part of the attempt
+      }
+      push(kind, item, value=0) {
+        if (this.until!==null) return;
+        if (this.n===128) this.cut();
+        const o = this.n++*4;
+        this.buf.setUint8(o, kind); this.buf.setUint16(o+1, item, true); this.buf.setInt8(o+3, value);
+        clearTimeout(this.idle);
+        this.idle = setTimeout(()=>this.flush(), 1500);
+        if (!this.cap) this.cap = setTimeout(()=>this.flush(), 10000);
+      }
+      cut() {
+        if (!this.n) return;
+        this.queue.push({seq:++this.seq, body:new Uint8Array(this.buf.buffer.slice(0,this.n*4))});
+        this.n = 0;
+      }
+      seal() {
+        this.cut();
+        if (this.until===null) this.until = this.seq;
+      }
+      pending() {
+        this.cut();
+        const until = this.until ?? this.seq;
+        return {until, batches:this.queue.filter(b=>b.seq<=until).map(b=>[b.seq, btoa(String.fromCharCode(...b.body))])};
+      }
+      flush(beacon=false) {
+        clearTimeout(this.idle); clearTimeout(this.cap); this.cap = null;
+        this.cut();
+        if (this.closed || !this.queue.length) return;
+        if (beacon) {
+          const body = new Uint8Array(this.queue.reduce((n,b)=>n+b.body.length, 0));
+          this.queue.reduce((o,b)=>(body.set(b.body, o), o+b.body.length), 0);
+          if (navigator.sendBeacon(`${this.url}?seq=${this.seq}`, body)) this.queue = [];
+          return;
+        }
+        if (this.sending) return;
+        const b = this.queue[0];
+        this.sending = true;
+        fetch(`${this.url}?seq=${b.seq}`, {method:"POST", body:b.body, keepalive:true})
+          .then(r=>{
+            if (r.ok) this.queue = this.queue.filter(x=>x!==b);
+            else if (r.status===400 || r.status===409) this.closed = true;
+          })
+          .catch(()=>{})
+          .finally(()=>{ this.sending = false; if (this.queue.length && !this.closed) this.cap = setTimeout(()=>this.flush(), 2000); });
+      }
+    }
+    const SESSION_KEY = "capm.exam";
+
+    // ─── Offline bank ─────────────────────────────────────────────────────────
+    // sw.js keeps the public bank (no key) as per-domain shards in Cache Storage
+    // (capm_sim/offline.py); a started exam falls back to them when the network drops.
+    const BANK_MANIFEST = "/bank/manifest.json";
+    let offlineBank = null;
+    async function loadOfflineBank() {
+      const manifest = await caches.match(BANK_MANIFEST).then(r=>r.json());
+      const byId = new Map();
+      for (const s of manifest.shards) {
+        const res = await caches.match(s.url);
+        if (!res) throw new Error(`${s.url} not cached`);
+        for (const q of await res.json()) byId.set(q.id, q);
+      }
+      return byId;
+    }
+    async function offlineQuestions(ids) {
+      offlineBank = offlineBank || loadOfflineBank().catch(e=>{ offlineBank = null; throw e; });
+      const byId = await offlineBank;
+      return ids.map(id=>byId.get(id));
+    }
+
+    // Anonymous per-browser id the server files missed items under for Drill.
+    const CANDIDATE_KEY = "capm.candidate";
+    function candidateId() {
+      let id = localStorage.getItem(CANDIDATE_KEY);
+      if(!id) { id = crypto.randomUUID().replace(/-/g,""); localStorage.setItem(CANDIDATE_KEY, id); }
+      return id;
+    }
+
     // ─── Exam ─────────────────────────────────────────────────────────────────
+    const QuestionView = memo(function QuestionView({ q, selected, saved, flagged, onSelect }) {
+      useProfile("QuestionView");
+      return (
+        <>
+          <div style={{display:"flex",gap:10,marginBottom:16,flexWrap:"wrap"}}>
+            <span style={{background:DC[q.domain],borderRadius:6,padding:"3px 10px",fontSize:11,fontWeight:700,color:"white"}}>{q.domain}</span>
+            {flagged&&<span style={{background:"rgba(245,158,11,0.12)",border:"1px solid rgba(245,158,11,0.3)",borderRadius:6,padding:"3px 10px",fontSize:11,color:"#f59e0b"}}>🚩 Flagged</span>}
+          </div>
+
+          <div style={{background:"rgba(255,255,255,0.03)",border:"1px solid rgba(255,255,255,0.07)",borderRadius:16,padding:"26px 26px 22px",marginBottom:18}}>
+            <p style={{color:"white",fontSize:17,lineHeight:1.75,margin:0,fontWeight:500}}>{q.question}</p>
+          </div>
+
+          <div style={{display:"grid",gap:10,marginBottom:22}}>
+            {q.options.map((opt,i)=>{
+              const isSel = selected===i;
+              const isSaved = saved===i && !isSel;
+              return (
+                <button key={i} onClick={()=>onSelect(i)} style={{background:isSel?"rgba(99,102,241,0.14)":isSaved?"rgba(99,102,241,0.07)":"rgba(255,255,255,0.02)",border:`1.5px solid ${isSel?"#6366f1":isSaved?"rgba(99,102,241,0.4)":"rgba(255,255,255,0.07)"}`,borderRadius:12,padding:"13px 16px",cursor:"pointer",textAlign:"left",display:"flex",alignItems:"center",gap:14,transition:"all 0.15s"}}
+                  onMouseOver={e=>{if(!isSel)e.currentTarget.style.borderColor="rgba(99,102,241,0.35)";}}
+                  onMouseOut={e=>{if(!isSel)e.currentTarget.style.borderColor=isSaved?"rgba(99,102,241,0.4)":"rgba(255,255,255,0.07)";}}>
+                  <span style={{width:28,height:28,borderRadius:8,border:`2px solid ${isSel?"#6366f1":"rgba(255,255,255,0.14)"}`,background:isSel?"#6366f1":"transparent",display:"flex",alignItems:"center",justifyContent:"center",fontWeight:700,fontSize:12,color:isSel?"white":"#475569",flexShrink:0}}>{String.fromCharCode(65+i)}</span>
+                  <span style={{color:isSel?"white":"#94a3b8",fontSize:14,lineHeight:1.5}}>{opt}</span>
+                </button>
+              );
+            })}
+          </div>
+        </>
+      );
+    });
+
+    // `version` changes whenever the (mutable) exam state does, which is what lets memo() skip re-renders.
+    const Navigator = memo(function Navigator({ state, version, current, selected, onGo }) {
+      useProfile("Navigator");
+      return (
+        <div style={{marginTop:22,background:"rgba(10,15,26,0.95)",border:"1px solid rgba(255,255,255,0.08)",borderRadius:16,padding:20}}>
+          <p style={{color:"#475569",fontSize:11,margin:"0 0 14px",textTransform:"uppercase",letterSpacing:1,fontWeight:600}}>Question Navigator</p>
+          <div style={{display:"flex",flexWrap:"wrap",gap:5}}>
+            {Array.from({length:state.n},(_,i)=>{
+              const done=state.responses[i]>=0||(i===current&&selected!==null);
+              const isCur=i===current;
+              const isFlag=state.isFlagged(i);
+              return (
+                <button key={i} onClick={()=>onGo(i)} style={{width:32,height:32,borderRadius:7,fontSize:10,fontWeight:600,cursor:"pointer",border:"1.5px solid",background:isCur?"#6366f1":done?"rgba(16,185,129,0.12)":"rgba(255,255,255,0.03)",borderColor:isCur?"#6366f1":isFlag?"#f59e0b":done?"rgba(16,185,129,0.35)":"rgba(255,255,255,0.08)",color:isCur?"white":done?"#6ee7b7":"#475569"}}>
+                  {i+1}
+                </button>
+              );
+            })}
+          </div>
+        </div>
+      );
+    });
+
     function Exam({ onFinish }) {
-      const [questions] = useState(()=>shuffle(QUESTIONS));
+      useProfile("Exam");
+      const [exam, setExam] = useState(null);   // { exam, total, page_size, seconds, duration } from the server
+      const [deadline, setDeadline] = useState(null);
+      const [pages, setPages] = useState({});   // page number → public questions (no key)
       const [current, setCurrent] = useState(0);
-      const [answers, setAnswers] = useState({});
+      const mountedAt = useRef(performance.now());
+      const navAt = useRef(null);
+      const st = useRef(null);                  // ExamState, created once the form size is known
+      const [version, bump] = useReducer(v=>v+1, 0);
       const [selected, setSelected] = useState(null);
-      const [flagged, setFlagged] = useState(new Set());
       const [showNav, setShowNav] = useState(false);
-      const [timeLeft, setTimeLeft] = useState(180*60);
       const [done, setDone] = useState(false);
-      const TOTAL = 180*60;
-      const timerRef = useRef(null);
+      const loading = useRef(new Set());
+      const journal = useRef(null);
+      const submitRef = useRef(null);
+      const goRef = useRef(null);
+      const times = useRef(null);               // seconds on each item, for item analysis
+      const since = useRef(Date.now());
+      const clockRef = useRef(null);
+      const [offline, setOffline] = useState(!navigator.onLine);
+      const submitPending = useRef(false);
+      const [error, setError] = useState(null); // { message, retry } when starting or submitting failed
+
+      function start() {
+        // Resume an unfinished attempt after a refresh or crash; otherwise start a new one.
+        setError(null);
+        const saved = localStorage.getItem(SESSION_KEY);
+        const resume = saved ? api(`/api/exams/${saved}/resume`).catch(()=>null) : Promise.resolve(null);
+        resume.then(r=>r || api("/api/exams",{})).then(e=>{
+          localStorage.setItem(SESSION_KEY, e.exam);
+          st.current = e.state ? ExamState.decode(e.state) : new ExamState(e.total);
+          times.current = new Float64Array(e.total);
+          journal.current = new Journal(e.exam, e.seq||0);
+          const at = e.current||0;
+          setCurrent(at);
+          setSelected(st.current.responses[at]>=0 ? st.current.responses[at] : null);
+          setDeadline(Date.now()+e.seconds*1000);
+          since.current = Date.now();
+          setExam(e);
+        }).catch(err=>setError({message:navigator.onLine ? `Couldn't start the exam: ${err.message}.` : "Couldn't start the exam: you're offline.", retry:start}));
+      }
 
       useEffect(()=>{
-        timerRef.current = setInterval(()=>{
-          setTimeLeft(s=>{
-            if(s<=1){ clearInterval(timerRef.current); handleSubmit(true); return 0; }
-            return s-1;
-          });
-        },1000);
-        return ()=>clearInterval(timerRef.current);
+        start();
+        const hide = ()=>{
+          if(document.visibilityState!=="hidden") { since.current = Date.now(); return; }
+          if(journal.current) journal.current.flush(true);
+          clockRef.current();
+        };
+        document.addEventListener("visibilitychange", hide);
+        // Answers keep going to the journal queue while offline; it drains on reconnect.
+        const up = ()=>{ setOffline(false); if(journal.current) journal.current.flush(); if(submitPending.current) submitRef.current(); };
+        const down = ()=>setOffline(true);
+        addEventListener("online", up);
+        addEventListener("offline", down);
+        return ()=>{
+          document.removeEventListener("visibilitychange", hide);
+          removeEventListener("online", up);
+          removeEventListener("offline", down);
+        };
       },[]);
 
-      function handleSubmit(auto=false) {
-        clearInterval(timerRef.current);
-        const final = selected!==null ? {...answers,[current]:selected} : {...answers};
-        const correct = questions.reduce((acc,q,i)=>acc+(final[i]===q.correct?1:0),0);
-        onFinish({correct,total:questions.length,answers:final,questions});
+      function loadPage(p) {
+        if(!exam || p*exam.page_size>=exam.total || pages[p] || loading.current.has(p)) return;
+        loading.current.add(p);
+        const offset = p*exam.page_size;
+        api(`/api/exams/${exam.exam}/questions?offset=${offset}&limit=${exam.page_size}`)
+          .then(r=>r.questions, ()=>offlineQuestions(exam.items.slice(offset, offset+exam.page_size)))
+          .then(questions=>setPages(s=>({...s,[p]:questions})))
+          .catch(()=>{})
+          .finally(()=>loading.current.delete(p));
+      }
+      const page = exam ? Math.floor(current/exam.page_size) : 0;
+      // Fetch the page being viewed and prefetch the next one.
+      useEffect(()=>{ loadPage(page); loadPage(page+1); },[exam,page,offline]);
+
+      // Charge the time since the last navigation (or tab switch) to the item on screen.
+      function clock() {
+        const now = Date.now();
+        if(times.current) { times.current[current] += (now-since.current)/1000; Telemetry.mark("exam.dwell", now-since.current); }
+        since.current = now;
       }
+      clockRef.current = clock;
+
+      function handleSubmit() {
+        if(done||!exam) return;
+        setDone(true);
+        setError(null);
+        if(selected!==null) st.current.answer(current, selected);
+        clock();
+        const answers = Array.from(st.current.responses, v=>v<0?undefined:v);
+        const seconds = Array.from(times.current, Math.round);
+        api(`/api/exams/${exam.exam}/submit`,{state:st.current.encode(),seconds,candidate:candidateId(),journal:journal.current.pending()})
+          // When the server scored other answers than ours (the journal's, past the deadline, or fewer items after
+          // some were retired from the bank) it sends them, lined up with the questions it returns.
+          .then(r=>{ submitPending.current = false; localStorage.removeItem(SESSION_KEY); onFinish({...r,answers:r.answers?r.answers.map(v=>v??undefined):answers}); })
+          .catch(err=>{
+            setDone(false);
+            submitPending.current = !navigator.onLine;
+            if(!submitPending.current) setError({message:`Couldn't submit the exam: ${err.message}.`, retry:()=>submitRef.current()});
+          });
+      }
+      submitRef.current = handleSubmit;
 
       function go(idx) {
-        if(selected!==null) setAnswers(p=>({...p,[current]:selected}));
-        const saved = answers[idx];
-        setSelected(saved!==undefined?saved:null);
+        if(selected!==null && st.current.responses[current]!==selected) { st.current.answer(current, selected); bump(); }
+        journal.current.push(EV_NAV, idx);
+        clock();
+        const saved = st.current.responses[idx];
+        setSelected(saved>=0?saved:null);
         setCurrent(idx);
         setShowNav(false);
+        navAt.current = performance.now();
       }
+      goRef.current = go;
+
+      // Stable callbacks keep the memoized children from re-rendering on unrelated state.
+      const expire = useCallback(()=>{ journal.current.seal(); submitRef.current(); },[]);
+      const onGo = useCallback(i=>goRef.current(i),[]);
+      const curRef = useRef(0);
+      curRef.current = current;
+      // Journal the choice immediately so a crash before navigating doesn't lose it.
+      const onSelect = useCallback(i=>{ setSelected(i); journal.current.push(EV_ANSWER, curRef.current, i); },[]);
+
+      const total = exam ? exam.total : 0;
+      const q = exam && pages[page] ? pages[page][current%exam.page_size] : null;
+      const answered = st.current ? st.current.answered + (selected!==null&&st.current.responses[current]<0?1:0) : 0;
+      const saved = st.current && st.current.responses[current]>=0 ? st.current.responses[current] : undefined;
+      const isFlagged = !!st.current && st.current.isFlagged(current);
 
-      const q = questions[current];
-      const answered = Object.keys(answers).length + (selected!==null&&!(current in answers)?1:0);
-      const pct = timeLeft/TOTAL;
-      const timerColor = pct>0.5?"#10b981":pct>0.25?"#f59e0b":"#ef4444";
+      // Mount → first question on screen, and each navigation → its commit.
+      useEffect(()=>{ if(q && mountedAt.current!==null) { Telemetry.mark("exam.ready", performance.now()-mountedAt.current); mountedAt.current = null; } },[q]);
+      useEffect(()=>{ if(navAt.current!==null) { Telemetry.mark("exam.nav", performance.now()-navAt.current); navAt.current = null; } },[current]);
+
+      if(!q) return (
+        <div style={{minHeight:"100vh",display:"flex",alignItems:"center",justifyContent:"center",color:"#475569",fontSize:14}}>
+          {error ? <ErrorNote error={error}/> : "Loading exam…"}
+        </div>
+      );
 
       return (
         <div style={{minHeight:"100vh",display:"flex",flexDirection:"column"}}>
@@ -327,95 +760,54 @@
               <span style={{fontFamily:"'Playfair Display',serif",color:"white",fontWeight:700,fontSize:15}}>CAPM®</span>
               <div style={{flex:1}}>
                 <div style={{height:3,background:"rgba(255,255,255,0.06)",borderRadius:2}}>
-                  <div style={{height:"100%",width:`${(current/150)*100}%`,background:"linear-gradient(90deg,#6366f1,#8b5cf6)",borderRadius:2,transition:"width 0.3s ease"}}/>
+                  <div style={{height:"100%",width:`${(current/total)*100}%`,background:"linear-gradient(90deg,#6366f1,#8b5cf6)",borderRadius:2,transition:"width 0.3s ease"}}/>
                 </div>
                 <div style={{display:"flex",justifyContent:"space-between",marginTop:4}}>
-                  <span style={{color:"#475569",fontSize:11}}>Question {current+1} of 150</span>
+                  <span style={{color:"#475569",fontSize:11}}>Question {current+1} of {total}</span>
                   <span style={{color:"#475569",fontSize:11}}>{answered} answered</span>
                 </div>
               </div>
-              <TimerRing seconds={timeLeft} total={TOTAL}/>
+              {offline&&<span title="Answers are kept on this device and sent when the connection returns" style={{color:"#f59e0b",fontSize:11,fontWeight:600,border:"1px solid rgba(245,158,11,0.3)",borderRadius:6,padding:"3px 8px"}}>{submitPending.current?"Offline · submits on reconnect":"Offline"}</span>}
+              <TimerRing deadline={deadline} total={exam.duration} onExpire={expire}/>
             </div>
           </div>
 
           {/* Question */}
           <div style={{maxWidth:820,margin:"0 auto",width:"100%",padding:"28px 24px 100px",flex:1}}>
-            <div style={{display:"flex",gap:10,marginBottom:16,flexWrap:"wrap"}}>
-              <span style={{background:DC[q.domain],borderRadius:6,padding:"3px 10px",fontSize:11,fontWeight:700,color:"white"}}>{q.domain}</span>
-              {flagged.has(current)&&<span style={{background:"rgba(245,158,11,0.12)",border:"1px solid rgba(245,158,11,0.3)",borderRadius:6,padding:"3px 10px",fontSize:11,color:"#f59e0b"}}>🚩 Flagged</span>}
-            </div>
-
-            <div style={{background:"rgba(255,255,255,0.03)",border:"1px solid rgba(255,255,255,0.07)",borderRadius:16,padding:"26px 26px 22px",marginBottom:18}}>
-              <p style={{color:"white",fontSize:17,lineHeight:1.75,margin:0,fontWeight:500}}>{q.question}</p>
-            </div>
-
-            <div style={{display:"grid",gap:10,marginBottom:22}}>
-              {q.options.map((opt,i)=>{
-                const isSel = selected===i;
-                const isSaved = answers[current]===i && !isSel;
-                return (
-                  <button key={i} onClick={()=>setSelected(i)} style={{background:isSel?"rgba(99,102,241,0.14)":isSaved?"rgba(99,102,241,0.07)":"rgba(255,255,255,0.02)",border:`1.5px solid ${isSel?"#6366f1":isSaved?"rgba(99,102,241,0.4)":"rgba(255,255,255,0.07)"}`,borderRadius:12,padding:"13px 16px",cursor:"pointer",textAlign:"left",display:"flex",alignItems:"center",gap:14,transition:"all 0.15s"}}
-                    onMouseOver={e=>{if(!isSel)e.currentTarget.style.borderColor="rgba(99,102,241,0.35)";}}
-                    onMouseOut={e=>{if(!isSel)e.currentTarget.style.borderColor=isSaved?"rgba(99,102,241,0.4)":"rgba(255,255,255,0.07)";}}>
-                    <span style={{width:28,height:28,borderRadius:8,border:`2px solid ${isSel?"#6366f1":"rgba(255,255,255,0.14)"}`,background:isSel?"#6366f1":"transparent",display:"flex",alignItems:"center",justifyContent:"center",fontWeight:700,fontSize:12,color:isSel?"white":"#475569",flexShrink:0}}>{String.fromCharCode(65+i)}</span>
-                    <span style={{color:isSel?"white":"#94a3b8",fontSize:14,lineHeight:1.5}}>{opt}</span>
-                  </button>
-                );
-              })}
-            </div>
+            {error&&<ErrorNote error={error}/>}
+            <QuestionView q={q} selected={selected} saved={saved} flagged={isFlagged} onSelect={onSelect}/>
 
             {/* Actions */}
             <div style={{display:"flex",gap:10,alignItems:"center",flexWrap:"wrap"}}>
-              <button onClick={()=>setFlagged(s=>{const n=new Set(s);n.has(current)?n.delete(current):n.add(current);return n;})} style={{background:flagged.has(current)?"rgba(245,158,11,0.12)":"rgba(255,255,255,0.04)",border:`1px solid ${flagged.has(current)?"rgba(245,158,11,0.35)":"rgba(255,255,255,0.08)"}`,borderRadius:8,padding:"10px 16px",color:flagged.has(current)?"#f59e0b":"#64748b",fontSize:13,cursor:"pointer"}}>
-                🚩 {flagged.has(current)?"Unflag":"Flag"}
+              <button onClick={()=>{ st.current.toggleFlag(current); journal.current.push(EV_FLAG, current, st.current.isFlagged(current)?1:0); bump(); }} style={{background:isFlagged?"rgba(245,158,11,0.12)":"rgba(255,255,255,0.04)",border:`1px solid ${isFlagged?"rgba(245,158,11,0.35)":"rgba(255,255,255,0.08)"}`,borderRadius:8,padding:"10px 16px",color:isFlagged?"#f59e0b":"#64748b",fontSize:13,cursor:"pointer"}}>
+                🚩 {isFlagged?"Unflag":"Flag"}
               </button>
               <button onClick={()=>setShowNav(s=>!s)} style={{background:"rgba(255,255,255,0.04)",border:"1px solid rgba(255,255,255,0.08)",borderRadius:8,padding:"10px 16px",color:"#94a3b8",fontSize:13,cursor:"pointer"}}>
                 ⊞ Navigator
               </button>
               <div style={{flex:1}}/>
               {current>0&&<button onClick={()=>go(current-1)} style={{background:"rgba(255,255,255,0.05)",border:"1px solid rgba(255,255,255,0.1)",borderRadius:8,padding:"10px 20px",color:"#94a3b8",fontSize:14,cursor:"pointer"}}>← Prev</button>}
-              {current<149
+              {current<total-1
                 ?<button onClick={()=>go(current+1)} style={{background:"linear-gradient(135deg,#6366f1,#4f46e5)",border:"none",borderRadius:8,padding:"10px 24px",color:"white",fontSize:14,fontWeight:700,cursor:"pointer"}}>Next →</button>
                 :<button onClick={()=>handleSubmit()} style={{background:"linear-gradient(135deg,#059669,#047857)",border:"none",borderRadius:8,padding:"10px 24px",color:"white",fontSize:14,fontWeight:700,cursor:"pointer"}}>✓ Submit</button>
               }
             </div>
 
             {/* Navigator */}
-            {showNav&&(
-              <div style={{marginTop:22,background:"rgba(10,15,26,0.95)",border:"1px solid rgba(255,255,255,0.08)",borderRadius:16,padding:20}}>
-                <p style={{color:"#475569",fontSize:11,margin:"0 0 14px",textTransform:"uppercase",letterSpacing:1,fontWeight:600}}>Question Navigator</p>
-                <div style={{display:"flex",flexWrap:"wrap",gap:5}}>
-                  {questions.map((_,i)=>{
-                    const done=answers[i]!==undefined||(i===current&&selected!==null);
-                    const isCur=i===current;
-                    const isFlag=flagged.has(i);
-                    return (
-                      <button key={i} onClick={()=>go(i)} style={{width:32,height:32,borderRadius:7,fontSize:10,fontWeight:600,cursor:"pointer",border:"1.5px solid",background:isCur?"#6366f1":done?"rgba(16,185,129,0.12)":"rgba(255,255,255,0.03)",borderColor:isCur?"#6366f1":isFlag?"#f59e0b":done?"rgba(16,185,129,0.35)":"rgba(255,255,255,0.08)",color:isCur?"white":done?"#6ee7b7":"#475569"}}>
-                        {i+1}
-                      </button>
-                    );
-                  })}
-                </div>
-              </div>
-            )}
+            {showNav&&<Navigator state={st.current} version={version} current={current} selected={selected} onGo={onGo}/>}
           </div>
         </div>
       );
     }
 
     // ─── Results ──────────────────────────────────────────────────────────────
-    function Results({ result, onRetry, onHome }) {
-      const { correct, total, answers, questions } = result;
-      const pct = (correct/total)*100;
-      const passed = pct >= 61;
+    function Results({ result, onRetry, onHome, onStudy }) {
+      // Score, pass/fail and the per-domain breakdown all come from the server's scorer.
+      const { correct, total, pct, passed, domains, answers, questions, late } = result;
       const [showWrong, setShowWrong] = useState(false);
+      const study = useStudy();
 
-      const domainStats = {};
-      questions.forEach((q,i)=>{
-        if(!domainStats[q.domain]) domainStats[q.domain]={correct:0,total:0};
-        domainStats[q.domain].total++;
-        if(answers[i]===q.correct) domainStats[q.domain].correct++;
-      });
+      const domainStats = Object.fromEntries(Object.entries(domains).map(([d,[c,t]])=>[d,{correct:c,total:t}]));
       const wrong = questions.map((q,i)=>({q,i,yours:answers[i]})).filter(x=>x.yours!==x.q.correct);
 
       return (
@@ -424,6 +816,7 @@
             <div style={{fontSize:52,marginBottom:14}}>{passed?"🎉":"📈"}</div>
             <h2 style={{fontFamily:"'Playfair Display',serif",fontSize:"clamp(1.8rem,5vw,2.6rem)",color:"white",margin:"0 0 8px"}}>{passed?"Congratulations!":"Keep Practicing"}</h2>
             <p style={{color:"#64748b",fontSize:15,margin:"0 0 32px"}}>{passed?"You passed the simulation!":"Review the domain breakdown below to improve"}</p>
+            {late&&<p role="status" style={{color:"#f59e0b",fontSize:13,margin:"-16px 0 28px"}}>Submitted after time ran out while offline: only answers saved to the server before the deadline were scored.</p>}
             <div style={{display:"inline-flex",alignItems:"center",justifyContent:"center",width:156,height:156,borderRadius:"50%",background:`conic-gradient(${passed?"#10b981":"#6366f1"} ${pct*3.6}deg, rgba(255,255,255,0.05) 0deg)`,boxShadow:`0 0 40px ${passed?"rgba(16,185,129,0.25)":"rgba(99,102,241,0.25)"}`}}>
               <div style={{width:118,height:118,borderRadius:"50%",background:"#0a0f1a",display:"flex",flexDirection:"column",alignItems:"center",justifyContent:"center"}}>
                 <span style={{fontSize:30,fontWeight:800,color:"white"}}>{pct.toFixed(1)}%</span>
@@ -453,6 +846,7 @@
           <button onClick={()=>setShowWrong(s=>!s)} style={{width:"100%",background:"rgba(255,255,255,0.04)",border:"1px solid rgba(255,255,255,0.08)",borderRadius:10,padding:"12px 20px",color:"#94a3b8",fontSize:14,cursor:"pointer",marginBottom:20}}>
             {showWrong?"Hide":"Review"} Incorrect Answers ({wrong.length})
           </button>
+          {wrong.length>0&&<p style={{color:"#475569",fontSize:12,textAlign:"center",margin:"-10px 0 20px"}}>These questions are now in your 🔁 Drill queue.</p>}
 
           {showWrong&&(
             <div style={{display:"grid",gap:10,marginBottom:28}}>
@@ -468,6 +862,7 @@
                     </span>
                   </div>
                   <p style={{color:"#818cf8",fontSize:12,margin:0}}>💡 {q.explanation}</p>
+                  <StudyLink study={study} id={q.study} onStudy={onStudy}/>
                 </div>
               ))}
             </div>
@@ -481,15 +876,188 @@
       );
     }
 
+    // ─── Adaptive practice ────────────────────────────────────────────────────
+    // The server re-estimates ability after every answer and picks the next item
+    // for the blueprint (capm_sim/adaptive.py); an item's key and explanation
+    // arrive only once it has been answered.
+    function Practice({ onHome }) {
+      useProfile("Practice");
+      const [session, setSession] = useState(null);
+      const [q, setQ] = useState(null);
+      const [est, setEst] = useState(null);      // { theta, se, p_pass, decision, answered }
+      const [feedback, setFeedback] = useState(null);
+      const [decided, setDecided] = useState(null);
+      const [busy, setBusy] = useState(false);
+      const [error, setError] = useState(null);  // { message, retry }
+
+      const start = useCallback(()=>{
+        setError(null);
+        api("/api/practice",{}).then(r=>{ setSession(r); setQ(r.question); setEst(r); })
+          .catch(e=>setError({message:`Couldn't start practice: ${e.message}.`, retry:start}));
+      },[]);
+      useEffect(start,[start]);
+
+      const answer = useCallback(i=>{
+        if(busy||feedback) return;
+        setBusy(true);
+        setError(null);
+        api(`/api/practice/${session.session}/answer`,{item:q.id,choice:i}).then(r=>{
+          setFeedback({...r,choice:i});
+          setEst(r);
+          if(r.decision) setDecided(d=>d||r);
+        }).catch(e=>setError({message:`Couldn't send your answer: ${e.message}.`, retry:()=>answer(i)}))
+          .finally(()=>setBusy(false));
+      },[busy,feedback,session,q]);
+
+      if(!q) return (
+        <div style={{minHeight:"60vh",display:"flex",alignItems:"center",justifyContent:"center",color:"#475569",fontSize:14}}>
+          {error ? <ErrorNote error={error}/> : "Loading practice…"}
+        </div>
+      );
+      const pPass = Math.round(est.p_pass*100);
+
+      return (
+        <div style={{maxWidth:820,margin:"0 auto",padding:"28px 24px 80px"}}>
+          <div style={{display:"flex",alignItems:"center",gap:16,marginBottom:20}}>
+            <h2 style={{fontFamily:"'Playfair Display',serif",color:"white",fontSize:24,margin:0,flex:1}}>Adaptive Practice</h2>
+            <span style={{color:"#475569",fontSize:12}}>{est.answered} answered</span>
+            <div style={{width:160}}>
+              <div style={{display:"flex",justifyContent:"space-between",color:"#475569",fontSize:11,marginBottom:4}}><span>Pass likelihood</span><span>{pPass}%</span></div>
+              <div style={{height:4,background:"rgba(255,255,255,0.06)",borderRadius:2}}>
+                <div style={{height:"100%",width:`${pPass}%`,background:pPass>=50?"#10b981":"#ef4444",borderRadius:2,transition:"width 0.3s ease"}}/>
+              </div>
+            </div>
+          </div>
+
+          {decided&&(
+            <div style={{background:decided.decision==="pass"?"rgba(16,185,129,0.08)":"rgba(239,68,68,0.08)",border:`1px solid ${decided.decision==="pass"?"rgba(16,185,129,0.25)":"rgba(239,68,68,0.25)"}`,borderRadius:12,padding:"14px 18px",marginBottom:20,display:"flex",alignItems:"center",gap:14,flexWrap:"wrap"}}>
+              <span style={{color:"white",fontSize:14,flex:1}}>
+                {decided.decision==="pass"?"✓ Likely to pass":"✗ Not yet at passing level"} — {Math.round(Math.max(decided.p_pass,1-decided.p_pass)*100)}% confident after {decided.answered} questions.
+              </span>
+              <button onClick={onHome} style={{background:"rgba(255,255,255,0.06)",border:"1px solid rgba(255,255,255,0.1)",borderRadius:8,padding:"7px 14px",color:"#94a3b8",fontSize:12,fontWeight:600,cursor:"pointer"}}>Finish</button>
+            </div>
+          )}
+
+          {error&&<ErrorNote error={error}/>}
+          <QuestionView q={q} selected={feedback?feedback.choice:null} saved={undefined} flagged={false} onSelect={answer}/>
+
+          {feedback&&(
+            <div style={{background:"rgba(255,255,255,0.03)",border:"1px solid rgba(255,255,255,0.07)",borderRadius:12,padding:"16px 18px"}}>
+              {feedback.retired
+                ? <p style={{color:"#94a3b8",fontSize:14,margin:"0 0 14px"}}>This question was retired from the bank while you answered it, so it isn't scored.</p>
+                : <>
+                    <p style={{color:feedback.correct?"#10b981":"#ef4444",fontSize:14,fontWeight:700,margin:"0 0 8px"}}>
+                      {feedback.correct?"✓ Correct":`✗ Incorrect — the answer is ${String.fromCharCode(65+feedback.answer)}`}
+                    </p>
+                    <p style={{color:"#a78bfa",fontSize:13,margin:"0 0 14px"}}>💡 {feedback.explanation}</p>
+                  </>}
+              {feedback.next
+                ? <button onClick={()=>{ setQ(feedback.next); setFeedback(null); }} style={{background:"linear-gradient(135deg,#6366f1,#4f46e5)",border:"none",borderRadius:10,padding:"10px 20px",color:"white",fontSize:14,fontWeight:600,cursor:"pointer"}}>Next Question →</button>
+                : <button onClick={onHome} style={{background:"rgba(255,255,255,0.06)",border:"1px solid rgba(255,255,255,0.1)",borderRadius:10,padding:"10px 20px",color:"#94a3b8",fontSize:14,fontWeight:600,cursor:"pointer"}}>Finish</button>}
+            </div>
+          )}
+        </div>
+      );
+    }
+
+    // ─── Drill ────────────────────────────────────────────────────────────────
+    // Missed exam items come back on an SM-2 schedule (capm_sim/srs.py). A wrong
+    // pick is graded 1 and the card relearns in minutes; a right one is graded
+    // by the candidate, which sets how far out it goes next.
+    const DRILL_BATCH = 20;
+    function Drill({ onHome }) {
+      useProfile("Drill");
+      const [queue, setQueue] = useState(null);    // { due, next, cards }
+      const [pos, setPos] = useState(0);
+      const [choice, setChoice] = useState(null);
+      const [busy, setBusy] = useState(false);
+      const [error, setError] = useState(null);  // { message, retry }
+
+      const load = useCallback(()=>{
+        setError(null);
+        api(`/api/srs/${candidateId()}?limit=${DRILL_BATCH}`).then(r=>{ setQueue(r); setPos(0); setChoice(null); })
+          .catch(e=>setError({message:`Couldn't load the drill: ${e.message}.`, retry:load}));
+      },[]);
+      useEffect(load,[load]);
+
+      const card = queue && queue.cards[pos];
+      const q = card && card.question;
+      const grade = useCallback(quality=>{
+        if(busy) return;
+        setBusy(true);
+        setError(null);
+        api(`/api/srs/${candidateId()}/review`,{item:q.id,quality}).then(()=>{
+          setChoice(null);
+          if(pos+1<queue.cards.length) setPos(pos+1); else load();
+        }).catch(e=>setError({message:`Couldn't save that review: ${e.message}.`, retry:()=>grade(quality)}))
+          .finally(()=>setBusy(false));
+      },[busy,q,pos,queue,load]);
+      const select = useCallback(i=>{ if(choice===null) setChoice(i); },[choice]);
+
+      if(!queue) return (
+        <div style={{minHeight:"60vh",display:"flex",alignItems:"center",justifyContent:"center",color:"#475569",fontSize:14}}>
+          {error ? <ErrorNote error={error}/> : "Loading drill…"}
+        </div>
+      );
+      if(!q) return (
+        <div style={{maxWidth:560,margin:"0 auto",padding:"80px 24px",textAlign:"center"}}>
+          <div style={{fontSize:44,marginBottom:14}}>✅</div>
+          <h2 style={{fontFamily:"'Playfair Display',serif",color:"white",fontSize:26,margin:"0 0 8px"}}>All caught up</h2>
+          <p style={{color:"#64748b",fontSize:14,margin:"0 0 28px"}}>
+            {queue.next ? `Next review ${new Date(queue.next*1000).toLocaleString()}.` : "Questions you miss on a full exam will show up here."}
+          </p>
+          <button onClick={onHome} style={{background:"rgba(255,255,255,0.05)",border:"1px solid rgba(255,255,255,0.1)",borderRadius:12,padding:"12px 24px",color:"#94a3b8",fontSize:14,fontWeight:600,cursor:"pointer"}}>🏠 Home</button>
+        </div>
+      );
+      const right = choice!==null && choice===q.correct;
+
+      return (
+        <div style={{maxWidth:820,margin:"0 auto",padding:"28px 24px 80px"}}>
+          <div style={{display:"flex",alignItems:"center",gap:16,marginBottom:20}}>
+            <h2 style={{fontFamily:"'Playfair Display',serif",color:"white",fontSize:24,margin:0,flex:1}}>Drill</h2>
+            <span style={{color:"#475569",fontSize:12}}>{Math.max(queue.due-pos,1)} due · {card.lapses} {card.lapses===1?"lapse":"lapses"}</span>
+          </div>
+
+          {error&&<ErrorNote error={error}/>}
+          <QuestionView q={q} selected={choice} saved={undefined} flagged={false} onSelect={select}/>
+
+          {choice!==null&&(
+            <div style={{background:"rgba(255,255,255,0.03)",border:"1px solid rgba(255,255,255,0.07)",borderRadius:12,padding:"16px 18px"}}>
+              <p style={{color:right?"#10b981":"#ef4444",fontSize:14,fontWeight:700,margin:"0 0 8px"}}>
+                {right?"✓ Correct":`✗ Incorrect — the answer is ${String.fromCharCode(65+q.correct)}`}
+              </p>
+              <p style={{color:"#a78bfa",fontSize:13,margin:"0 0 14px"}}>💡 {q.explanation}</p>
+              {right
+                ? <div style={{display:"flex",gap:8}}>
+                    {[[3,"Hard"],[4,"Good"],[5,"Easy"]].map(([quality,label])=>(
+                      <button key={quality} disabled={busy} onClick={()=>grade(quality)} style={{flex:1,background:"rgba(99,102,241,0.1)",border:"1px solid rgba(99,102,241,0.3)",borderRadius:10,padding:"10px",color:"#a78bfa",fontSize:14,fontWeight:600,cursor:"pointer"}}>{label}</button>
+                    ))}
+                  </div>
+                : <button disabled={busy} onClick={()=>grade(1)} style={{background:"linear-gradient(135deg,#6366f1,#4f46e5)",border:"none",borderRadius:10,padding:"10px 20px",color:"white",fontSize:14,fontWeight:600,cursor:"pointer"}}>Next →</button>}
+            </div>
+          )}
+        </div>
+      );
+    }
+
     // ─── App ──────────────────────────────────────────────────────────────────
     function App() {
-      const [screen, setScreen] = useState("home");
+      const [screen, show] = useState("home");
       const [result, setResult] = useState(null);
       const [lastResult, setLastResult] = useState(null);
+      const [focus, setFocus] = useState(null);   // study section opened from a "Study this" link
+      const shownAt = useRef(null);
+      // Screen transitions are timed from the request to the committed render; the first one from page load.
+      const setScreen = useCallback(s=>{ shownAt.current = performance.now(); show(s); },[]);
+      useEffect(()=>{
+        Telemetry.mark(shownAt.current===null ? "app.boot" : `screen.${screen}`, performance.now()-(shownAt.current ?? 0));
+      },[screen]);
+
+      useEffect(()=>{ if(screen!=="study") setFocus(null); },[screen]);
+      const studySection = useCallback(id=>{ setFocus(id); setScreen("study"); },[]);
 
       function handleFinish(r) {
-        const pct = (r.correct/r.total)*100;
-        setLastResult({...r, pct, passed: pct>=61});
+        setLastResult(r);
         setResult(r);
         setScreen("results");
       }
@@ -499,17 +1067,27 @@
           <BG/>
           <div style={{position:"relative",zIndex:1}}>
             <Nav screen={screen} setScreen={setScreen}/>
-            {screen==="home"    && <Home onStart={()=>setScreen("exam")} onStudy={()=>setScreen("study")} onReview={()=>setScreen("review")} lastResult={lastResult}/>}
-            {screen==="study"   && <Study/>}
-            {screen==="review"  && <Review/>}
+            {screen==="home"    && <Home onStart={()=>setScreen("exam")} onPractice={()=>setScreen("practice")} onDrill={()=>setScreen("drill")} onStudy={()=>setScreen("study")} onReview={()=>setScreen("review")} lastResult={lastResult}/>}
+            {screen==="study"   && <Study key={focus} focus={focus}/>}
+            {screen==="review"  && <Review onStudy={studySection}/>}
             {screen==="exam"    && <Exam onFinish={handleFinish}/>}
-            {screen==="results" && result && <Results result={result} onRetry={()=>setScreen("exam")} onHome={()=>setScreen("home")}/>}
+            {screen==="practice" && <Practice onHome={()=>setScreen("home")}/>}
+            {screen==="drill"   && <Drill onHome={()=>setScreen("home")}/>}
+            {screen==="results" && result && <Results result={result} onRetry={()=>setScreen("exam")} onHome={()=>setScreen("home")} onStudy={studySection}/>}
           </div>
         </div>
       );
     }
 
     ReactDOM.createRoot(document.getElementById("root")).render(<App/>);
+
+    // Precache the shell and fetch whatever bank shards changed since the last visit.
+    if ("serviceWorker" in navigator) {
+      navigator.serviceWorker.register("/sw.js")
+        .then(()=>navigator.serviceWorker.ready)
+        .then(reg=>reg.active.postMessage("sync-bank"))
+        .catch(()=>{});
+    }
   </script>
 </body>
 </html>
@@ -0,0 +1,49 @@
+"""Blueprint apportionment and stratified form assembly."""
+
+import pytest
+
+from capm_sim.assembly import DOMAIN_WEIGHTS, Assembler, InsufficientItems, apportion
+
+
+@pytest.mark.parametrize("length", [0, 1, 7, 50, 150, 181])
+def test_apportion_sums_to_length(length):
+    quota = apportion(length, DOMAIN_WEIGHTS)
+    assert sum(quota.values()) == length
+    for d, w in DOMAIN_WEIGHTS.items():
+        assert abs(quota[d] - length * w / 100) < 1
+
+
+def test_apportion_largest_remainder_and_ties():
+    assert apportion(150, DOMAIN_WEIGHTS) == {"Fundamentals": 54, "Predictive": 25, "Agile": 30,
+                                              "Business Analysis": 41}
+    # Equal remainders: the heavier domain first, then blueprint order.
+    assert apportion(1, {"a": 1, "b": 2, "c": 1}) == {"a": 0, "b": 1, "c": 0}
+    assert apportion(2, {"a": 1, "b": 1, "c": 1, "d": 1}) == {"a": 1, "b": 1, "c": 0, "d": 0}
+
+
+def pools(size):
+    return {d: range(k * 1000, k * 1000 + size) for k, d in enumerate(DOMAIN_WEIGHTS)}
+
+
+def test_form_follows_the_blueprint():
+    form = Assembler(pools(100)).assemble(50, seed=3)
+    assert len(set(form.items)) == 50
+    assert {d: sum(i // 1000 == k for i in form.items) for k, d in enumerate(DOMAIN_WEIGHTS)} == form.blueprint
+    assert Assembler(pools(100)).assemble(50, seed=3) == form
+
+
+@pytest.mark.parametrize("excluded", [range(5), range(80)])     # oversampling and filtering
+def test_exclude_keeps_seen_items_off(excluded):
+    seen = {k * 1000 + i for k in range(4) for i in excluded}
+    form = Assembler(pools(100)).assemble(20, seed=1, exclude=seen)
+    assert len(set(form.items)) == 20 and not seen & set(form.items)
+
+
+def test_capacity_and_shortfall():
+    assembler = Assembler(pools(10))
+    n = assembler.capacity()
+    assembler.assemble(n)
+    with pytest.raises(InsufficientItems):
+        assembler.assemble(n + 1)
+    with pytest.raises(InsufficientItems):
+        assembler.assemble(8, exclude=range(0, 1000))
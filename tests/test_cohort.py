@@ -0,0 +1,61 @@
+"""KLL rank error, merging, and seeding the cohort from stored exams."""
+
+import numpy as np
+import pytest
+
+from capm_sim.bank import DOMAINS, QuestionBank, build_bank
+from capm_sim.cohort import Cohort, KLLSketch, backfill
+from capm_sim.exams import ExamStore
+
+
+def test_rank_error_is_about_one_over_k():
+    values = np.random.default_rng(1).random(200_000)
+    sketch = KLLSketch(200, np.random.default_rng(2))
+    for part in np.array_split(values, 50):
+        sketch.update(part)
+    assert sketch.n == len(values)
+    assert sum(map(len, sketch.levels)) < 3 * 200 + 64
+    for q in (0.01, 0.25, 0.5, 0.9, 0.99):
+        assert sketch.rank(q) == pytest.approx(q, abs=0.01)
+        assert sketch.quantile(q) == pytest.approx(q, abs=0.01)
+
+
+def test_merge_matches_one_sketch():
+    rng = np.random.default_rng(3)
+    a, b = KLLSketch(200, rng), KLLSketch(200, rng)
+    a.update(rng.normal(0, 1, 50_000))
+    b.update(rng.normal(3, 1, 50_000))
+    a.merge(b)
+    assert a.n == 100_000
+    assert a.rank(1.5) == pytest.approx(0.5, abs=0.01)
+
+
+def test_small_and_empty_sketches():
+    sketch = KLLSketch()
+    assert sketch.rank(1.0) == 0.0
+    sketch.update([10.0, 20.0, 30.0])
+    assert (sketch.rank(10.0), sketch.rank(25.0), sketch.rank(99.0)) == (0.0, 2 / 3, 1.0)
+
+
+def test_record_ranks_against_earlier_scores():
+    cohort = Cohort(None)
+    first = cohort.record({"pct": 50.0, "domains": {DOMAINS[0]: [1, 2]}})
+    assert first == {"overall": None, "domains": {DOMAINS[0]: None}}
+    cohort.record({"pct": 70.0, "domains": {}})
+    assert cohort.record({"pct": 60.0, "domains": {}})["overall"] == 50.0
+
+
+def test_backfill_skips_retired_items(tmp_path):
+    rows = [{"id": i, "domain": DOMAINS[0], "question": "Q", "options": ["a", "b"], "correct": 0,
+             "explanation": ""} for i in (1, 2)]
+    build_bank(rows[:1], tmp_path / "bank.sqlite3")    # item 2 has since been retired
+    exams = ExamStore(tmp_path / "exams.sqlite3")
+    exams.record(exams.create([1, 2]), [0, 0], 2)
+    bank = QuestionBank(tmp_path / "bank.sqlite3")
+    cohort = Cohort(None)
+    try:
+        assert backfill(cohort, bank, exams) == 1
+    finally:
+        bank.close()
+        exams.close()
+    assert cohort.local["overall"].quantile(0.5) == 100.0
@@ -0,0 +1,24 @@
+"""The exam store: form timing and which items sit on live forms."""
+
+import time
+
+from capm_sim.exams import EXAM_LENGTH, EXAM_SECONDS, ExamStore, form_seconds
+
+
+def test_form_seconds_is_pro_rata():
+    assert form_seconds(EXAM_LENGTH) == EXAM_SECONDS
+    assert form_seconds(EXAM_LENGTH // 2) == EXAM_SECONDS // 2
+    assert form_seconds(25) == 1800
+
+
+def test_held_items_are_on_live_unsubmitted_forms(tmp_path):
+    exams = ExamStore(tmp_path / "exams.sqlite3")
+    live = exams.create([1, 2, 3], seconds=600)
+    exams.create([4], seconds=-60)                   # already expired
+    exams.record(exams.create([5], seconds=600), [0], 1)
+    now = time.time()
+    assert exams.held([1, 3, 4, 5, 6], now) == {1, 3}
+    assert exams.held([], now) == set()
+    exams.record(live, [0, 0, 0], 0)
+    assert exams.held([1, 2, 3], now) == set()
+    exams.close()
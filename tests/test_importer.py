@@ -0,0 +1,61 @@
+"""Importer validation, near-duplicate detection and appending to the bank source."""
+
+import json
+
+import numpy as np
+
+from capm_sim.bank import DOMAINS
+from capm_sim.importer import NUM_PERM, band_keys, import_rows, main, read_rows, signatures
+
+STEM = "Which document formally authorizes the existence of a project and names the project manager"
+
+
+def row(question, **extra):
+    return {"domain": DOMAINS[0], "question": question, "options": ["Project charter", "Scope statement",
+            "Risk register", "Issue log"], "correct": 0, "explanation": "The charter authorizes it.", **extra}
+
+
+def lines(*rows):
+    return [(n, json.dumps(r)) for n, r in enumerate(rows, 1)]
+
+
+def test_signatures_estimate_jaccard():
+    a, b = list(range(100)), list(range(10, 110))       # Jaccard 90 / 110
+    sigs = signatures([a, b, a])
+    assert sigs.shape == (3, NUM_PERM)
+    assert (sigs[0] == sigs[2]).all()
+    assert abs((sigs[0] == sigs[1]).mean() - 90 / 110) < 0.15
+    keys = band_keys(sigs)
+    assert (keys[0] == keys[2]).all() and keys.dtype == np.uint64
+
+
+def test_duplicates_and_invalid_rows_are_rejected(tmp_path):
+    bank = tmp_path / "questions.jsonl"
+    bank.write_text(json.dumps({"id": 7, **row(STEM)}) + "\n")
+    new = lines(row("[Practice] " + STEM + "?"),                        # repeats the bank question
+                row("What does a RACI chart show about who is responsible for each activity"),
+                row("What does a RACI chart show about who is responsible for each activity?"),
+                row("Stem", correct=4),
+                row("A fresh question on burndown charts and velocity", id=7))
+    result = import_rows([("new.jsonl", new)], bank, workers=1)
+    assert result.read == 5 and result.imported == 1
+    assert sorted((n, msg.split()[0]) for _, n, msg in result.errors) == [(4, "correct"), (5, "id")]
+    assert sorted((n, of) for _, n, of, _ in result.duplicates) == [(1, "bank id 7"), (3, "new.jsonl:2")]
+    added = [json.loads(line) for line in bank.read_text().splitlines()]
+    assert [(q["id"], q["question"][:6]) for q in added] == [(7, STEM[:6]), (8, "What d")]
+
+
+def test_csv_and_dry_run(tmp_path):
+    bank = tmp_path / "questions.jsonl"
+    src = tmp_path / "new.csv"
+    src.write_text("domain,question,option_a,option_b,option_c,correct,explanation\n"
+                   f"{DOMAINS[1]},Which chart tracks remaining work,Burndown,Gantt,,A,It falls to zero\n")
+    ((_, raw),) = read_rows(src)
+    assert main([str(src), "--bank", str(bank), "--workers", "1", "--dry-run"]) == 0
+    assert not bank.exists()
+    result = import_rows([("new.csv", [(2, raw)])], bank, workers=1)
+    assert result.imported == 1
+    assert json.loads(bank.read_text()) == {"id": 1, "domain": DOMAINS[1],
+                                            "question": "Which chart tracks remaining work",
+                                            "options": ["Burndown", "Gantt"], "correct": 0,
+                                            "explanation": "It falls to zero"}
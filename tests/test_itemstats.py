@@ -0,0 +1,97 @@
+"""Item analysis sums, the store cursor and the report's flags."""
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from capm_sim.bank import DOMAINS, QuestionBank, build_bank
+from capm_sim.exams import ExamStore
+from capm_sim.itemstats import ItemStats, analyse, main, report
+from capm_sim.scoring import AnswerKey
+
+
+def question(i, correct, options=4):
+    return {"id": i, "domain": DOMAINS[0], "question": f"Q{i}", "options": [f"o{k}" for k in range(options)],
+            "correct": correct, "explanation": ""}
+
+
+@pytest.fixture
+def key():
+    return AnswerKey(np.array([1, 2, 3], np.int64), np.array([0, 1, 2], np.int8), np.zeros(3, np.int8))
+
+
+def test_sums(key):
+    stats = ItemStats.empty(key.ids)
+    seen, skipped = analyse(stats, key, [(1, [1, 2, 3], [0, 1, None], [10, 20, 30]),
+                                         (2, [1, 2], [1, 1], None)], chunk=1)
+    assert (seen, skipped, stats.cursor, stats.attempts) == (2, 0, 2.0, 2)
+    assert stats.n.tolist() == [2, 2, 1]
+    assert stats.correct.tolist() == [1, 2, 0]
+    assert stats.options[:, :3].tolist() == [[0, 1, 1], [0, 0, 2], [1, 0, 0]]
+    assert stats.mean_seconds()[:2].tolist() == [10.0, 20.0]
+    # Rest score of item 1 on the first attempt: one of the other two correct.
+    assert stats.sum_x[0] == pytest.approx(0.5 + 1.0)
+
+
+def test_retired_items_are_skipped(key):
+    stats = ItemStats.empty(key.ids)
+    assert analyse(stats, key, [(1, [1, 9, 3], [0, 0, 2], None)]) == (1, 1)
+    assert stats.n.tolist() == [1, 0, 1]
+    assert stats.correct.tolist() == [1, 0, 1]
+
+
+def test_store_cursor_follows_commit_order(tmp_path):
+    exams = ExamStore(tmp_path / "exams.sqlite3")
+    a, b, c = (exams.create([1]) for _ in range(3))
+    exams.record(b, [0], 1)
+    exams.record(a, [0], 1)
+    assert [s for s, *_ in exams.attempts()] == [1, 2]
+    exams.record(c, [0], 1)
+    assert [s for s, *_ in exams.attempts(2)] == [3]
+    exams.close()
+
+
+def test_store_seq_is_backfilled(tmp_path):
+    db = tmp_path / "exams.sqlite3"
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE exams (id TEXT PRIMARY KEY, created REAL NOT NULL, deadline REAL NOT NULL, "
+                "items TEXT NOT NULL, answers TEXT, correct INTEGER, submitted REAL, seconds TEXT, candidate BLOB)")
+    con.executemany("INSERT INTO exams VALUES (?, 0, 0, '[1]', '[0]', 1, ?, NULL, NULL)",
+                    [("b", 5.0), ("a", 5.0), ("c", None), ("d", 2.0)])
+    con.commit()
+    con.close()
+    exams = ExamStore(db)
+    assert [s for s, *_ in exams.attempts()] == [1, 2, 3]
+    assert (exams.seq_at(4.0), exams.seq_at(5.0)) == (1, 3)
+    exams.close()
+
+
+def test_update_resumes_from_the_store(tmp_path):
+    build_bank([question(1, 0), question(2, 1)], tmp_path / "bank.sqlite3")
+    exams = ExamStore(tmp_path / "exams.sqlite3")
+    for answers in ([0, 1], [1, 1]):
+        exams.record(exams.create([1, 2]), answers, 0)
+    args = ["update", "--bank", str(tmp_path / "bank.sqlite3"), "--exams", str(tmp_path / "exams.sqlite3"),
+            "--checkpoint", str(tmp_path / "stats.npz")]
+    assert main(args) == 0
+    exams.record(exams.create([1]), [0], 1)
+    exams.close()
+    assert main(args) == 0
+    bank = QuestionBank(tmp_path / "bank.sqlite3")
+    stats = ItemStats.load(tmp_path / "stats.npz", AnswerKey.from_bank(bank))
+    bank.close()
+    assert (stats.attempts, stats.cursor, stats.n.tolist()) == (3, 3.0, [3, 2])
+
+
+def test_chance_follows_the_option_count(tmp_path):
+    build_bank([question(1, 0, options=2), question(2, 0, options=5)], tmp_path / "bank.sqlite3")
+    bank = QuestionBank(tmp_path / "bank.sqlite3")
+    key = AnswerKey.from_bank(bank)
+    stats = ItemStats.empty(key.ids)
+    # Both items answered correctly 40% of the time: below chance on two options, above it on five.
+    analyse(stats, key, [(i, [1, 2], [0, 0] if i < 4 else [1, 1], None) for i in range(10)])
+    flags = {row["id"]: row["flags"] for row in report(stats, bank, min_responses=1, flagged_only=False)}
+    bank.close()
+    assert "at or below chance" in flags[1]
+    assert "at or below chance" not in flags[2]
@@ -0,0 +1,79 @@
+"""Journal appends, replay, compaction and cleanup."""
+
+import os
+import struct
+
+import pytest
+
+from capm_sim.journal import EV_ANSWER, EV_FLAG, EV_NAV, Journal, JournalError
+
+EXAM = "e" * 32
+
+
+def events(*evs):
+    return b"".join(struct.pack("<BHb", *e) for e in evs)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    j = Journal(tmp_path, compact_bytes=1 << 20)
+    yield j
+    j.close()
+
+
+def test_replay_folds_events(journal):
+    journal.append(EXAM, 1, events((EV_ANSWER, 0, 2), (EV_FLAG, 1, 1), (EV_NAV, 1, 0)))
+    journal.append(EXAM, 2, events((EV_ANSWER, 0, -1), (EV_ANSWER, 3, 1), (EV_FLAG, 1, 0)))
+    r = journal.replay(EXAM, 4)
+    assert r.state.responses == [None, None, None, 1]
+    assert not r.state.flagged
+    assert (r.current, r.seq) == (1, 2)
+
+
+def test_resent_batch_is_ignored(journal):
+    assert journal.append(EXAM, 1, events((EV_ANSWER, 0, 2)))
+    assert not journal.append(EXAM, 1, events((EV_ANSWER, 0, 3)))
+    assert journal.replay(EXAM, 1).state.responses == [2]
+
+
+def test_torn_tail_ends_the_log(journal):
+    journal.append(EXAM, 1, events((EV_ANSWER, 0, 2)))
+    journal.append(EXAM, 2, events((EV_ANSWER, 1, 3)))
+    journal.sync()
+    path = journal.path(EXAM)
+    path.write_bytes(path.read_bytes()[:-1])
+    assert journal.replay(EXAM, 2).state.responses == [2, None]
+
+
+def test_bad_writes_are_rejected(journal):
+    with pytest.raises(JournalError):
+        journal.append(EXAM, 1, b"\x01\x00")
+    with pytest.raises(JournalError):
+        journal.append(EXAM, 1, events((9, 0, 0)))
+    with pytest.raises(JournalError):
+        journal.path("../x")
+
+
+def test_compaction_keeps_the_state(tmp_path):
+    j = Journal(tmp_path, compact_bytes=64)
+    for seq in range(1, 40):
+        j.append(EXAM, seq, events((EV_ANSWER, seq % 5, seq % 4), (EV_NAV, seq % 5, 0)))
+    before = j.replay(EXAM, 5)
+    assert j.path(EXAM).stat().st_size < 64
+    j.append(EXAM, 40, events((EV_ANSWER, 4, 0)))
+    after = j.replay(EXAM, 5)
+    j.close()
+    assert after.state.responses == before.state.responses[:4] + [0]
+    assert (before.seq, after.seq) == (39, 40)
+
+
+def test_discard_and_sweep(journal):
+    other = "f" * 32
+    journal.append(EXAM, 1, events((EV_ANSWER, 0, 1)))
+    journal.append(other, 1, events((EV_ANSWER, 0, 1)))
+    journal.discard(EXAM)
+    assert not journal.path(EXAM).exists() and EXAM not in journal._fds
+    assert journal.sweep(60) == 0
+    os.utime(journal.path(other), (0, 0))
+    assert journal.sweep(60) == 1
+    assert not journal.path(other).exists() and other not in journal._fds
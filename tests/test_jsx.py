@@ -0,0 +1,47 @@
+"""Golden cases for the build-time JSX transform."""
+
+import pytest
+
+from capm_sim.jsx import JSXSyntaxError, transform
+
+CASES = [
+    # elements, fragments, attributes
+    ('<div/>', 'React.createElement("div", null)'),
+    ('<Foo a="x" b={1} c/>', 'React.createElement(Foo, {a:"x",b:1,c:true})'),
+    ('<div {...p} data-id="1"/>', 'React.createElement("div", {...p,"data-id":"1"})'),
+    ('<><a/></>', 'React.createElement(React.Fragment, null, React.createElement("a", null))'),
+    ('<a.B/>', 'React.createElement(a.B, null)'),
+    # text whitespace: lines trimmed and joined by one space, blank lines dropped, entities decoded
+    ('<p>\n  one\n  two  \n\n</p>', 'React.createElement("p", null, "one two")'),
+    ('<p>  a  {x}  b  </p>', 'React.createElement("p", null, "  a  ", x, "  b  ")'),
+    ('<p>a &amp; b&nbsp;</p>', 'React.createElement("p", null, "a & b ")'),
+    ('<p>{/* note */}</p>', 'React.createElement("p", null)'),
+    # where a `<` starts JSX rather than comparing
+    ('return <b/>', 'return React.createElement("b", null)'),
+    ('x => <b/>', 'x => React.createElement("b", null)'),
+    ('c ? <a/> : <b/>', 'c ? React.createElement("a", null) : React.createElement("b", null)'),
+    ('if (x) <div/>', 'if (x) React.createElement("div", null)'),
+    ('while (f(x)) <i/>', 'while (f(x)) React.createElement("i", null)'),
+    ('a < b', 'a < b'),
+    ('(a) < b', '(a) < b'),
+    ('f(a) <b', 'f(a) <b'),
+    ('i<n', 'i<n'),
+    # regex, division and templates are copied through
+    ('x = a / b / c', 'x = a / b / c'),
+    ('return /<a>/.test(s)', 'return /<a>/.test(s)'),
+    ('if (x) /<b>/.test(y)', 'if (x) /<b>/.test(y)'),
+    ('`<a> ${ {a: <b/>}.a } </a>`', '`<a> ${ {a: React.createElement("b", null)}.a } </a>`'),
+    ('`${ `${<i/>}` }`', '`${ `${React.createElement("i", null)}` }`'),
+    ('<a title={`x ${y}`}>{"<"}</a>', 'React.createElement("a", {title:`x ${y}`}, "<")'),
+]
+
+
+@pytest.mark.parametrize("src, expected", CASES)
+def test_transform(src, expected):
+    assert transform(src) == expected
+
+
+@pytest.mark.parametrize("src", ["<a></b>", "<a>", "<a>{x</a>", "`abc", "<a {b}/>"])
+def test_errors(src):
+    with pytest.raises(JSXSyntaxError):
+        transform(src)
@@ -0,0 +1,58 @@
+"""Golden cases for the build's JavaScript / CSS minifier."""
+
+import shutil
+
+import pytest
+
+from capm_sim import APP_SHELL
+from capm_sim.build import extract_app_script, parse_ms
+from capm_sim.jsx import transform
+from capm_sim.minify import minify_css, minify_js
+
+CASES = [
+    # comments and whitespace
+    ("a = 1; // note\nb = 2;", "a=1;b=2;"),
+    ("a /* x */ b", "a b"),
+    ("let  x\n=\n1", "let x=1"),
+    # a newline is kept wherever dropping it could change semicolon insertion
+    ("a\nb", "a\nb"),
+    ("return\nx", "return\nx"),
+    ("a\n++b", "a\n++b"),
+    ("a + +b", "a+ +b"),
+    ("a - -b", "a- -b"),
+    # regex versus division
+    ("x = a / b / c", "x=a/b/c"),
+    ("f(a) / 2", "f(a)/2"),
+    ("x = /  +/g", "x=/  +/g"),
+    ("return /  +/.test(s)", "return/  +/.test(s)"),
+    ("typeof /a  b/", "typeof/a  b/"),
+    ("case /a  b/:", "case/a  b/:"),
+    ("if (x) /a  b/.test(y)", "if(x)/a  b/.test(y)"),
+    ("a / /re  x/.source.length", "a/ /re  x/.source.length"),
+    ("x = a * /b  c/.x", "x=a*/b  c/.x"),
+    ("f = x => /a  b/", "f=x=>/a  b/"),
+    ("/a/ / 2", "/a/ /2"),
+    ("x = /[/]  /", "x=/[/]  /"),
+    # string and template literals are untouched, including nested templates
+    ("s = 'a  // b'", "s='a  // b'"),
+    ('s = "a\\"  b"', 's="a\\"  b"'),
+    ("t = `a  ${ b  +  c }  d`", "t=`a  ${ b  +  c }  d`"),
+    ("t = `a${ `in}ner  ${ {a: 1}.a }` }  b`;  x = 1", "t=`a${ `in}ner  ${ {a: 1}.a }` }  b`;x=1"),
+    ("t = `${ '}' }  `; y", "t=`${ '}' }  `;y"),
+]
+
+
+@pytest.mark.parametrize("src, expected", CASES)
+def test_minify_js(src, expected):
+    assert minify_js(src) == expected
+
+
+def test_minify_css():
+    assert minify_css("a , b {\n  color: red ;\n  /* x */ margin: 0;\n}\n") == "a,b{color:red;margin:0}"
+    assert minify_css("a :hover { x: 1 }") == "a :hover{x:1}"   # descendant, not a:hover
+
+
+@pytest.mark.skipif(not shutil.which("node"), reason="needs node")
+def test_app_shell_parses():
+    # The whole app, transformed and minified, must still be valid JavaScript.
+    parse_ms(minify_js(transform(extract_app_script(APP_SHELL.read_text(encoding="utf-8")))))
@@ -0,0 +1,66 @@
+"""Vectorised scoring, id lookup and rescoring against a changed bank."""
+
+import numpy as np
+import pytest
+
+from capm_sim.bank import DOMAINS, QuestionBank, build_bank
+from capm_sim.exams import ExamStore
+from capm_sim.scoring import AnswerKey, pad, rescore, score_attempts
+
+
+def key(ids, correct, domain):
+    return AnswerKey(np.array(ids, np.int64), np.array(correct, np.int8), np.array(domain, np.int8))
+
+
+def question(i, correct, domain=0):
+    return {"id": i, "domain": DOMAINS[domain], "question": f"Q{i}", "options": ["a", "b", "c", "d"],
+            "correct": correct, "explanation": ""}
+
+
+@pytest.mark.parametrize("ids", [[1, 2, 5, 9], [1, 2, 5, 10**9]])   # direct table and binary search
+def test_index(ids):
+    k = key(ids, [0] * 4, [0] * 4)
+    assert k.index(np.array([[ids[2], -1, ids[0]]])).tolist() == [[2, -1, 0]]
+    with pytest.raises(KeyError):
+        k.index(np.array([3]))
+    with pytest.raises(KeyError):
+        k.index(np.array([10**12]))
+
+
+def test_retire_turns_unknown_ids_into_padding():
+    k = key([1, 2, 3], [0, 0, 0], [0, 0, 0])
+    items = np.array([[1, 7, -1], [8, 3, 9]])
+    assert k.retire(items) == 3
+    assert items.tolist() == [[1, -1, -1], [-1, 3, -1]]
+
+
+def test_score_attempts_counts_per_domain():
+    k = key([10, 11, 12, 13], [0, 1, 2, 3], [0, 0, 1, 2])
+    scores = score_attempts(k, [([10, 11, 12, 13], [0, 1, 0, None]), ([13, 12], [3, 2])])
+    assert scores.correct.tolist() == [2, 2]
+    assert scores.total.tolist() == [4, 2]
+    assert scores.domain_correct.tolist() == [[2, 0, 0, 0], [0, 1, 1, 0]]
+    assert scores.domain_total.tolist() == [[2, 1, 1, 0], [0, 1, 1, 0]]
+    first, second = scores.as_dicts()
+    assert first["pct"] == 50.0 and not first["passed"]
+    assert second["passed"] and second["domains"] == {DOMAINS[1]: [1, 1], DOMAINS[2]: [1, 1]}
+
+
+def test_pad():
+    assert pad([[1, None], [2]]).tolist() == [[1, -1], [2, -1]]
+
+
+def test_rescore_skips_retired_items(tmp_path):
+    build_bank([question(1, 0), question(2, 1), question(3, 2)], tmp_path / "bank.sqlite3")
+    exams = ExamStore(tmp_path / "exams.sqlite3")
+    exam = exams.create([1, 2, 3])
+    exams.record(exam, [0, 1, 2], 3)
+    # Item 2 is retired and item 1's key corrected.
+    build_bank([question(1, 3), question(3, 2)], tmp_path / "bank.sqlite3")
+    bank = QuestionBank(tmp_path / "bank.sqlite3")
+    try:
+        assert rescore(bank, exams) == (1, 1)
+        assert [s[3] for s in exams.submissions()] == [1]
+    finally:
+        bank.close()
+        exams.close()
@@ -0,0 +1,56 @@
+"""SM-2 scheduling and the per-candidate review queue."""
+
+import pytest
+
+from capm_sim.srs import DAY, MIN_EASE, RELEARN_MINUTES, START_EASE, Card, SRSStore, candidate_key, schedule
+
+ME = candidate_key("ab" * 16)
+
+
+def test_intervals_grow_one_six_then_by_ease():
+    card = Card(1, 0, 0, START_EASE, 0, 0)
+    intervals = []
+    for _ in range(4):
+        card = schedule(card, 4, card.due)
+        intervals.append(card.interval)
+    assert intervals == [1, 6, 15, 38]
+    assert card.ease == START_EASE and card.reps == 4
+
+
+def test_ease_follows_the_grade():
+    card = Card(1, 0, 6, START_EASE, 2, 0)
+    assert schedule(card, 5, 0).ease == START_EASE + 10
+    assert schedule(card, 3, 0).ease == START_EASE - 14
+    assert schedule(Card(1, 0, 0, MIN_EASE, 0, 0), 0, 0).ease == MIN_EASE
+    with pytest.raises(ValueError):
+        schedule(card, 6, 0)
+
+
+def test_lapse_relearns():
+    card = schedule(Card(1, 0, 15, START_EASE, 3, 0), 2, 100)
+    assert (card.due, card.interval, card.reps, card.lapses) == (100 + RELEARN_MINUTES, 0, 0, 1)
+
+
+def test_store_queue(tmp_path):
+    srs = SRSStore(tmp_path / "srs.sqlite3")
+    try:
+        srs.add(ME, [1, 2], now=100)
+        srs.add(candidate_key("cd" * 16), [3], now=50)
+        assert [c.item for c in srs.due(ME, 10, now=100)] == [1, 2]
+        card = srs.review(ME, 1, 4, now=100)
+        assert card.due == 100 + DAY
+        assert srs.counts(ME, now=100) == (1, 100)
+        # Missing an item again lapses its card and brings it back due.
+        srs.add(ME, [1], now=200)
+        (again,) = [c for c in srs.due(ME, 10, now=200) if c.item == 1]
+        assert (again.lapses, again.reps, again.ease) == (1, 0, START_EASE - 20)
+        with pytest.raises(KeyError):
+            srs.review(ME, 9, 4)
+    finally:
+        srs.close()
+
+
+def test_candidate_key():
+    assert len(ME) == 16
+    with pytest.raises(ValueError):
+        candidate_key("ab")
@@ -0,0 +1,35 @@
+"""Packing exam state into nibbles and a flag bitset, and rejecting bad payloads."""
+
+import base64
+
+import pytest
+
+from capm_sim.state import MAX_OPTION, ExamState, StateError, decode_state, encode_state
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 9, 150])
+def test_round_trip(n):
+    state = ExamState([None if i % 3 == 0 else i % (MAX_OPTION + 1) for i in range(n)], set(range(0, n, 4)))
+    decoded = decode_state(encode_state(state), n)
+    assert decoded == state
+    assert decoded.answered == state.answered
+
+
+def test_layout():
+    raw = base64.b64decode(encode_state(ExamState([2, None, 0], {2})))
+    assert raw == bytes([1, 3, 0, 0x03, 0x01, 0b100])
+    assert len(encode_state(ExamState([0] * 150))) == 132
+
+
+def test_rejects_bad_payloads():
+    good = encode_state(ExamState([1, 2]))
+    with pytest.raises(StateError):
+        encode_state(ExamState([MAX_OPTION + 1]))
+    with pytest.raises(StateError, match="base64"):
+        decode_state("not base64!")
+    with pytest.raises(StateError, match="version"):
+        decode_state(base64.b64encode(b"\x02\x02\x00\x00\x00").decode())
+    with pytest.raises(StateError, match="covers 2 items"):
+        decode_state(good, 3)
+    with pytest.raises(StateError, match="length"):
+        decode_state(base64.b64encode(base64.b64decode(good) + b"\x00").decode())